@@ -12,5 +12,8 @@ def create_app():
     with app.app_context():
         from .routes import api_bp
         app.register_blueprint(api_bp)  
+    if app.config.get('PROFILE_TOKEN'):
+        from .profiling import ProfilerMiddleware
+        app.wsgi_app = ProfilerMiddleware(app.wsgi_app, app.config['PROFILE_TOKEN'])
     return app
 
@@ -1,11 +1,11 @@
 import glob
 from operator import is_
 from pathlib import Path
-import yaml
 import os
 import re
 import json
 from .const import *
+from .comments import comment_store, science_target
 from pathlib import Path
 
 
@@ -28,6 +28,8 @@ def scan_processed_folder(date):
         base = base_folder(date)
         output = []
         idx = 1
+        # One query for the comment counts of every row of the night
+        comment_counts = comment_store.counts_for_date(date)
         for folder in Path(base).iterdir():
             if not folder.is_dir() or folder.stem.startswith(("_", ".")):
                 continue
@@ -36,7 +38,7 @@ def scan_processed_folder(date):
                     continue
                 # process each item sequentially instead of using thread pool
                 
-                result = _process_one(date, idx, folder.stem, f.stem)
+                result = _process_one(date, idx, folder.stem, f.stem, comment_counts)
                 output.append(result)
                 idx += 1
         
@@ -52,7 +54,7 @@ def scan_processed_folder(date):
         print(e)
         return []
 
-def _process_one(date, idx, obj, filt):
+def _process_one(date, idx, obj, filt, comment_counts=None):
     row = {
         "id": idx,
         "date": date,
@@ -62,9 +64,10 @@ def _process_one(date, idx, obj, filt):
     }
 
     # locate the files
-    cfg, logf, _, comments = link_to_files(date, obj=obj, filt=filt)
+    cfg, logf, _, _ = link_to_files(date, obj=obj, filt=filt)
 
     # read config
+    import yaml
     with open(cfg) as f:
         cfgd = yaml.load(f, Loader=yaml.FullLoader)
     pro = sum(cfgd["flag"].values())
@@ -90,8 +93,9 @@ def _process_one(date, idx, obj, filt):
         w, e = count_warnings_errors(logf)
         row["warnings"], row["errors"] = w, e
 
-    if comments:
-        row["comments"] = count_comments(comments)
+    if comment_counts is None:
+        comment_counts = comment_store.counts_for_date(date)
+    row["comments"] = comment_counts.get(science_target(obj, filt), 0)
 
     return row
 
@@ -99,6 +103,7 @@ def scan_masterframe_folder(date):
     output = []
     try:
         base = base_folder(date, masterframe=True)
+        comment_counts = comment_store.counts_for_date(date)
         for folder in Path(base).iterdir():
             if (folder.name).startswith("_") or (folder.name).startswith("."):
                 continue
@@ -122,7 +127,7 @@ def scan_masterframe_folder(date):
             row_dict["flat"] = list(row_dict["flat"]) if row_dict["flat"] else False
             row_dict["dark"] = list(row_dict["dark"]) if row_dict["dark"] else False
 
-            _, log_file, _, comments_file = link_to_files(date, unit=row_dict["unit"], masterframe = True)
+            _, log_file, _, _ = link_to_files(date, unit=row_dict["unit"], masterframe = True)
 
             if log_file:
                 row_dict["warnings"], row_dict["errors"] = count_warnings_errors(log_file)
@@ -130,12 +135,7 @@ def scan_masterframe_folder(date):
                 row_dict["warnings"] = 0
                 row_dict["errors"] = 0
 
-            
-            os.makedirs(os.path.dirname(comments_file), exist_ok=True)
-            if comments_file:
-                row_dict["comments"] = count_comments(comments_file)
-            else:
-                row_dict["comments"] = 0
+            row_dict["comments"] = comment_counts.get(row_dict["unit"], 0)
 
             output.append(row_dict)
         return output
@@ -228,14 +228,6 @@ def count_warnings_errors(log_file):
                     error_count += 1
     return warning_count, error_count
 
-def count_comments(comments_file: str) -> int:    
-    if not os.path.exists(comments_file):
-        return 0
-
-    with open(comments_file, 'r', encoding='utf-8') as f:
-        return sum(1 for line in f if '|' in line)
-
-
 def get_latest_mtime(path):
     latest_mtime = 0
     for root, dirs, files in os.walk(path):
@@ -310,13 +302,12 @@ def get_plot_data(file):
     except Exception as e:
         return None, str(e)
 
-def update_masterframe_data(dtype = ["bias", "dark", "flat", "bpmask"]):
+def update_masterframe_data(dtype = ["bias", "dark", "flat", "bpmask"], base=MASTERFRAME_DIR,
+                            flat_base="/lyman/data2/_master_frame", output_dir="/tmp/pipeline"):
     from astropy.io import fits
     from astropy.table import Table, Column
     from astropy.time import Time
 
-    base = "/lyman/data2/master_frame"
-
     data = {}
     for dt in dtype:
         if dt == "bpmask":
@@ -327,7 +318,7 @@ def update_masterframe_data(dtype = ["bias", "dark", "flat", "bpmask"]):
     # Use more efficient glob patterns to find files
     for dt in dtype:
         if dt == "flat":
-            base = "/lyman/data2/_master_frame"
+            base = flat_base
         
         if dt == "bpmask":
             # Find all bpmask files in one go
@@ -388,4 +379,4 @@ def update_masterframe_data(dtype = ["bias", "dark", "flat", "bpmask"]):
         tbl.sort('DATE-OBS')
 
         # 5) Write out as enhanced CSV (ECSV)
-        tbl.write(f'/tmp/pipeline/{dt}.ecsv', format='ascii.ecsv', overwrite=True)
+        tbl.write(os.path.join(output_dir, f'{dt}.ecsv'), format='ascii.ecsv', overwrite=True)
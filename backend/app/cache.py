@@ -0,0 +1,294 @@
+"""
+Query result cache shared by all uwsgi workers.
+
+Results are pickled into a local SQLite file (WAL mode), so every worker
+process on the host sees the same entries and the DB is queried once per
+TTL no matter how many dashboards poll. Each entry carries tags (e.g.
+``pipeline:2025-10-21``) that write paths use to invalidate it.
+
+A miss takes a short lease on the key before computing; other workers that
+miss at the same time wait for the leaseholder's result instead of all
+querying the DB (stampede protection).
+"""
+
+import os
+import re
+import json
+import time
+import pickle
+import sqlite3
+import threading
+from functools import wraps
+from typing import Any, Callable, Iterable, Optional
+
+from .metrics import count_cache
+
+CACHE_PATH = os.getenv("PIPELINE_CACHE_PATH", "/tmp/pipeline/query_cache.sqlite")
+DEFAULT_TTL = 30.0
+# How long a worker may hold the compute lease before others take over
+LEASE_TIMEOUT = 30.0
+LEASE_POLL = 0.05
+# Expired entries are purged once every PURGE_EVERY writes per worker
+PURGE_EVERY = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cache_tags (
+    tag TEXT NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (tag, key)
+);
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+"""
+
+_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+class Uncacheable(Exception):
+    """
+    Raised by a compute function to return a value without caching it
+
+    DatabaseConnection raises it with its error/disconnected fallback
+    (e.g. ``[]``), so an outage is not served from the cache for a TTL.
+    """
+
+    def __init__(self, value: Any):
+        super().__init__(value)
+        self.value = value
+
+
+def _compute(compute: Callable[[], Any]):
+    """(value, cacheable) of a compute function"""
+    try:
+        return compute(), True
+    except Uncacheable as e:
+        return e.value, False
+
+
+def make_key(name: str, *args, **kwargs) -> str:
+    """Cache key from a method name and its arguments"""
+    return name + ":" + json.dumps([args, kwargs], sort_keys=True, default=str)
+
+
+def date_from_path(path: Optional[str]) -> Optional[str]:
+    """First YYYY-MM-DD in a path, e.g. the run date of a comments file"""
+    if not path:
+        return None
+    match = _DATE_RE.search(path)
+    return match.group(0) if match else None
+
+
+class SQLiteStore:
+    """Base for stores kept in a local SQLite file shared by all workers"""
+
+    schema = ""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread and per process (never shared across fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(self.schema)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+
+class QueryCache(SQLiteStore):
+    """SQLite-backed result cache with TTL, tags and compute leases"""
+
+    schema = _SCHEMA
+
+    def __init__(self, path: str = CACHE_PATH, default_ttl: float = DEFAULT_TTL):
+        super().__init__(path)
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires > ?", (key, time.time())
+        ).fetchone()
+        if row is None:
+            return default
+        return pickle.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, tags: Iterable[str] = ()):
+        ttl = self.default_ttl if ttl is None else ttl
+        conn = self._conn()
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                (key, blob, time.time() + ttl),
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO cache_tags (tag, key) VALUES (?, ?)",
+                [(tag, key) for tag in tags],
+            )
+        self._writes += 1
+        if self._writes % PURGE_EVERY == 0:
+            self.purge_expired()
+
+    def _acquire_lease(self, key: str, owner: str) -> bool:
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM leases WHERE key = ? AND expires <= ?", (key, now))
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO leases (key, owner, expires) VALUES (?, ?, ?)",
+                (key, owner, now + LEASE_TIMEOUT),
+            )
+            return cur.rowcount == 1
+
+    def _release_lease(self, key: str, owner: str):
+        self._conn().execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], ttl: Optional[float] = None,
+                       tags: Iterable[str] = ()) -> Any:
+        """
+        Return the cached value for key, computing it at most once across workers
+
+        Args:
+            key: Cache key (see make_key)
+            compute: Called on a miss to produce the value
+            ttl: Seconds the value stays valid (default: default_ttl)
+            tags: Invalidation tags for the entry
+
+        Returns:
+            Cached or freshly computed value
+        """
+        missing = object()
+        try:
+            value = self.get(key, missing)
+        except sqlite3.Error as e:
+            print(f"Query cache unavailable: {e}")
+            return _compute(compute)[0]
+        if value is not missing:
+            self.hits += 1
+            count_cache("query", True)
+            return value
+
+        self.misses += 1
+        count_cache("query", False)
+        owner = f"{os.getpid()}:{threading.get_ident()}"
+        deadline = time.time() + LEASE_TIMEOUT
+        try:
+            while not self._acquire_lease(key, owner):
+                # Another worker is computing this key; wait for its result
+                time.sleep(LEASE_POLL)
+                value = self.get(key, missing)
+                if value is not missing:
+                    return value
+                if time.time() > deadline:
+                    return _compute(compute)[0]
+        except sqlite3.Error as e:
+            print(f"Query cache unavailable: {e}")
+            return _compute(compute)[0]
+
+        try:
+            value, cacheable = _compute(compute)
+            if cacheable:
+                # A locked or broken cache must not turn a good result into an error
+                try:
+                    self.set(key, value, ttl=ttl, tags=tags)
+                except sqlite3.Error as e:
+                    print(f"Query cache unavailable: {e}")
+            return value
+        finally:
+            try:
+                self._release_lease(key, owner)
+            except sqlite3.Error as e:
+                # The lease expires after LEASE_TIMEOUT
+                print(f"Query cache unavailable: {e}")
+
+    def invalidate(self, *tags: str):
+        """Drop every entry carrying any of the given tags"""
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for tag in tags:
+                conn.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache_tags WHERE tag = ?)", (tag,)
+                )
+                conn.execute("DELETE FROM cache_tags WHERE tag = ?", (tag,))
+
+    def purge_expired(self):
+        """Remove expired entries and their tags"""
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+            conn.execute("DELETE FROM cache_tags WHERE key NOT IN (SELECT key FROM cache)")
+
+    def clear(self):
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM cache")
+            conn.execute("DELETE FROM cache_tags")
+            conn.execute("DELETE FROM leases")
+
+
+query_cache = QueryCache()
+
+
+def cached(name: str, ttl: Optional[float] = None, tags: Optional[Callable[..., Iterable[str]]] = None):
+    """
+    Cache a DatabaseConnection method in the shared query cache.
+
+    The method raises Uncacheable(fallback) where it cannot reach the
+    database; callers get the fallback and nothing is stored.
+
+    Args:
+        name: Key prefix, usually the method name
+        ttl: Seconds entries stay valid
+        tags: Called with the method arguments, returns invalidation tags
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            key = make_key(name, *args, **kwargs)
+            entry_tags = tags(*args, **kwargs) if tags else ()
+            return query_cache.get_or_compute(
+                key, lambda: method(self, *args, **kwargs), ttl=ttl, tags=entry_tags
+            )
+        def uncached(self, *args, **kwargs):
+            return _compute(lambda: method(self, *args, **kwargs))[0]
+
+        wrapper.uncached = uncached
+        return wrapper
+    return decorator
+
+
+def invalidate_pipeline(date: Optional[str]):
+    """Invalidate cached pipeline status of a date, e.g. after a comment or rerun"""
+    if date:
+        query_cache.invalidate(f"pipeline:{date}")
+
+
+def invalidate_qa(qa_type: Optional[str] = None):
+    """Invalidate cached QA data of one type (or all types)"""
+    if qa_type:
+        query_cache.invalidate(f"qa:{qa_type}")
+    else:
+        query_cache.invalidate("qa")
@@ -0,0 +1,210 @@
+"""
+Change cursors for pipeline status tables.
+
+Every status response is recorded against a scope (e.g.
+``science:2025-10-21``). Rows are compared by content digest with the
+previous snapshot of that scope; added, changed and removed rows bump the
+scope's version and are appended to a bounded change log. A client that
+sends ``since=<version>`` then receives only the rows that changed after
+that version instead of the whole table.
+
+The snapshot and log live in a SQLite file so all uwsgi workers hand out
+the same cursors.
+"""
+
+import os
+import json
+import time
+import pickle
+import hashlib
+from typing import Any, Dict, Iterable, List, Optional
+
+from .cache import SQLiteStore
+
+CHANGES_PATH = os.getenv("PIPELINE_CHANGES_PATH", "/tmp/pipeline/status_changes.sqlite")
+# Versions kept in the change log per scope; older cursors get a full reset
+MAX_CHANGES = 2000
+# Scopes (dates) not touched for this many seconds are dropped
+SCOPE_TTL = 14 * 24 * 3600
+PRUNE_EVERY = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scopes (
+    scope TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    floor INTEGER NOT NULL,
+    touched REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rows (
+    scope TEXT NOT NULL,
+    row_id TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    PRIMARY KEY (scope, row_id)
+);
+CREATE TABLE IF NOT EXISTS changes (
+    scope TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    row_id TEXT NOT NULL,
+    removed INTEGER NOT NULL,
+    PRIMARY KEY (scope, version, row_id)
+);
+"""
+
+
+def row_key(row: Dict[str, Any]) -> str:
+    """Stable id of a status row (config name, or type/unit/obj/filt)"""
+    if row.get("config_file"):
+        return str(row["config_file"])
+    if row.get("masterframe") or row.get("data_type") == "masterframe":
+        return f"masterframe/{row.get('date', '')}/{row.get('unit', '')}"
+    return f"science/{row.get('date', '')}/{row.get('obj', '')}/{row.get('filt', '')}"
+
+
+def _digest(row: Dict[str, Any]) -> str:
+    blob = json.dumps(row, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+
+class ChangeLog(SQLiteStore):
+    """Versioned snapshots of status tables with a bounded per-scope change log"""
+
+    schema = _SCHEMA
+
+    def __init__(self, path: str = CHANGES_PATH, max_changes: int = MAX_CHANGES):
+        super().__init__(path)
+        self.max_changes = max_changes
+        self._records = 0
+
+    def record(self, scope: str, rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        Record the current rows of a scope
+
+        Args:
+            scope: Table and date, e.g. 'science:2025-10-21'
+            rows: Current status rows
+
+        Returns:
+            Version of the scope after recording
+        """
+        current = {row_key(row): row for row in rows}
+        digests = {row_id: _digest(row) for row_id, row in current.items()}
+
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            known = dict(conn.execute(
+                "SELECT row_id, digest FROM rows WHERE scope = ?", (scope,)
+            ).fetchall())
+            state = conn.execute(
+                "SELECT version FROM scopes WHERE scope = ?", (scope,)
+            ).fetchone()
+            version = state[0] if state else 0
+
+            changed = [row_id for row_id, digest in digests.items() if known.get(row_id) != digest]
+            removed = [row_id for row_id in known if row_id not in current]
+            now = time.time()
+            if not changed and not removed:
+                if state is None:
+                    conn.execute(
+                        "INSERT INTO scopes (scope, version, floor, touched) VALUES (?, 0, 0, ?)", (scope, now)
+                    )
+                else:
+                    conn.execute("UPDATE scopes SET touched = ? WHERE scope = ?", (now, scope))
+                return version
+
+            version += 1
+            conn.executemany(
+                "INSERT OR REPLACE INTO rows (scope, row_id, digest, payload) VALUES (?, ?, ?, ?)",
+                [(scope, row_id, digests[row_id], pickle.dumps(current[row_id])) for row_id in changed],
+            )
+            conn.executemany(
+                "DELETE FROM rows WHERE scope = ? AND row_id = ?", [(scope, row_id) for row_id in removed]
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO changes (scope, version, row_id, removed) VALUES (?, ?, ?, ?)",
+                [(scope, version, row_id, 0) for row_id in changed]
+                + [(scope, version, row_id, 1) for row_id in removed],
+            )
+
+            # Keep the log bounded; cursors below the floor get a full reset
+            oldest = conn.execute(
+                "SELECT MIN(version) FROM (SELECT DISTINCT version FROM changes WHERE scope = ? "
+                "ORDER BY version DESC LIMIT ?)", (scope, self.max_changes)
+            ).fetchone()[0]
+            conn.execute("DELETE FROM changes WHERE scope = ? AND version < ?", (scope, oldest))
+            conn.execute(
+                "INSERT OR REPLACE INTO scopes (scope, version, floor, touched) VALUES (?, ?, ?, ?)",
+                (scope, version, oldest - 1, now),
+            )
+
+        self._records += 1
+        if self._records % PRUNE_EVERY == 0:
+            self.prune()
+        return version
+
+    def since(self, scope: str, cursor: Optional[str]) -> Dict[str, Any]:
+        """
+        Rows of a scope that changed after a cursor
+
+        Returns:
+            {'version', 'full', 'changed', 'removed'}; 'full' is True when the
+            cursor is unknown or too old and 'changed' then holds every row
+        """
+        conn = self._conn()
+        state = conn.execute(
+            "SELECT version, floor FROM scopes WHERE scope = ?", (scope,)
+        ).fetchone()
+        version, floor = state if state else (0, 0)
+        try:
+            after = int(cursor)
+        except (TypeError, ValueError):
+            after = -1
+
+        if after < floor or after > version:
+            rows = conn.execute(
+                "SELECT row_id, payload FROM rows WHERE scope = ?", (scope,)
+            ).fetchall()
+            return {
+                "version": version,
+                "full": True,
+                "changed": [dict(pickle.loads(payload), row_id=row_id) for row_id, payload in rows],
+                "removed": [],
+            }
+
+        latest: Dict[str, int] = {}
+        for row_id, removed in conn.execute(
+            "SELECT row_id, removed FROM changes WHERE scope = ? AND version > ? ORDER BY version",
+            (scope, after),
+        ):
+            latest[row_id] = removed
+
+        changed_ids = [row_id for row_id, removed in latest.items() if not removed]
+        changed: List[Dict[str, Any]] = []
+        if changed_ids:
+            placeholders = ",".join("?" * len(changed_ids))
+            for row_id, payload in conn.execute(
+                f"SELECT row_id, payload FROM rows WHERE scope = ? AND row_id IN ({placeholders})",
+                [scope] + changed_ids,
+            ):
+                changed.append(dict(pickle.loads(payload), row_id=row_id))
+        return {
+            "version": version,
+            "full": False,
+            "changed": changed,
+            "removed": [row_id for row_id, removed in latest.items() if removed],
+        }
+
+    def prune(self, max_age: float = SCOPE_TTL):
+        """Drop scopes that have not been recorded for max_age seconds"""
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            stale = [row[0] for row in conn.execute(
+                "SELECT scope FROM scopes WHERE touched < ?", (time.time() - max_age,)
+            )]
+            for table in ("rows", "changes", "scopes"):
+                conn.executemany(f"DELETE FROM {table} WHERE scope = ?", [(scope,) for scope in stale])
+
+
+change_log = ChangeLog()
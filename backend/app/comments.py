@@ -0,0 +1,183 @@
+"""
+Comments store.
+
+Comments used to live in one pipe-delimited ``*_comments.txt`` file per run,
+which every status scan opened just to count lines. They are now kept in a
+local SQLite file keyed by (date, target), where target is ``obj/filt`` for
+science runs and the unit for masterframes, with a counts table updated on
+every write so a scan gets all counts of a night in one query.
+
+Existing files are imported once with
+
+    python -m app.comments /tmp/pipeline/comments /lyman/data2/processed
+"""
+
+import os
+import re
+import glob
+import argparse
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .cache import SQLiteStore
+
+COMMENTS_PATH = os.getenv("PIPELINE_COMMENTS_PATH", "/tmp/pipeline/comments.sqlite")
+COMMENTS_SUFFIX = "_comments.txt"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS comments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    target TEXT NOT NULL,
+    author TEXT NOT NULL,
+    datetime TEXT NOT NULL,
+    text TEXT NOT NULL,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS comments_key_idx ON comments (date, target);
+CREATE TABLE IF NOT EXISTS comment_counts (
+    date TEXT NOT NULL,
+    target TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (date, target)
+);
+CREATE TABLE IF NOT EXISTS imported_files (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL
+);
+"""
+
+_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def science_target(obj: str, filt: str) -> str:
+    return f"{obj}/{filt}"
+
+
+def key_from_file(comments_file: str) -> Optional[Tuple[str, str]]:
+    """
+    (date, target) of a legacy comments file
+
+    '2025-10-15_7DT06_comments.txt' -> ('2025-10-15', '7DT06')
+    'T11334_m750_2025-10-21_comments.txt' -> ('2025-10-21', 'T11334/m750')
+    """
+    name = os.path.basename(comments_file)
+    if name.endswith(COMMENTS_SUFFIX):
+        name = name[:-len(COMMENTS_SUFFIX)]
+    match = _DATE_RE.search(name)
+    if not match:
+        return None
+    date = match.group(0)
+    if match.start() == 0:
+        return date, name[match.end():].strip("_")
+    prefix = name[:match.start()].rstrip("_")
+    if "_" not in prefix:
+        return None
+    obj, filt = prefix.rsplit("_", 1)
+    return date, science_target(obj, filt)
+
+
+class CommentStore(SQLiteStore):
+    """Comments keyed by (date, target) with maintained per-row counts"""
+
+    schema = _SCHEMA
+
+    def __init__(self, path: str = COMMENTS_PATH):
+        super().__init__(path)
+
+    def add(self, date: str, target: str, author: str, datetime: str, text: str):
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO comments (date, target, author, datetime, text) VALUES (?, ?, ?, ?, ?)",
+                (date, target, author, datetime, text),
+            )
+            conn.execute(
+                "INSERT INTO comment_counts (date, target, count) VALUES (?, ?, 1) "
+                "ON CONFLICT (date, target) DO UPDATE SET count = count + 1",
+                (date, target),
+            )
+
+    def get(self, date: str, target: str) -> List[Dict[str, str]]:
+        rows = self._conn().execute(
+            "SELECT author, datetime, text FROM comments WHERE date = ? AND target = ? ORDER BY id",
+            (date, target),
+        )
+        return [{"author": author, "datetime": dt, "text": text} for author, dt, text in rows]
+
+    def count(self, date: str, target: str) -> int:
+        row = self._conn().execute(
+            "SELECT count FROM comment_counts WHERE date = ? AND target = ?", (date, target)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def counts_for_date(self, date: str) -> Dict[str, int]:
+        """Comment counts of every row of a date, {target: count}"""
+        return dict(self._conn().execute(
+            "SELECT target, count FROM comment_counts WHERE date = ?", (date,)
+        ).fetchall())
+
+    def import_file(self, comments_file: str) -> int:
+        """
+        Import a legacy comments file once (skipped if unchanged since last import)
+
+        Returns:
+            Number of comments imported
+        """
+        key = key_from_file(comments_file)
+        if key is None:
+            return 0
+        date, target = key
+        mtime = os.path.getmtime(comments_file)
+        conn = self._conn()
+        row = conn.execute("SELECT mtime FROM imported_files WHERE path = ?", (comments_file,)).fetchone()
+        if row and row[0] == mtime:
+            return 0
+
+        comments = []
+        with open(comments_file, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.strip().split("|", 2)
+                if len(parts) != 3:
+                    continue  # Skip malformed lines
+                comments.append(tuple(parts))
+
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Re-importing a changed file replaces what was imported from it
+            conn.execute("DELETE FROM comments WHERE source = ?", (comments_file,))
+            conn.executemany(
+                "INSERT INTO comments (date, target, author, datetime, text, source) VALUES (?, ?, ?, ?, ?, ?)",
+                [(date, target, author, dt, text, comments_file) for author, dt, text in comments],
+            )
+            conn.execute("DELETE FROM comment_counts WHERE date = ? AND target = ?", (date, target))
+            conn.execute(
+                "INSERT INTO comment_counts (date, target, count) "
+                "SELECT date, target, COUNT(*) FROM comments WHERE date = ? AND target = ? GROUP BY date, target",
+                (date, target),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO imported_files (path, mtime) VALUES (?, ?)", (comments_file, mtime)
+            )
+        return len(comments)
+
+    def import_folders(self, folders: Iterable[str]) -> int:
+        total = 0
+        for folder in folders:
+            for comments_file in glob.glob(os.path.join(folder, "**", f"*{COMMENTS_SUFFIX}"), recursive=True):
+                try:
+                    total += self.import_file(comments_file)
+                except Exception as e:
+                    print(f"Failed to import {comments_file}: {e}")
+        return total
+
+
+comment_store = CommentStore()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import *_comments.txt files into the comments store.")
+    parser.add_argument("folders", nargs="+", help="Folders to search for comments files.")
+    args = parser.parse_args()
+    n = comment_store.import_folders(args.folders)
+    print(f"Imported {n} comments into {COMMENTS_PATH}")
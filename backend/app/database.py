@@ -5,43 +5,330 @@ Provides access to the pipeline database using the existing database services.
 
 import os
 import sys
+import time
+import threading
+from contextlib import contextmanager
 from typing import List, Dict, Optional, Union, Any
 from datetime import date, datetime
 import json
 
-# Add the pipeline path to sys.path to import the database services
-pipeline_path = "/home/7dt/pipeline"
-if pipeline_path not in sys.path:
-    sys.path.insert(0, pipeline_path)
+from .cache import Uncacheable, cached, make_key, query_cache
+
+# Maximum number of concurrent queries per worker process (a semaphore around
+# the one shared gppy handler, not a pool of connections)
+POOL_SIZE = int(os.getenv("PIPELINE_DB_POOL_SIZE", "4"))
+# Seconds a request waits for a free slot before giving up
+POOL_TIMEOUT = float(os.getenv("PIPELINE_DB_POOL_TIMEOUT", "5"))
+# Seconds between liveness checks of an established connection
+HEALTH_CHECK_INTERVAL = float(os.getenv("PIPELINE_DB_HEALTH_CHECK", "30"))
+# Reconnect backoff: RETRY_BASE * 2**(failures - 1), capped at RETRY_MAX
+RETRY_BASE = 1.0
+RETRY_MAX = 60.0
+# Checkout of the pipeline providing gppy's database services. gppy is only
+# imported when the first connection is opened (see _database_handler), so
+# importing this module stays cheap for workers that never touch the DB.
+PIPELINE_PATH = os.getenv("PIPELINE_GPPY_PATH", "/home/7dt/pipeline")
+# Seconds query results stay in the shared cache (see cache.py)
+PIPELINE_CACHE_TTL = 30.0
+QA_CACHE_TTL = 300.0
+
+
+# Columns of get_enhanced_qa_records (as in test/bias.json): QA record columns
+# joined with the status columns of its pipeline_process row (pipeline_id_id)
+QA_TYPES = {'bias', 'dark', 'flat', 'science'}
+QA_PAGE_SIZE = 5000
+_PIPELINE_COLUMNS = {'run_date', 'unit', 'data_type', 'progress', 'status'}
+# Table behind get_enhanced_qa_records. gppy owns the schema, so the name is
+# configurable and checked against information_schema (see _require_columns);
+# sql/qa_indexes.sql adds the index get_qa_plot_page relies on
+QA_TABLE = os.getenv("PIPELINE_QA_TABLE", "pipeline_qa")
+_QA_KEY_COLUMNS = ['id', 'qa_type', 'pipeline_id_id', 'created_at']
+QA_COLUMNS = {
+    col: (f"p.{col}" if col in _PIPELINE_COLUMNS else f"q.{col}")
+    for col in [
+        'id', 'qa_id', 'qa_type', 'imagetyp', 'filename', 'filter', 'object', 'exptime',
+        'clipmed', 'clipstd', 'clipmin', 'clipmax', 'uniform', 'nhotpix', 'ntotpix',
+        'sigmean', 'edgevar', 'trimmed', 'sanity', 'seeing', 'ellipticity', 'ellipmn',
+        'awincrmn', 'astrometric_offset', 'pa_align', 'rotang1', 'rsep_p95', 'rsep_q2',
+        'rsep_rms', 'skysig', 'skyval', 'stdnumb', 'ul5_5', 'unmatch', 'zp_auto', 'ezp_auto',
+        'pipeline_id_id', 'created_at', 'updated_at',
+        'run_date', 'unit', 'data_type', 'progress', 'status',
+    ]
+}
+# Raw frame table read by gppy's RawImageQuery. gppy owns the schema, so the
+# names are configurable and checked against information_schema before they
+# are queried (see _require_columns)
+RAW_TABLE = os.getenv("PIPELINE_RAW_TABLE", "raw_image")
+RAW_DATE_COLUMN = os.getenv("PIPELINE_RAW_DATE_COLUMN", "obs_date")
+RAW_TYPE_COLUMN = os.getenv("PIPELINE_RAW_TYPE_COLUMN", "image_type")
+RAW_UNIT_COLUMN = os.getenv("PIPELINE_RAW_UNIT_COLUMN", "unit")
+RAW_TYPES = ['sci', 'bias', 'dark', 'flat']
+RAW_CACHE_TTL = 300.0
+RAW_MAX_DAYS = 92
+
+
+_handler_class = None
+
+
+def _database_handler():
+    """gppy's DatabaseHandler class, imported on first call"""
+    global _handler_class
+    if _handler_class is None:
+        if PIPELINE_PATH not in sys.path:
+            sys.path.insert(0, PIPELINE_PATH)
+        from gppy.services.database import DatabaseHandler
+        _handler_class = DatabaseHandler
+    return _handler_class
+
+
+class PoolTimeout(Exception):
+    """Raised when no database slot becomes free within the pool timeout"""
+
+
+class DatabaseUnavailable(Exception):
+    """Raised when a query cannot be answered: no connection, a query error or a schema mismatch"""
+
+
+def _ident(name: str) -> str:
+    """Quoted SQL identifier of a configured table or column name"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _decode_json_list(value: Any) -> List[Any]:
+    """Decode a json/jsonb array column (list from jsonb, str from json)"""
+    if isinstance(value, list):
+        return value
+    if isinstance(value, str) and value:
+        return json.loads(value)
+    return []
+
+
+def _encode_cursor(created_at: Any, record_id: Any) -> str:
+    """Keyset cursor for (created_at, id)"""
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    return f"{created_at}|{record_id}"
+
+
+def _decode_cursor(cursor: str):
+    created_at, _, record_id = cursor.rpartition("|")
+    if not created_at:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return created_at, int(record_id)
 
-from gppy.services.database import (
-    DatabaseHandler,
-    RawImageQuery,
-)
 
 class DatabaseConnection:
-    """Database connection wrapper for the web pipeline backend"""
+    """
+    Database connection wrapper for the web pipeline backend
+
+    Nothing is opened at construction time. The handler is created on first
+    use, checked periodically with ``SELECT 1`` and recreated with exponential
+    backoff after a failure, so a DB outage never needs a worker restart.
+
+    This limits concurrency, it is not a connection pool: each worker shares
+    one gppy handler, and a semaphore of ``pool_size`` slots bounds how many
+    queries use it at once. ``_lock`` only guards state and stats; health
+    probes and reconnects run outside it, one thread at a time.
+    """
     
-    def __init__(self):
-        """Initialize database connection"""
+    def __init__(self, pool_size: int = POOL_SIZE, pool_timeout: float = POOL_TIMEOUT,
+                 health_check_interval: float = HEALTH_CHECK_INTERVAL):
+        """Initialize database connection state (connects lazily)"""
         self.db_handler = None
         self.pipeline_db = None
         self.qa_db = None
-        self.is_connected = False
-        
-        if DatabaseHandler is not None:
-            try:
-                self.db_handler = DatabaseHandler()
-                self.pipeline_db = self.db_handler.pipeline_db
-                self.qa_db = self.db_handler.qa_db
-                self.is_connected = True
-                print("Database connection established successfully")
-            except Exception as e:
-                print(f"Failed to establish database connection: {e}")
-                self.is_connected = False
-        else:
-            print("Database services not available")
+        # Columns per table, read from information_schema once per connection
+        self._columns: Dict[str, set] = {}
+
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+        self.health_check_interval = health_check_interval
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._failures = 0
+        self._next_retry = 0.0
+        self._last_check = 0.0
+        # Set while one thread runs the health probe or reconnect
+        self._probing = False
+        self._stats = {
+            'connects': 0,
+            'connect_failures': 0,
+            'health_check_failures': 0,
+            'checkouts': 0,
+            'checkout_timeouts': 0,
+            'in_use': 0,
+            'wait_total': 0.0,
+            'wait_max': 0.0,
+        }
+
+    @property
+    def is_connected(self) -> bool:
+        """True if the database is usable, connecting or reconnecting if due"""
+        return self._ensure_connected()
+
+    def _ensure_connected(self) -> bool:
+        now = time.monotonic()
+        if self.db_handler is not None and now - self._last_check < self.health_check_interval:
+            return True
+
+        # Claim the probe under the lock but run it without holding the lock,
+        # so a slow or hanging database does not stall every other thread
+        with self._lock:
+            now = time.monotonic()
+            pipeline_db = self.pipeline_db if self.db_handler is not None else None
+            if pipeline_db is not None and now - self._last_check < self.health_check_interval:
+                return True
+            if self._probing:
+                # Another thread is probing; go by the current state meanwhile
+                return pipeline_db is not None
+            if pipeline_db is None and now < self._next_retry:
+                return False
+            self._probing = True
+
+        try:
+            if pipeline_db is not None:
+                healthy = self._health_check(pipeline_db)
+                with self._lock:
+                    if healthy:
+                        self._last_check = time.monotonic()
+                        return True
+                    self._stats['health_check_failures'] += 1
+                    self._reset("health check failed")
+            return self._connect()
+        finally:
+            with self._lock:
+                self._probing = False
+
+    def _connect(self) -> bool:
+        # Runs outside self._lock (see _ensure_connected); only the bookkeeping takes it
+        try:
+            # A missing gppy is treated like an unreachable database: retried with backoff
+            db_handler = _database_handler()()
+        except Exception as e:
+            with self._lock:
+                self._failures += 1
+                self._stats['connect_failures'] += 1
+                delay = min(RETRY_BASE * 2 ** (self._failures - 1), RETRY_MAX)
+                self._next_retry = time.monotonic() + delay
+            print(f"Failed to establish database connection: {e} (retry in {delay:.0f}s)")
+            return False
+
+        with self._lock:
+            # Handlers first: readers take db_handler being set to mean connected
+            self.pipeline_db = db_handler.pipeline_db
+            self.qa_db = db_handler.qa_db
+            self.db_handler = db_handler
+            self._failures = 0
+            self._last_check = time.monotonic()
+            self._stats['connects'] += 1
+        print("Database connection established successfully")
+        return True
+
+    def _health_check(self, pipeline_db) -> bool:
+        try:
+            with pipeline_db.get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                    cur.fetchone()
+            return True
+        except Exception as e:
+            print(f"Database health check failed: {e}")
+            return False
+
+    def _reset(self, reason: str):
+        # Callers hold self._lock; queries keep their local reference to the old handler
+        print(f"Dropping database connection: {reason}")
+        self.db_handler = None
+        self.pipeline_db = None
+        self.qa_db = None
+        self._columns = {}
+        self._next_retry = 0.0
+
+    def _request_health_check(self):
+        """Force a liveness check on next use, e.g. after a query error"""
+        self._last_check = 0.0
+
+    def _handler(self, name: str = 'pipeline_db'):
+        """
+        pipeline_db or qa_db if connected, else None
+
+        Callers keep the returned reference for the whole query instead of
+        reading the attribute again, which a concurrent _reset may clear.
+        """
+        return getattr(self, name) if self.is_connected else None
+
+    def _table_columns(self, pipeline_db, table: str) -> set:
+        """Columns of a table (empty if it does not exist), read once per connection"""
+        columns = self._columns.get(table)
+        if columns is None:
+            with self.connection(pipeline_db) as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        "SELECT column_name FROM information_schema.columns "
+                        "WHERE table_schema = current_schema() AND table_name = %s", [table]
+                    )
+                    columns = {row[0] for row in cur.fetchall()}
+            self._columns[table] = columns
+        return columns
+
+    def _require_columns(self, pipeline_db, table: str, columns: List[str]):
+        """Raise DatabaseUnavailable unless the table has all the given columns"""
+        missing = [col for col in columns if col not in self._table_columns(pipeline_db, table)]
+        if missing:
+            raise DatabaseUnavailable(f"Table {table} has no column {', '.join(missing)}")
+
+    @contextmanager
+    def _checkout(self):
+        """Hold one of the pool slots for the duration of a query"""
+        start = time.monotonic()
+        if not self._slots.acquire(timeout=self.pool_timeout):
+            with self._lock:
+                self._stats['checkout_timeouts'] += 1
+            raise PoolTimeout(f"No database slot free after {self.pool_timeout}s")
+        waited = time.monotonic() - start
+        with self._lock:
+            self._stats['checkouts'] += 1
+            self._stats['in_use'] += 1
+            self._stats['wait_total'] += waited
+            self._stats['wait_max'] = max(self._stats['wait_max'], waited)
+        try:
+            yield
+        except Exception:
+            self._request_health_check()
+            raise
+        finally:
+            with self._lock:
+                self._stats['in_use'] -= 1
+            self._slots.release()
+
+    @contextmanager
+    def connection(self, pipeline_db=None):
+        """Check out a raw pipeline DB connection (of the given handler, default the current one)"""
+        pipeline_db = pipeline_db or self.pipeline_db
+        if pipeline_db is None:
+            raise ConnectionError("Not connected to the pipeline database")
+        with self._checkout():
+            with pipeline_db.get_connection() as conn:
+                yield conn
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Slot count, usage and wait-time metrics for this worker"""
+        with self._lock:
+            stats = dict(self._stats)
+        checkouts = stats['checkouts']
+        stats.update({
+            'pid': os.getpid(),
+            'pool_size': self.pool_size,
+            'pool_timeout': self.pool_timeout,
+            'connected': self.db_handler is not None,
+            'consecutive_failures': self._failures,
+            'retry_in': max(0.0, self._next_retry - time.monotonic()) if self.db_handler is None else 0.0,
+            'wait_mean': stats['wait_total'] / checkouts if checkouts else 0.0,
+        })
+        return stats
     
+    @cached('get_pipeline_data', ttl=PIPELINE_CACHE_TTL, tags=lambda date, *args, **kwargs: [f"pipeline:{date}"])
     def get_pipeline_data(self, date: str, masterframe: bool = False, 
                          unit: Optional[str] = None, obj: Optional[str] = None, 
                          filt: Optional[str] = None, mf_type: Optional[str] = None) -> List[Dict[str, Any]]:
@@ -59,74 +346,15 @@ class DatabaseConnection:
         Returns:
             List of pipeline data dictionaries
         """
-        if not self.is_connected or not self.pipeline_db:
-            return []
+        pipeline_db = self._handler()
+        if not pipeline_db:
+            raise Uncacheable([])
         
         try:
             if masterframe:
-                # Query masterframe data
-                filters = {
-                    'run_date': date,
-                    'data_type': 'masterframe'
-                }
-                if unit:
-                    filters['unit'] = unit
-                
-                pipeline_records = self.pipeline_db.read_pipeline_data(**filters)
-                
-                record_list = pipeline_records if isinstance(pipeline_records, list) else [pipeline_records]
-                
-                # Fix dark/flat parsing - psycopg returns jsonb as lists, but from_row doesn't handle it correctly
-                # So we need to get the raw values from the database
-                records_dict = []
-                for record in record_list:
-                    record_dict = record.to_dict()
-                    
-                    # Fix dark/flat arrays by querying raw database values
-                    # The ORM's from_row method doesn't correctly parse jsonb that's already a list
-                    try:
-                        pipeline_id = getattr(record, 'id', None)
-                        if pipeline_id:
-                            # Query raw database to get actual dark/flat values
-                            with self.pipeline_db.get_connection() as conn:
-                                with conn.cursor() as cur:
-                                    cur.execute(
-                                        "SELECT dark, flat FROM pipeline_process WHERE id = %s",
-                                        (pipeline_id,)
-                                    )
-                                    result = cur.fetchone()
-                                    if result:
-                                        dark_raw, flat_raw = result
-                                        # Handle both list (from jsonb) and string (json) formats
-                                        if isinstance(dark_raw, list):
-                                            record_dict['dark'] = dark_raw
-                                        elif isinstance(dark_raw, str) and dark_raw:
-                                            record_dict['dark'] = json.loads(dark_raw)
-                                        else:
-                                            record_dict['dark'] = []
-                                        
-                                        if isinstance(flat_raw, list):
-                                            record_dict['flat'] = flat_raw
-                                        elif isinstance(flat_raw, str) and flat_raw:
-                                            record_dict['flat'] = json.loads(flat_raw)
-                                        else:
-                                            record_dict['flat'] = []
-                    except Exception as e:
-                        # If query fails, use whatever is in the record (may be empty)
-                        print(f"Warning: Could not fix dark/flat for pipeline_id={pipeline_id}: {e}")
-                    
-                    records_dict.append(record_dict)
-                
-                # If filtering by type (dark/flat), filter by array contents
-                if mf_type and mf_type.lower() in ['dark', 'flat']:
-                    type_key = mf_type.lower()
-                    filtered_records = [
-                        record for record in records_dict
-                        if isinstance(record.get(type_key), list) and len(record.get(type_key, [])) > 0
-                    ]
-                    return filtered_records
-                
-                return records_dict
+                # Query masterframe data in one round trip, decoding dark/flat
+                # directly from the row instead of re-querying each record
+                return self._read_masterframe_rows(pipeline_db, date, unit=unit, mf_type=mf_type)
             else:
                 # Query science data
                 filters = {
@@ -138,7 +366,8 @@ class DatabaseConnection:
                 if filt:
                     filters['filt'] = filt
                 
-                pipeline_records = self.pipeline_db.read_pipeline_data(**filters)
+                with self._checkout():
+                    pipeline_records = pipeline_db.read_pipeline_data(**filters)
                 
                 if isinstance(pipeline_records, list):
                     return [record.to_dict() for record in pipeline_records]
@@ -149,9 +378,43 @@ class DatabaseConnection:
                     
         except Exception as e:
             print(f"Error querying pipeline data: {e}")
-            return []
+            raise Uncacheable([])
     
     
+    def _read_masterframe_rows(self, pipeline_db, date: str, unit: Optional[str] = None,
+                               mf_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Read masterframe rows of pipeline_process with a single query
+
+        The ORM's from_row does not parse jsonb that psycopg already returns
+        as a list, so rows are decoded here. The dark/flat filter is applied
+        in SQL rather than on the fetched records.
+        """
+        query = "SELECT * FROM pipeline_process WHERE run_date = %s AND data_type = %s"
+        params: List[Any] = [date, 'masterframe']
+        if unit:
+            query += " AND unit = %s"
+            params.append(unit)
+        if mf_type and mf_type.lower() in ['dark', 'flat']:
+            column = mf_type.lower()
+            query += (f" AND jsonb_typeof({column}::jsonb) = 'array'"
+                      f" AND {column}::jsonb <> '[]'::jsonb")
+        query += " ORDER BY id"
+
+        with self.connection(pipeline_db) as conn:
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                columns = [desc[0] for desc in cur.description]
+                rows = cur.fetchall()
+
+        records_dict = []
+        for row in rows:
+            record_dict = dict(zip(columns, row))
+            record_dict['dark'] = _decode_json_list(record_dict.get('dark'))
+            record_dict['flat'] = _decode_json_list(record_dict.get('flat'))
+            records_dict.append(record_dict)
+        return records_dict
+    
     def get_raw_data_status(self, date: str) -> bool:
         """
         Check if raw data exists for a given date using database query
@@ -160,26 +423,95 @@ class DatabaseConnection:
             date: Date string in YYYY-MM-DD format
             
         Returns:
-            True if raw data exists, False otherwise
+            True if raw data exists, False otherwise (also if the database is unavailable)
         """
-        if not self.is_connected or not RawImageQuery:
+        pipeline_db = self._handler()
+        if not pipeline_db:
             return False
-        
         try:
-            # Query for any raw images on the given date
-            query = RawImageQuery().on_date(date).of_types(['sci', 'bias', 'dark', 'flat'])
-            results = query.fetch()
-            
-            # Check if any results exist
-            for img_type, files in results.items():
-                if files:
-                    return True
-            return False
-            
+            self._require_columns(pipeline_db, RAW_TABLE, [RAW_DATE_COLUMN, RAW_TYPE_COLUMN])
+            # Ask only for existence instead of fetching every raw frame
+            query = (f"SELECT EXISTS (SELECT 1 FROM {_ident(RAW_TABLE)} "
+                     f"WHERE {_ident(RAW_DATE_COLUMN)} >= %s::date "
+                     f"AND {_ident(RAW_DATE_COLUMN)} < %s::date + 1 "
+                     f"AND {_ident(RAW_TYPE_COLUMN)} = ANY(%s))")
+            with self.connection(pipeline_db) as conn:
+                with conn.cursor() as cur:
+                    cur.execute(query, (date, date, RAW_TYPES))
+                    return bool(cur.fetchone()[0])
         except Exception as e:
             print(f"Error checking raw data status: {e}")
             return False
+
+    def get_raw_data_counts(self, dates: Optional[List[str]] = None, start_date: Optional[str] = None,
+                            end_date: Optional[str] = None) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """
+        Count raw frames per date, type and unit in one grouped query
+
+        Args:
+            dates: Explicit list of dates in YYYY-MM-DD format
+            start_date: Start of a date range (inclusive), used if dates is None
+            end_date: End of a date range (inclusive), used if dates is None
+
+        Returns:
+            {date: {type: {unit: count}}}, dates without raw data are omitted
+
+        Raises:
+            ValueError: For malformed dates or a span of more than RAW_MAX_DAYS days
+            DatabaseUnavailable: If the counts cannot be read (nothing is cached then)
+        """
+        if dates is not None:
+            dates = sorted({datetime.strptime(day, '%Y-%m-%d').date().isoformat() for day in dates})
+            if not dates:
+                return {}
+            start_date, end_date = dates[0], dates[-1]
+        else:
+            start_date, end_date = start_date or end_date, end_date or start_date
+        first = datetime.strptime(start_date, '%Y-%m-%d').date()
+        last = datetime.strptime(end_date, '%Y-%m-%d').date()
+        if not 0 <= (last - first).days < RAW_MAX_DAYS:
+            raise ValueError(f"Dates must span 1 to {RAW_MAX_DAYS} days")
+
+        return query_cache.get_or_compute(
+            make_key('get_raw_data_counts', start_date, end_date, dates),
+            lambda: self._count_raw_frames(start_date, end_date, dates),
+            ttl=RAW_CACHE_TTL, tags=["raw"],
+        )
+
+    def _count_raw_frames(self, start_date: str, end_date: str,
+                          dates: Optional[List[str]]) -> Dict[str, Dict[str, Dict[str, int]]]:
+        pipeline_db = self._handler()
+        if not pipeline_db:
+            raise DatabaseUnavailable("Not connected to the pipeline database")
+        day_sql = _ident(RAW_DATE_COLUMN)
+        query = (f"SELECT {day_sql}::date, {_ident(RAW_TYPE_COLUMN)}, {_ident(RAW_UNIT_COLUMN)}, COUNT(*) "
+                 f"FROM {_ident(RAW_TABLE)} WHERE {_ident(RAW_TYPE_COLUMN)} = ANY(%s) "
+                 f"AND {day_sql} >= %s::date AND {day_sql} < %s::date + 1")
+        params: List[Any] = [RAW_TYPES, start_date, end_date]
+        if dates is not None:
+            query += f" AND {day_sql}::date = ANY(%s::date[])"
+            params.append(dates)
+        query += " GROUP BY 1, 2, 3"
+
+        try:
+            self._require_columns(pipeline_db, RAW_TABLE, [RAW_DATE_COLUMN, RAW_TYPE_COLUMN, RAW_UNIT_COLUMN])
+            with self.connection(pipeline_db) as conn:
+                with conn.cursor() as cur:
+                    cur.execute(query, params)
+                    rows = cur.fetchall()
+        except DatabaseUnavailable:
+            raise
+        except Exception as e:
+            print(f"Error counting raw data: {e}")
+            raise DatabaseUnavailable(f"Error counting raw data: {e}") from e
+
+        counts: Dict[str, Dict[str, Dict[str, int]]] = {}
+        for day, img_type, unit, count in rows:
+            day = day.isoformat() if isinstance(day, (date, datetime)) else str(day)
+            counts.setdefault(day, {}).setdefault(img_type, {})[str(unit)] = count
+        return counts
     
+    @cached('get_qa_plot_data', ttl=QA_CACHE_TTL, tags=lambda qa_type, *args, **kwargs: ["qa", f"qa:{qa_type}"])
     def get_qa_plot_data(self, qa_type: str) -> List[Dict[str, Any]]:
         """
         Get QA data for plotting purposes
@@ -190,66 +522,132 @@ class DatabaseConnection:
         Returns:
             List of QA data dictionaries formatted for plotting
         """
-        if not self.is_connected or not self.qa_db:
-            return []
+        qa_db = self._handler('qa_db')
+        if not qa_db:
+            raise Uncacheable([])
         
         try:
             # Validate qa_type
-            valid_types = {'bias', 'dark', 'flat', 'science'}
-            if qa_type not in valid_types:
+            if qa_type not in QA_TYPES:
                 return []
             
             # Get QA data
-            qa_records = self.qa_db.get_enhanced_qa_records(qa_type=qa_type)
+            with self._checkout():
+                qa_records = qa_db.get_enhanced_qa_records(qa_type=qa_type)
             
             return qa_records
                 
         except Exception as e:
             print(f"Error getting QA plot data: {e}")
-            return []
+            raise Uncacheable([])
     
-    def get_qa_plot_data_by_date_range(self, qa_type: str, start_date: str = None, end_date: str = None) -> List[Dict[str, Any]]:
+    @cached('get_qa_plot_page', ttl=QA_CACHE_TTL, tags=lambda qa_type, *args, **kwargs: ["qa", f"qa:{qa_type}"])
+    def get_qa_plot_page(self, qa_type: str, start_date: Optional[str] = None,
+                         end_date: Optional[str] = None, columns: Optional[List[str]] = None,
+                         limit: int = QA_PAGE_SIZE, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get one page of QA records within a date range
+
+        Dates bound ``created_at`` in SQL and pages are walked by keyset on
+        (created_at, id), so the cost depends on the window and page size,
+        not on the size of the QA table; the (qa_type, created_at, id) index
+        of sql/qa_indexes.sql keeps it off a full scan. Each page is cached
+        on its own, so no cache entry holds more than ``limit`` rows.
+
+        Args:
+            qa_type: Type of QA data ('bias', 'dark', 'flat', 'science')
+            start_date: Start date in YYYY-MM-DD format (inclusive)
+            end_date: End date in YYYY-MM-DD format (inclusive)
+            columns: Columns to return (default: all of QA_COLUMNS the database has)
+            limit: Maximum number of records in the page (at most QA_PAGE_SIZE)
+            cursor: ``next_cursor`` of the previous page
+
+        Returns:
+            Dictionary with 'records' and 'next_cursor' (None on the last page)
+
+        Raises:
+            DatabaseUnavailable: If QA_TABLE cannot be read (nothing is cached then)
+        """
+        if qa_type not in QA_TYPES:
+            return {'records': [], 'next_cursor': None}
+        pipeline_db = self._handler()
+        if not pipeline_db:
+            raise DatabaseUnavailable("Not connected to the pipeline database")
+        limit = max(1, min(int(limit), QA_PAGE_SIZE))
+        after = _decode_cursor(cursor) if cursor else None
+
+        try:
+            self._require_columns(pipeline_db, QA_TABLE, _QA_KEY_COLUMNS)
+            qa_columns = self._table_columns(pipeline_db, QA_TABLE)
+            available = [col for col in QA_COLUMNS if col in _PIPELINE_COLUMNS or col in qa_columns]
+            selected = [col for col in (columns or available) if col in available]
+            for key in ('created_at', 'id'):
+                if key not in selected:
+                    selected.append(key)
+            select_sql = ", ".join(QA_COLUMNS[col] for col in selected)
+
+            query = (f"SELECT {select_sql} FROM {_ident(QA_TABLE)} q "
+                     "JOIN pipeline_process p ON p.id = q.pipeline_id_id "
+                     "WHERE q.qa_type = %s")
+            params: List[Any] = [qa_type]
+            if start_date:
+                query += " AND q.created_at >= %s::date"
+                params.append(start_date)
+            if end_date:
+                query += " AND q.created_at < %s::date + interval '1 day'"
+                params.append(end_date)
+            if after:
+                query += " AND (q.created_at, q.id) > (%s, %s)"
+                params.extend(after)
+            query += " ORDER BY q.created_at, q.id LIMIT %s"
+            params.append(limit)
+
+            with self.connection(pipeline_db) as conn:
+                with conn.cursor() as cur:
+                    cur.execute(query, params)
+                    rows = cur.fetchall()
+        except DatabaseUnavailable:
+            raise
+        except Exception as e:
+            print(f"Error getting QA plot page: {e}")
+            raise DatabaseUnavailable(f"Error getting QA plot page: {e}") from e
+
+        records = [dict(zip(selected, row)) for row in rows]
+        next_cursor = None
+        if len(records) == limit:
+            last = records[-1]
+            next_cursor = _encode_cursor(last['created_at'], last['id'])
+        return {'records': records, 'next_cursor': next_cursor}
+
+    def get_qa_plot_data_by_date_range(self, qa_type: str, start_date: str = None, end_date: str = None,
+                                       columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """
         Get QA data for plotting within a date range
+
+        Walks get_qa_plot_page, so the window is cached page by page.
         
         Args:
-            qa_type: Type of QA data ('bias', 'dark', 'flat', 'bpmask')
+            qa_type: Type of QA data ('bias', 'dark', 'flat', 'science')
             start_date: Start date in YYYY-MM-DD format
             end_date: End date in YYYY-MM-DD format
+            columns: Columns to return (default: all of QA_COLUMNS the database has)
             
         Returns:
             List of QA data dictionaries formatted for plotting
+
+        Raises:
+            DatabaseUnavailable: If the QA table cannot be read
         """
-        if not self.is_connected or not self.qa_db:
-            return []
-        
-        try:
-            # For now, get all data and filter by date in Python
-            # In the future, this could be optimized with SQL date filtering
-            all_data = self.get_qa_plot_data(qa_type, limit=5000)
-            
-            if not all_data:
-                return []
-            
-            # Filter by date range if specified
-            filtered_data = []
-            for record in all_data:
-                if record.get('created_at'):
-                    record_date = record['created_at'][:10]  # Extract YYYY-MM-DD
-                    
-                    if start_date and record_date < start_date:
-                        continue
-                    if end_date and record_date > end_date:
-                        continue
-                    
-                    filtered_data.append(record)
-            
-            return filtered_data
-                
-        except Exception as e:
-            print(f"Error getting QA plot data by date range: {e}")
-            return []
+        records = []
+        cursor = None
+        while True:
+            page = self.get_qa_plot_page(qa_type, start_date=start_date, end_date=end_date,
+                                         columns=columns, cursor=cursor)
+            records.extend(page['records'])
+            cursor = page['next_cursor']
+            if not cursor:
+                return records
     
 
-# Global database connection instance
+# Global database connection instance (connects on first use)
 db_connection = DatabaseConnection()
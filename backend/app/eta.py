@@ -0,0 +1,273 @@
+"""
+Completion estimates for the scheduler queue.
+
+Each scheduler entry lists the jobs that wait for it in ``dependent_idx``
+(e.g. a preprocess job and the science jobs using its output). The DAG and
+the duration models are built once per scheduler snapshot version; an
+estimate then simulates the unfinished jobs on the worker pool:
+
+* a job becomes ready when every job listing it as dependent has finished
+  (a failed parent counts as finished, as it does for the scheduler);
+* free workers take ready jobs by descending priority, then index;
+* a job is expected to take the median duration of completed runs of the
+  same input_type and type, falling back to type, input_type and all runs.
+
+Completed runs are remembered per process across snapshots, so the models
+keep their history when old entries drop out of the scheduler file. The
+simulation is a heap-based list schedule, O(n log n) for n queued jobs.
+"""
+
+import os
+import json
+import heapq
+import statistics
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from .scheduler import RUNNING_STATUSES
+
+WORKERS = int(os.getenv("PIPELINE_SCHEDULER_WORKERS", "10"))
+DEFAULT_DURATION = float(os.getenv("PIPELINE_DEFAULT_JOB_DURATION", "600"))
+FINISHED_STATUSES = ("Completed", "Failed", "Cancelled")
+# Completed runs kept per duration model
+HISTORY_SIZE = 200
+
+
+def parse_dependents(value) -> List[int]:
+    """'[1, 2]' / [1, 2] / None -> [1, 2]"""
+    if value in (None, ""):
+        return []
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return []
+    if isinstance(value, int):
+        value = [value]
+    return [int(v) for v in value if isinstance(v, (int, float, str)) and str(v).lstrip("-").isdigit()]
+
+
+def _parse_time(value) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _model_keys(entry: Dict[str, Any]):
+    input_type, job_type = entry.get("input_type"), entry.get("type")
+    return (f"{input_type}/{job_type}", f"*/{job_type}", f"{input_type}/*", "*/*")
+
+
+class DurationModels:
+    """Median durations of completed runs, by input_type/type with fallbacks"""
+
+    def __init__(self, history_size: int = HISTORY_SIZE):
+        self.history_size = history_size
+        self._runs: Dict[str, deque] = {}
+        self._seen: Dict[tuple, None] = {}
+        self._medians: Dict[str, float] = {}
+
+    def add_runs(self, entries: List[Dict[str, Any]]):
+        added = False
+        for entry in entries:
+            if entry.get("status") != "Completed" or entry.get("duration") is None:
+                continue
+            run_id = (entry.get("config"), entry.get("index"), entry.get("process_start"))
+            if run_id in self._seen:
+                continue
+            self._seen[run_id] = None
+            for key in _model_keys(entry):
+                self._runs.setdefault(key, deque(maxlen=self.history_size)).append(float(entry["duration"]))
+            added = True
+        if added:
+            self._medians = {key: statistics.median(runs) for key, runs in self._runs.items()}
+            # Keep run ids bounded along with the histories (oldest first)
+            while len(self._seen) > 10 * self.history_size:
+                del self._seen[next(iter(self._seen))]
+
+    def expected(self, entry: Dict[str, Any]) -> float:
+        for key in _model_keys(entry):
+            if key in self._medians:
+                return self._medians[key]
+        return DEFAULT_DURATION
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {
+            key: {"median": self._medians[key], "count": len(runs)}
+            for key, runs in self._runs.items() if not key.startswith("*")
+        }
+
+
+class QueuePlan:
+    """Dependency DAG of the unfinished jobs of one scheduler snapshot"""
+
+    def __init__(self, entries: List[Dict[str, Any]], models: DurationModels):
+        self.jobs = {entry.get("index", i): entry for i, entry in enumerate(entries)}
+        self.unfinished = [
+            index for index, entry in self.jobs.items() if entry.get("status") not in FINISHED_STATUSES
+        ]
+        pending = set(self.unfinished)
+        self.children: Dict[Any, List[Any]] = {index: [] for index in self.unfinished}
+        self.parents: Dict[Any, List[Any]] = {index: [] for index in self.unfinished}
+        for index, entry in self.jobs.items():
+            if index not in pending:
+                continue
+            for child in parse_dependents(entry.get("dependent_idx")):
+                if child in pending and child != index:
+                    self.children[index].append(child)
+                    self.parents[child].append(index)
+        self.expected = {index: models.expected(self.jobs[index]) for index in self.unfinished}
+        self.order, self.blocked = self._topological_order()
+
+    def _topological_order(self):
+        indegree = {index: len(parents) for index, parents in self.parents.items()}
+        ready = deque(index for index, n in indegree.items() if n == 0)
+        order = []
+        while ready:
+            index = ready.popleft()
+            order.append(index)
+            for child in self.children[index]:
+                indegree[child] -= 1
+                if indegree[child] == 0:
+                    ready.append(child)
+        ordered = set(order)
+        return order, [index for index in self.unfinished if index not in ordered]
+
+    def remaining(self, now: datetime) -> Dict[Any, float]:
+        """Expected seconds left per unfinished job"""
+        remaining = {}
+        for index in self.unfinished:
+            entry = self.jobs[index]
+            left = self.expected[index]
+            if entry.get("status") in RUNNING_STATUSES:
+                started = _parse_time(entry.get("process_start"))
+                if started is not None:
+                    left = max(left - (now - started).total_seconds(), 0.0)
+            remaining[index] = left
+        return remaining
+
+    def critical_path(self, remaining: Dict[Any, float]) -> Dict[str, Any]:
+        """Longest chain of remaining work, regardless of worker count"""
+        finish: Dict[Any, float] = {}
+        via: Dict[Any, Any] = {}
+        for index in self.order:
+            start, best = 0.0, None
+            for parent in self.parents[index]:
+                if finish[parent] > start:
+                    start, best = finish[parent], parent
+            finish[index] = start + remaining[index]
+            via[index] = best
+        if not finish:
+            return {"indices": [], "seconds": 0.0}
+        index = max(finish, key=finish.get)
+        seconds = finish[index]
+        path = []
+        while index is not None:
+            path.append(index)
+            index = via[index]
+        return {"indices": path[::-1], "seconds": seconds}
+
+    def simulate(self, remaining: Dict[Any, float], workers: int) -> Dict[Any, Dict[str, float]]:
+        """Start and finish offsets (seconds from now) of every schedulable job"""
+        waiting = {index: len(parents) for index, parents in self.parents.items()}
+        schedule: Dict[Any, Dict[str, float]] = {}
+        events = []  # (finish, index)
+        ready = []  # (-priority, index)
+        free = workers
+
+        for index in self.order:
+            if self.jobs[index].get("status") in RUNNING_STATUSES:
+                schedule[index] = {"start": 0.0, "finish": remaining[index]}
+                heapq.heappush(events, (remaining[index], index))
+                free -= 1
+            elif waiting[index] == 0:
+                heapq.heappush(ready, (-(self.jobs[index].get("priority") or 0), index))
+
+        now = 0.0
+        while ready or events:
+            while free > 0 and ready:
+                _, index = heapq.heappop(ready)
+                schedule[index] = {"start": now, "finish": now + remaining[index]}
+                heapq.heappush(events, (now + remaining[index], index))
+                free -= 1
+            if not events:
+                break
+            now, index = heapq.heappop(events)
+            free += 1
+            for child in self.children[index]:
+                waiting[child] -= 1
+                if waiting[child] == 0:
+                    heapq.heappush(ready, (-(self.jobs[child].get("priority") or 0), child))
+        return schedule
+
+    def estimate(self, now: Optional[datetime] = None, workers: int = WORKERS) -> Dict[str, Any]:
+        now = now or datetime.now()
+        workers = max(int(workers), 1)
+        remaining = self.remaining(now)
+        schedule = self.simulate(remaining, workers)
+
+        jobs = []
+        for index in self.unfinished:
+            if index not in schedule:
+                continue
+            times = schedule[index]
+            entry = self.jobs[index]
+            jobs.append({
+                "index": index,
+                "status": entry.get("status"),
+                "type": entry.get("type"),
+                "input_type": entry.get("input_type"),
+                "priority": entry.get("priority"),
+                "expected_duration": self.expected[index],
+                "start_in": times["start"],
+                "finish_in": times["finish"],
+                "eta": (now + timedelta(seconds=times["finish"])).isoformat(),
+            })
+        jobs.sort(key=lambda job: (job["finish_in"], job["index"]))
+
+        queue_seconds = max((times["finish"] for times in schedule.values()), default=0.0)
+        return {
+            "now": now.isoformat(),
+            "workers": workers,
+            "jobs": jobs,
+            "queue_seconds": queue_seconds,
+            "queue_eta": (now + timedelta(seconds=queue_seconds)).isoformat(),
+            "critical_path": self.critical_path(remaining),
+            "blocked": self.blocked,
+        }
+
+
+class QueueEstimator:
+    """Rebuilds the plan once per scheduler snapshot version"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.models = DurationModels()
+        self._plans: Dict[tuple, QueuePlan] = {}
+
+    def plan(self, snapshot) -> QueuePlan:
+        snapshot.refresh()
+        key = (id(snapshot), snapshot.version)
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is None:
+                entries = snapshot.entries()
+                self.models.add_runs(entries)
+                plan = QueuePlan(entries, self.models)
+                self._plans = {key: plan}
+            return plan
+
+    def estimate(self, snapshot, now: Optional[datetime] = None, workers: int = WORKERS) -> Dict[str, Any]:
+        plan = self.plan(snapshot)
+        result = plan.estimate(now=now, workers=workers)
+        result["version"] = snapshot.version
+        result["models"] = self.models.summary()
+        return result
+
+
+queue_estimator = QueueEstimator()
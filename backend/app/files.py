@@ -0,0 +1,138 @@
+"""
+Delivery of data files (figures, masters) to the client.
+
+With X_ACCEL_REDIRECT enabled in the Flask config, the backend only
+validates the path and answers with an ``X-Accel-Redirect`` header; Nginx
+then sends the file itself (sendfile) from an internal location, so a slow
+download does not hold one of the uwsgi workers. Matching Nginx config:
+
+    location /_protected/data/ {
+        internal;
+        alias /lyman/data2/processed/;
+    }
+    location /_protected/master_frame/ {
+        internal;
+        alias /lyman/data2/master_frame/;
+    }
+"""
+
+import io
+import os
+import zipfile
+import mimetypes
+from typing import Iterable, Iterator, Optional
+from urllib.parse import quote
+
+from flask import current_app, send_file
+
+from .const import DATA_DIR, MASTERFRAME_DIR
+
+# Data roots and the internal Nginx location serving each of them
+DATA_ROOTS = (
+    (DATA_DIR, "/_protected/data/"),
+    (MASTERFRAME_DIR, "/_protected/master_frame/"),
+)
+IMMUTABLE_MAX_AGE = 31536000
+BUNDLE_CHUNK_SIZE = 256 * 1024
+
+
+def _root_of(path: str):
+    for root, location in DATA_ROOTS:
+        root = os.path.realpath(root)
+        if os.path.commonpath([root, path]) == root:
+            return root, location
+    return None, None
+
+
+def resolve_data_path(filename: Optional[str]) -> Optional[str]:
+    """
+    Resolve a file path under DATA_DIR or MASTERFRAME_DIR
+
+    Relative names are taken relative to each root in turn; absolute paths
+    must lie inside one of them.
+
+    Returns:
+        Real path of the file, or None if it is missing or outside the data roots
+    """
+    if not filename:
+        return None
+    for root, _ in DATA_ROOTS:
+        path = os.path.realpath(os.path.join(root, filename))
+        if _root_of(path)[0] and os.path.isfile(path):
+            return path
+    return None
+
+
+def send_data_file(path: str, mimetype: Optional[str] = None):
+    """
+    Send a resolved data file, through Nginx if X_ACCEL_REDIRECT is enabled
+
+    Args:
+        path: Path returned by resolve_data_path
+        mimetype: Content type (guessed from the name by default)
+    """
+    if not current_app.config.get("X_ACCEL_REDIRECT"):
+        return send_file(path, mimetype=mimetype)
+
+    root, location = _root_of(path)
+    if root is None:
+        raise ValueError(f"{path} is outside the data directories")
+
+    response = current_app.response_class()
+    response.headers["X-Accel-Redirect"] = location + quote(os.path.relpath(path, root))
+    response.headers["Content-Type"] = mimetype or mimetypes.guess_type(path)[0] or "application/octet-stream"
+    response.cache_control.public = True
+    response.cache_control.max_age = IMMUTABLE_MAX_AGE
+    response.cache_control.immutable = True
+    return response
+
+
+class _ChunkWriter(io.RawIOBase):
+    """Unseekable sink that hands written bytes back to a generator"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(paths: Iterable[str]) -> Iterator[bytes]:
+    """
+    Stream an uncompressed zip of the given files
+
+    The archive is written on the fly (data descriptors, no seeking), so
+    memory use stays at one chunk regardless of the number or size of files.
+    """
+    sink = _ChunkWriter()
+    names = set()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+        for path in paths:
+            name = os.path.basename(path)
+            stem, ext = os.path.splitext(name)
+            n = 1
+            while name in names:
+                name = f"{stem}_{n}{ext}"
+                n += 1
+            names.add(name)
+
+            info = zipfile.ZipInfo.from_file(path, arcname=name)
+            info.compress_type = zipfile.ZIP_STORED
+            with open(path, "rb") as src, zf.open(info, mode="w", force_zip64=True) as dst:
+                while True:
+                    chunk = src.read(BUNDLE_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+                    yield sink.take()
+            yield sink.take()
+    yield sink.take()
@@ -0,0 +1,222 @@
+"""
+Instrument log storage.
+
+The log is a snapshot (``inst-log.json``, {"events": [...]}) plus an
+append-only journal of changes next to it (``inst-log.journal``, one JSON
+line per added or deleted event). Writes take an exclusive flock and append
+only the events that changed, so their cost does not grow with the history.
+Once the journal passes COMPACT_BYTES it is folded into the snapshot in a
+background thread.
+
+Reads merge snapshot and journal under a shared lock. The merged events are
+cached per process and keyed by the snapshot's identity and the journal
+offset, so a read after a write only parses the new journal lines.
+"""
+
+import os
+import json
+import fcntl
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List
+
+from .metrics import count_cache
+
+COMPACT_BYTES = 256 * 1024
+
+
+def event_key(event: Dict[str, Any]) -> str:
+    """Events have no id; identical content means the same event"""
+    return json.dumps(event, sort_keys=True)
+
+
+def _apply(events: List[Dict[str, Any]], entry: Dict[str, Any]):
+    if entry.get("op") == "add":
+        events.append(entry["event"])
+    elif entry.get("op") == "delete":
+        key = event_key(entry["event"])
+        for i, event in enumerate(events):
+            if event_key(event) == key:
+                del events[i]
+                break
+
+
+class InstLog:
+    """Snapshot + journal store of instrument log events"""
+
+    def __init__(self, snapshot_path: str, compact_bytes: int = COMPACT_BYTES):
+        self.snapshot_path = snapshot_path
+        self.journal_path = os.path.splitext(snapshot_path)[0] + ".journal"
+        self.lock_path = self.journal_path + ".lock"
+        self.compact_bytes = compact_bytes
+        self._cache_lock = threading.Lock()
+        self._snapshot_id = None
+        self._offset = 0
+        self._events: List[Dict[str, Any]] = []
+        self._compacting = threading.Event()
+
+    @contextmanager
+    def _locked(self, mode):
+        os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _snapshot_identity(self):
+        try:
+            stat = os.stat(self.snapshot_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _read_snapshot(self) -> List[Dict[str, Any]]:
+        try:
+            with open(self.snapshot_path, "r") as f:
+                return json.load(f).get("events", [])
+        except FileNotFoundError:
+            return []
+
+    def _read_journal(self, offset: int):
+        """Journal entries after offset and the new offset (complete lines only)"""
+        entries = []
+        try:
+            with open(self.journal_path, "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # A write in progress; read it next time
+                    offset += len(line)
+                    if line.strip():
+                        entries.append(json.loads(line))
+        except FileNotFoundError:
+            pass
+        return entries, offset
+
+    def exists(self) -> bool:
+        return os.path.exists(self.snapshot_path) or os.path.exists(self.journal_path)
+
+    def events(self) -> List[Dict[str, Any]]:
+        """Current events (snapshot with the journal applied)"""
+        with self._locked(fcntl.LOCK_SH):
+            return self._current_events()
+
+    def _current_events(self) -> List[Dict[str, Any]]:
+        # Caller holds the file lock (shared or exclusive)
+        with self._cache_lock:
+            snapshot_id = self._snapshot_identity()
+            try:
+                journal_size = os.path.getsize(self.journal_path)
+            except FileNotFoundError:
+                journal_size = 0
+
+            count_cache("inst_log", snapshot_id == self._snapshot_id and journal_size == self._offset)
+            if snapshot_id != self._snapshot_id or journal_size < self._offset:
+                # First read, or the journal was compacted into a new snapshot
+                self._events = self._read_snapshot()
+                self._snapshot_id = snapshot_id
+                self._offset = 0
+            if journal_size > self._offset:
+                entries, self._offset = self._read_journal(self._offset)
+                for entry in entries:
+                    _apply(self._events, entry)
+            return list(self._events)
+
+    def append(self, add: Iterable[Dict[str, Any]] = (), delete: Iterable[Dict[str, Any]] = ()) -> int:
+        """
+        Append added and deleted events to the journal
+
+        Returns:
+            Number of journal entries written
+        """
+        with self._locked(fcntl.LOCK_EX):
+            written, journal_size = self._write(add, delete)
+        self._maybe_compact(journal_size)
+        return written
+
+    def _write(self, add: Iterable[Dict[str, Any]], delete: Iterable[Dict[str, Any]]):
+        """Journal entries written and the journal size; the caller holds LOCK_EX"""
+        lines = [json.dumps({"op": "delete", "event": event}) + "\n" for event in delete]
+        lines += [json.dumps({"op": "add", "event": event}) + "\n" for event in add]
+        if not lines:
+            return 0, 0
+        with open(self.journal_path, "a") as f:
+            f.write("".join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+        return len(lines), os.path.getsize(self.journal_path)
+
+    def _maybe_compact(self, journal_size: int):
+        if journal_size > self.compact_bytes and not self._compacting.is_set():
+            self._compacting.set()
+            threading.Thread(target=self._compact_in_background, daemon=True).start()
+
+    def replace(self, events: List[Dict[str, Any]]) -> int:
+        """
+        Store a full list of events by journaling only the difference
+
+        The read, the diff and the append happen under one exclusive lock,
+        so a concurrent write cannot slip in between and be undone.
+
+        Returns:
+            Number of journal entries written
+        """
+        with self._locked(fcntl.LOCK_EX):
+            current_events = self._current_events()
+            written, journal_size = self._write(*self._diff(current_events, events))
+        self._maybe_compact(journal_size)
+        return written
+
+    @staticmethod
+    def _diff(current_events: List[Dict[str, Any]], events: List[Dict[str, Any]]):
+        """(add, delete) that turn current_events into events"""
+        current = Counter(event_key(event) for event in current_events)
+        wanted = Counter(event_key(event) for event in events)
+        by_key = {event_key(event): event for event in events}
+        by_key_current = {event_key(event): event for event in current_events}
+
+        add = []
+        for key, n in (wanted - current).items():
+            add.extend([by_key[key]] * n)
+        delete = []
+        for key, n in (current - wanted).items():
+            delete.extend([by_key_current[key]] * n)
+        return add, delete
+
+    def compact(self):
+        """Fold the journal into the snapshot"""
+        with self._locked(fcntl.LOCK_EX):
+            events = self._read_snapshot()
+            entries, _ = self._read_journal(0)
+            if not entries:
+                return
+            for entry in entries:
+                _apply(events, entry)
+            tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"events": events}, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            open(self.journal_path, "w").close()
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        except Exception as e:
+            print(f"Failed to compact {self.journal_path}: {e}")
+        finally:
+            self._compacting.clear()
+
+
+_inst_logs: Dict[str, InstLog] = {}
+
+
+def get_inst_log(snapshot_path: str) -> InstLog:
+    """Per-process InstLog of a snapshot file (keeps its read cache)"""
+    if snapshot_path not in _inst_logs:
+        _inst_logs[snapshot_path] = InstLog(snapshot_path)
+    return _inst_logs[snapshot_path]
@@ -0,0 +1,196 @@
+"""
+Request and cache metrics in Prometheus text format.
+
+Each worker keeps plain in-memory counters (a few dict updates per
+request) and every FLUSH_INTERVAL seconds writes its cumulative totals to
+``<METRICS_SPOOL>/<pid>.json``. /api/metrics sums the spool files of all
+workers. Files of workers that have exited are folded into
+``retired.json`` so counters stay monotonic across worker recycling.
+
+Recorded:
+
+* pipeline_http_request_duration_seconds: latency histogram per route/method
+* pipeline_http_response_size_bytes: response size histogram per route/method
+* pipeline_http_requests_total: requests per route/method/status
+* pipeline_cache_requests_total: hits and misses per cache
+"""
+
+import os
+import json
+import time
+import fcntl
+import bisect
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+METRICS_SPOOL = os.getenv("PIPELINE_METRICS_SPOOL", "/tmp/pipeline/metrics-spool")
+FLUSH_INTERVAL = 5.0
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+
+_lock = threading.Lock()
+# (route, method) -> [bucket counts..., +Inf count, sum]
+_latency: Dict[Tuple[str, str], List[float]] = {}
+_size: Dict[Tuple[str, str], List[float]] = {}
+# (route, method, status) -> count
+_requests: Dict[Tuple[str, str, str], int] = {}
+# (cache, 'hit'|'miss') -> count
+_cache: Dict[Tuple[str, str], int] = {}
+_next_flush = 0.0
+
+
+def _observe(table, key, buckets, value):
+    histogram = table.get(key)
+    if histogram is None:
+        histogram = table[key] = [0] * (len(buckets) + 1) + [0.0]
+    histogram[bisect.bisect_left(buckets, value)] += 1
+    histogram[-1] += value
+
+
+def record_request(route: str, method: str, status: int, seconds: float, size=None):
+    """Record one finished request"""
+    global _next_flush
+    with _lock:
+        _observe(_latency, (route, method), LATENCY_BUCKETS, seconds)
+        if size is not None:
+            _observe(_size, (route, method), SIZE_BUCKETS, size)
+        key = (route, method, str(status))
+        _requests[key] = _requests.get(key, 0) + 1
+    now = time.monotonic()
+    if now >= _next_flush:
+        _next_flush = now + FLUSH_INTERVAL
+        flush()
+
+
+def count_cache(cache: str, hit: bool):
+    """Count a lookup in one of the backend's caches"""
+    key = (cache, "hit" if hit else "miss")
+    with _lock:
+        _cache[key] = _cache.get(key, 0) + 1
+
+
+def _state() -> Dict[str, list]:
+    with _lock:
+        return {
+            "latency": [[list(k), list(v)] for k, v in _latency.items()],
+            "size": [[list(k), list(v)] for k, v in _size.items()],
+            "requests": [[list(k), v] for k, v in _requests.items()],
+            "cache": [[list(k), v] for k, v in _cache.items()],
+        }
+
+
+def _write_json(path: str, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def flush():
+    """Write this worker's totals to the spool"""
+    try:
+        os.makedirs(METRICS_SPOOL, exist_ok=True)
+        _write_json(os.path.join(METRICS_SPOOL, f"{os.getpid()}.json"), _state())
+    except OSError as e:
+        print(f"Failed to write metrics spool: {e}")
+
+
+def _merge(total: Dict[str, dict], state: Dict[str, list]):
+    for table in ("latency", "size"):
+        for key, values in state.get(table, []):
+            key = tuple(key)
+            current = total[table].get(key)
+            total[table][key] = values if current is None else [a + b for a, b in zip(current, values)]
+    for table in ("requests", "cache"):
+        for key, value in state.get(table, []):
+            key = tuple(key)
+            total[table][key] = total[table].get(key, 0) + value
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _as_state(total: Dict[str, dict]) -> Dict[str, list]:
+    return {table: [[list(k), v] for k, v in values.items()] for table, values in total.items()}
+
+
+def collect() -> Dict[str, dict]:
+    """Totals of all workers, past and present"""
+    flush()
+    total = {"latency": {}, "size": {}, "requests": {}, "cache": {}}
+    os.makedirs(METRICS_SPOOL, exist_ok=True)
+    retired_path = os.path.join(METRICS_SPOOL, "retired.json")
+    with open(os.path.join(METRICS_SPOOL, "spool.lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            retired = {"latency": {}, "size": {}, "requests": {}, "cache": {}}
+            try:
+                with open(retired_path) as f:
+                    _merge(retired, json.load(f))
+            except (FileNotFoundError, ValueError):
+                pass
+            exited = []
+            for name in os.listdir(METRICS_SPOOL):
+                stem, ext = os.path.splitext(name)
+                if ext != ".json" or not stem.isdigit():
+                    continue
+                path = os.path.join(METRICS_SPOOL, name)
+                try:
+                    with open(path) as f:
+                        state = json.load(f)
+                except (FileNotFoundError, ValueError):
+                    continue
+                if _alive(int(stem)):
+                    _merge(total, state)
+                else:
+                    _merge(retired, state)
+                    exited.append(path)
+            if exited:
+                _write_json(retired_path, _as_state(retired))
+                for path in exited:
+                    os.remove(path)
+            _merge(total, _as_state(retired))
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+    return total
+
+
+def _labels(**labels) -> str:
+    parts = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _histogram(lines: List[str], name: str, buckets: Iterable[float], table: Dict[tuple, list]):
+    lines.append(f"# TYPE {name} histogram")
+    for (route, method), values in sorted(table.items()):
+        cumulative = 0
+        for le, count in zip(list(buckets) + ["+Inf"], values[:-1]):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(route=route, method=method, le=le)} {int(cumulative)}")
+        lines.append(f"{name}_sum{_labels(route=route, method=method)} {values[-1]:.6f}")
+        lines.append(f"{name}_count{_labels(route=route, method=method)} {int(cumulative)}")
+
+
+def render() -> str:
+    """All workers' metrics in the Prometheus text exposition format"""
+    total = collect()
+    lines = []
+    _histogram(lines, "pipeline_http_request_duration_seconds", LATENCY_BUCKETS, total["latency"])
+    _histogram(lines, "pipeline_http_response_size_bytes", SIZE_BUCKETS, total["size"])
+    lines.append("# TYPE pipeline_http_requests_total counter")
+    for (route, method, status), count in sorted(total["requests"].items()):
+        lines.append(f"pipeline_http_requests_total{_labels(route=route, method=method, status=status)} {count}")
+    lines.append("# TYPE pipeline_cache_requests_total counter")
+    for (cache, result), count in sorted(total["cache"].items()):
+        lines.append(f"pipeline_cache_requests_total{_labels(cache=cache, result=result)} {count}")
+    return "\n".join(lines) + "\n"
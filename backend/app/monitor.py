@@ -1,16 +1,18 @@
 import glob
 from pathlib import Path
-import yaml
 import os
 import re
 
 from .const import *
+from .comments import comment_store, science_target
 
 def scan_processed_folder(date):
+    import yaml
     # Find the base folder and metadata
     idx = 1
     output = []
     base = base_folder(date)
+    comment_counts = comment_store.counts_for_date(date)
     for folder in Path(base).iterdir():
         if not(folder.is_dir()):
             continue
@@ -22,7 +24,7 @@ def scan_processed_folder(date):
                 "filt": f.stem,
                 "masterframe": False,
             }
-            config_file, log_file, _, comments_file = link_to_files(date, obj=row_dict["obj"], filt = row_dict["filt"])
+            config_file, log_file, _, _ = link_to_files(date, obj=row_dict["obj"], filt = row_dict["filt"])
             
 
             with open(config_file, "r") as f:
@@ -39,11 +41,7 @@ def scan_processed_folder(date):
                 row_dict["warnings"] = 0
                 row_dict["errors"] = 0
 
-            os.makedirs(os.path.dirname(comments_file), exist_ok=True)
-            if comments_file:
-                row_dict["comments"] = count_comments(comments_file)
-            else:
-                row_dict["comments"] = 0
+            row_dict["comments"] = comment_counts.get(science_target(row_dict["obj"], row_dict["filt"]), 0)
             output.append(row_dict)
             idx+=1
 
@@ -53,6 +51,7 @@ def scan_processed_folder(date):
 def scan_masterframe_folder(date):
     output = []
     base = base_folder(date, masterframe=True)
+    comment_counts = comment_store.counts_for_date(date)
     for folder in Path(base).iterdir():
         
         row_dict = {
@@ -75,7 +74,7 @@ def scan_masterframe_folder(date):
         row_dict["flat"] = list(row_dict["flat"]) if row_dict["flat"] else False
         row_dict["dark"] = list(row_dict["dark"]) if row_dict["dark"] else False
 
-        _, log_file, _, comments_file = link_to_files(date, unit=row_dict["unit"], masterframe = True)
+        _, log_file, _, _ = link_to_files(date, unit=row_dict["unit"], masterframe = True)
 
         if log_file:
             row_dict["warnings"], row_dict["errors"] = count_warnings_errors(log_file)
@@ -83,12 +82,7 @@ def scan_masterframe_folder(date):
             row_dict["warnings"] = 0
             row_dict["errors"] = 0
 
-        
-        os.makedirs(os.path.dirname(comments_file), exist_ok=True)
-        if comments_file:
-            row_dict["comments"] = count_comments(comments_file)
-        else:
-            row_dict["comments"] = 0
+        row_dict["comments"] = comment_counts.get(row_dict["unit"], 0)
 
         output.append(row_dict)
     
@@ -175,15 +169,6 @@ def count_warnings_errors(log_file):
                     error_count += 1
     return warning_count, error_count
 
-def count_comments(comments_file):
-    count = 0
-    if os.path.exists(comments_file):
-        with open(comments_file, 'r') as file:
-            for line in file:
-                count += 1
-    return count
-
-
 def get_plot_data(file):
     import json
     import os
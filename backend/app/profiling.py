@@ -0,0 +1,137 @@
+"""
+On-demand request profiling.
+
+Only installed when PIPELINE_PROFILE_TOKEN is set (see create_app); without
+it requests go straight to Flask and profiling costs nothing. A request
+carrying the token in an ``X-Profile`` header runs under cProfile. The token
+is never read from the query string, where it would end up in access logs,
+proxies and browser history:
+
+    curl -H "X-Profile: $PIPELINE_PROFILE_TOKEN" ".../api/plot?type=bias&param=clipmed"
+
+The stats are written to PROFILE_DIR as ``<name>.prof`` (load with
+``pstats`` or snakeviz) with a ``<name>.json`` holding route, parameters,
+status and wall time. The oldest profiles are removed beyond PROFILE_KEEP.
+List them with /api/profiles (same token). Streamed bodies (e.g. zip
+bundles) are sent after profiling stops.
+"""
+
+import io
+import os
+import hmac
+import json
+import time
+import pstats
+import cProfile
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode
+
+PROFILE_DIR = os.getenv("PIPELINE_PROFILE_DIR", "/tmp/pipeline/profiles")
+PROFILE_KEEP = 200
+PROFILE_HEADER = "HTTP_X_PROFILE"
+
+
+def authorized(token: Optional[str], value: Optional[str]) -> bool:
+    return bool(token) and bool(value) and hmac.compare_digest(token.encode(), value.encode())
+
+
+class ProfilerMiddleware:
+    """WSGI middleware profiling requests that carry the profile token"""
+
+    def __init__(self, app, token: str, directory: str = PROFILE_DIR, keep: int = PROFILE_KEEP):
+        self.app = app
+        self.token = token
+        self.directory = directory
+        self.keep = keep
+
+    def _requested(self, environ) -> bool:
+        return authorized(self.token, environ.get(PROFILE_HEADER))
+
+    def __call__(self, environ, start_response):
+        if not self._requested(environ):
+            return self.app(environ, start_response)
+
+        status = []
+
+        def _start_response(code, headers, exc_info=None):
+            status.append(code)
+            return start_response(code, headers, exc_info)
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            return self.app(environ, _start_response)
+        finally:
+            profiler.disable()
+            wall = time.perf_counter() - start
+            try:
+                self._save(profiler, environ, status[0] if status else "500", wall)
+            except Exception as e:
+                print(f"Failed to save profile: {e}")
+
+    def _save(self, profiler: cProfile.Profile, environ, status: str, wall: float):
+        os.makedirs(self.directory, exist_ok=True)
+        now = datetime.now()
+        route = environ.get("PATH_INFO", "/")
+        slug = route.strip("/").replace("/", "_") or "root"
+        name = f"{now.strftime('%Y%m%dT%H%M%S%f')}-{os.getpid()}-{slug}"
+        params = parse_qsl(environ.get("QUERY_STRING", ""))
+
+        profiler.dump_stats(os.path.join(self.directory, f"{name}.prof"))
+        meta = {
+            "name": name,
+            "route": route,
+            "method": environ.get("REQUEST_METHOD"),
+            "params": urlencode(params),
+            "status": status.split(" ", 1)[0],
+            "wall_ms": round(wall * 1000, 2),
+            "created": now.isoformat(timespec="seconds"),
+            "pid": os.getpid(),
+        }
+        tmp_path = os.path.join(self.directory, f".{name}.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self.directory, f"{name}.json"))
+        self._rotate()
+
+    def _rotate(self):
+        names = sorted(f[:-5] for f in os.listdir(self.directory) if f.endswith(".json"))
+        for name in names[:max(len(names) - self.keep, 0)]:
+            for ext in (".json", ".prof"):
+                try:
+                    os.remove(os.path.join(self.directory, name + ext))
+                except FileNotFoundError:
+                    pass
+
+
+def list_profiles(directory: str = PROFILE_DIR, sort: str = "recent", limit: int = 20) -> List[Dict[str, Any]]:
+    """Metadata of captured profiles, newest or slowest first"""
+    profiles = []
+    try:
+        files = [f for f in os.listdir(directory) if f.endswith(".json")]
+    except FileNotFoundError:
+        return []
+    for filename in files:
+        try:
+            with open(os.path.join(directory, filename)) as f:
+                profiles.append(json.load(f))
+        except (FileNotFoundError, ValueError):
+            continue
+    key = (lambda p: p.get("wall_ms", 0)) if sort == "slowest" else (lambda p: p.get("name", ""))
+    profiles.sort(key=key, reverse=True)
+    return profiles[:limit]
+
+
+def profile_summary(name: str, directory: str = PROFILE_DIR, sort: str = "cumulative", limit: int = 40) -> Optional[str]:
+    """pstats text of one profile, or None if it does not exist"""
+    if os.path.basename(name) != name:
+        return None
+    path = os.path.join(directory, f"{name}.prof")
+    if not os.path.isfile(path):
+        return None
+    out = io.StringIO()
+    stats = pstats.Stats(path, stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
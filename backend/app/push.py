@@ -0,0 +1,313 @@
+"""
+Server-push hub (Server-Sent Events).
+
+A separate asyncio process, so one event loop holds every open dashboard
+instead of one uwsgi worker per subscriber:
+
+    python -m app.push --port 1112
+
+Nginx routes the stream to it and must not buffer it:
+
+    location /pipeline/api/events {
+        proxy_pass http://127.0.0.1:1112;
+        proxy_http_version 1.1;
+        proxy_set_header Connection "";
+        proxy_buffering off;
+        proxy_read_timeout 1h;
+    }
+
+Clients open ``/api/events?topics=status,scheduler,pipeline-status&date=...``.
+Each topic is polled only while it has subscribers, through a cheap
+fingerprint (file identity / snapshot version); when it changes, the payload
+is built and serialized once and handed to every subscriber. A subscriber
+keeps at most one pending message per topic, so a slow client only gets the
+latest state (coalescing), and one that does not drain its socket within
+SEND_TIMEOUT is disconnected (backpressure). Backend work therefore does not
+grow with the number of open dashboards.
+"""
+
+import os
+import json
+import time
+import asyncio
+import argparse
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PUSH_PORT = int(os.getenv("PIPELINE_PUSH_PORT", "1112"))
+HEARTBEAT = 15.0
+SEND_TIMEOUT = 10.0
+MAX_SUBSCRIBERS = 500
+RETRY_MS = 5000
+
+
+def _identity(path: str):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def _read_json(path: str, default):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+# Topic sources: (fingerprint, build) pairs. Both run in a thread pool.
+
+def _status_source():
+    if os.getenv("PIPELINE_SYSTEM_METRICS", "false").lower() == "true":
+        from .sysmetrics import collector
+        collector.start()
+        return (lambda: _identity(collector.latest_path)), collector.latest
+    path = SCRIPT_DIR + '/test/status.json'
+    return (lambda: _identity(path)), (lambda: _read_json(path, {}))
+
+
+def _scheduler_source():
+    from .scheduler import get_scheduler
+    snapshot = get_scheduler(SCRIPT_DIR + '/test/scheduler.json')
+
+    def fingerprint():
+        snapshot.refresh()
+        return snapshot.version
+    return fingerprint, lambda: json.loads(snapshot.raw())
+
+
+def _scheduler_stats_source():
+    from .scheduler import get_scheduler
+    snapshot = get_scheduler(SCRIPT_DIR + '/test/scheduler.json')
+
+    def fingerprint():
+        snapshot.refresh()
+        return snapshot.version
+    return fingerprint, snapshot.stats
+
+
+def _status_rows_source(kind: str, date: str):
+    """Rows of a status table with their change-log version (as /api/*-status)"""
+    from .changes import change_log, row_key
+    path = SCRIPT_DIR + f'/test/{kind}.json'
+    scope = f"{'science' if kind == 'pipeline-status' else 'masterframe'}:{date}"
+
+    def build():
+        rows = _read_json(path, [])
+        version = change_log.record(scope, rows)
+        return {"date": date, "version": version,
+                "rows": [dict(row, row_id=row_key(row)) for row in rows]}
+    return (lambda: _identity(path)), build
+
+
+def make_source(topic: str) -> Optional[Tuple[Callable, Callable, float]]:
+    """(fingerprint, build, poll interval) of a topic key, or None if unknown"""
+    name, _, date = topic.partition(":")
+    if name == "status":
+        return _status_source() + (2.0,)
+    if name == "scheduler":
+        return _scheduler_source() + (2.0,)
+    if name == "scheduler-stats":
+        return _scheduler_stats_source() + (2.0,)
+    if name in ("pipeline-status", "masterframe-status") and date:
+        return _status_rows_source(name, date) + (5.0,)
+    return None
+
+
+class Subscriber:
+    """One SSE connection; holds at most one pending message per topic"""
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.pending: Dict[str, bytes] = {}
+        self.wakeup = asyncio.Event()
+        self.dropped = 0
+
+    def offer(self, topic: str, message: bytes):
+        if topic in self.pending:
+            self.dropped += 1  # Coalesced: the client only needs the latest state
+        self.pending[topic] = message
+        self.wakeup.set()
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), HEARTBEAT)
+            except asyncio.TimeoutError:
+                self.writer.write(b": keep-alive\n\n")
+            else:
+                self.wakeup.clear()
+                messages, self.pending = list(self.pending.values()), {}
+                self.writer.write(b"".join(messages))
+            # Backpressure: a client that cannot keep up is dropped
+            await asyncio.wait_for(self.writer.drain(), SEND_TIMEOUT)
+
+
+class Topic:
+    """A polled source with its subscribers and last serialized message"""
+
+    def __init__(self, key: str, fingerprint: Callable, build: Callable, interval: float):
+        self.key = key
+        self.fingerprint = fingerprint
+        self.build = build
+        self.interval = interval
+        self.subscribers: Set[Subscriber] = set()
+        self.message: Optional[bytes] = None
+        self.version = 0
+        self.builds = 0
+        self._last = object()
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, subscriber: Subscriber):
+        self.subscribers.add(subscriber)
+        if self.message is not None:
+            subscriber.offer(self.key, self.message)
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._poll())
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+        if not self.subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+            self._last = object()  # Rebuild on the next subscription
+
+    async def _poll(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                fingerprint = await loop.run_in_executor(None, self.fingerprint)
+                if fingerprint != self._last:
+                    payload = await loop.run_in_executor(None, self.build)
+                    self._last = fingerprint
+                    self.version += 1
+                    self.builds += 1
+                    data = json.dumps(payload, separators=(",", ":"), default=str)
+                    name = self.key.partition(":")[0]
+                    self.message = f"event: {name}\nid: {self.version}\ndata: {data}\n\n".encode()
+                    for subscriber in list(self.subscribers):
+                        subscriber.offer(self.key, self.message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Failed to update topic {self.key}: {e}")
+            await asyncio.sleep(self.interval)
+
+
+class Hub:
+    def __init__(self):
+        self.topics: Dict[str, Topic] = {}
+        self.subscribers = 0
+
+    def topic(self, key: str) -> Optional[Topic]:
+        if key not in self.topics:
+            source = make_source(key)
+            if source is None:
+                return None
+            self.topics[key] = Topic(key, *source)
+        return self.topics[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": self.subscribers,
+            "topics": {
+                key: {"subscribers": len(t.subscribers), "builds": t.builds, "version": t.version}
+                for key, t in self.topics.items()
+            },
+        }
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), SEND_TIMEOUT)
+            while (await asyncio.wait_for(reader.readline(), SEND_TIMEOUT)) not in (b"\r\n", b"\n", b""):
+                pass  # Headers are not needed
+            parts = request_line.decode("latin-1").split()
+            if len(parts) < 2 or parts[0] != "GET":
+                return self._respond(writer, 405, {"error": "Only GET is supported"})
+            url = urlsplit(parts[1])
+            query = parse_qs(url.query)
+
+            if url.path.rstrip("/").endswith("/events/stats"):
+                return self._respond(writer, 200, self.stats())
+            if not url.path.rstrip("/").endswith("/events"):
+                return self._respond(writer, 404, {"error": "Not found"})
+            if self.subscribers >= MAX_SUBSCRIBERS:
+                return self._respond(writer, 503, {"error": "Too many subscribers"})
+
+            date = query.get("date", [""])[0]
+            keys = []
+            for name in ",".join(query.get("topics", [])).split(","):
+                name = name.strip()
+                if name in ("pipeline-status", "masterframe-status"):
+                    name = f"{name}:{date}"
+                if name:
+                    keys.append(name)
+            topics = [self.topic(key) for key in keys]
+            if not topics or None in topics:
+                return self._respond(writer, 400, {"error": f"Unknown topics: {keys}"})
+
+            await self._stream(reader, writer, topics)
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _stream(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, topics):
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Cache-Control: no-store\r\n"
+            b"X-Accel-Buffering: no\r\n"
+            b"Access-Control-Allow-Origin: *\r\n"
+            b"Connection: close\r\n\r\n"
+            + f"retry: {RETRY_MS}\n\n".encode()
+        )
+        subscriber = Subscriber(writer)
+        self.subscribers += 1
+        for topic in topics:
+            topic.subscribe(subscriber)
+        try:
+            # Ends when the client goes away (EOF) or stops draining
+            sending = asyncio.ensure_future(subscriber.run())
+            closed = asyncio.ensure_future(reader.read())
+            done, pending = await asyncio.wait({sending, closed}, return_when=asyncio.FIRST_COMPLETED)
+            for task in pending:
+                task.cancel()
+            for task in done:
+                task.exception()  # Retrieve so it is not logged as unhandled
+        finally:
+            self.subscribers -= 1
+            for topic in topics:
+                topic.unsubscribe(subscriber)
+                if not topic.subscribers and ":" in topic.key:
+                    del self.topics[topic.key]  # Per-date topics are not kept around
+
+    @staticmethod
+    def _respond(writer: asyncio.StreamWriter, code: int, body: Dict[str, Any]):
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                  503: "Service Unavailable"}[code]
+        data = json.dumps(body).encode()
+        writer.write(
+            f"HTTP/1.1 {code} {reason}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\nAccess-Control-Allow-Origin: *\r\n"
+            f"Connection: close\r\n\r\n".encode() + data
+        )
+
+
+async def serve(host: str = "127.0.0.1", port: int = PUSH_PORT):
+    hub = Hub()
+    server = await asyncio.start_server(hub.handle, host, port)
+    print(f"Push hub listening on {host}:{port} ({time.strftime('%Y-%m-%d %H:%M:%S')})")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Server-Sent Events hub for dashboard updates.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on.")
+    parser.add_argument("--port", type=int, default=PUSH_PORT, help="Port to listen on.")
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port))
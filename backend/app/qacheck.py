@@ -0,0 +1,302 @@
+"""
+QA threshold evaluation.
+
+The qa-config files (masterframe_config.json, science_config.json) give a
+reference per QA type and parameter, e.g. FLAT/CLIPMAX {"criteria": "lt",
+"value": 1.3}. Instead of the browser looping over every record, a QA
+dataset is turned into NumPy columns once per file change (QADataset) and
+each reference becomes one boolean mask over the whole column.
+
+Flags are int8 per record and parameter: 1 out of spec, 0 in spec, -1 not
+measured (null/NaN). They are cached per (dataset version, config version),
+so repeated checks of the same data only slice the cached masks by unit,
+filter and date.
+"""
+
+import os
+import re
+import json
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .metrics import count_cache
+
+NOT_MEASURED = -1
+# Masterframes have no filter column; flats carry it in the file name
+_FLAT_FILTER_RE = re.compile(r"^flat_([^_]+)_")
+
+
+def _file_identity(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def _night(value: Any) -> str:
+    """'Thu, 06 Mar 2025 00:00:00 GMT' or '2025-03-06...' -> '2025-03-06'"""
+    if not value:
+        return ""
+    value = str(value)
+    if value[:4].isdigit():
+        return value[:10]
+    try:
+        return parsedate_to_datetime(value).strftime("%Y-%m-%d")
+    except (TypeError, ValueError):
+        return ""
+
+
+class QAReference:
+    """One qa-config file, reloaded when it changes"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._identity = None
+        self._config: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def version(self) -> Optional[Tuple[int, int, int]]:
+        return self._identity
+
+    def config(self) -> Dict[str, Dict[str, Any]]:
+        """{QA_TYPE: {PARAM: {criteria, value, description}}}"""
+        identity = _file_identity(self.path)
+        if identity != self._identity:
+            with open(self.path) as f:
+                data = json.load(f)
+            # Stored like the /api/qa-config response: {"success", "type", "data": {...}}
+            self._config = data.get("data", data) if isinstance(data, dict) else {}
+            self._identity = identity
+        return self._config
+
+
+class QADataset:
+    """A QA JSON file (list of records) as NumPy columns, rebuilt when it changes"""
+
+    def __init__(self, path: str, date_field: str = "run_date"):
+        self.path = path
+        self.date_field = date_field
+        self._identity = None
+        self._records: List[Dict[str, Any]] = []
+        self._columns: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> Optional[Tuple[int, int, int]]:
+        return self._identity
+
+    def refresh(self) -> bool:
+        identity = _file_identity(self.path)
+        if identity == self._identity:
+            return False
+        with self._lock:
+            if identity == self._identity:
+                return False
+            if identity is None:
+                records = []
+            else:
+                with open(self.path) as f:
+                    records = json.load(f)
+                if not isinstance(records, list):
+                    records = []
+            self._records, self._columns, self._identity = records, {}, identity
+            return True
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self._records)
+
+    def records(self) -> List[Dict[str, Any]]:
+        self.refresh()
+        return self._records
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        One field of every record
+
+        'night' is the date field as YYYY-MM-DD; 'unit', 'filter' are strings
+        (flats take the filter from the file name); anything else is float64
+        with NaN for null (booleans become 0/1).
+        """
+        self.refresh()
+        column = self._columns.get(name)
+        if column is not None:
+            return column
+        records = self._records
+        if name == "night":
+            column = np.array([_night(r.get(self.date_field)) for r in records], dtype="U10")
+        elif name == "filter":
+            column = np.array([r.get("filter") or self._filter_from_name(r.get("filename")) for r in records],
+                              dtype=str)
+        elif name in ("unit", "object", "filename", "qa_type"):
+            column = np.array([r.get(name) or "" for r in records], dtype=str)
+        else:
+            values = [r.get(name) for r in records]
+            column = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        self._columns[name] = column
+        return column
+
+    @staticmethod
+    def _filter_from_name(filename: Optional[str]) -> str:
+        match = _FLAT_FILTER_RE.match(filename or "")
+        return match.group(1) if match else ""
+
+    def select(self, units: Optional[List[str]] = None, filters: Optional[List[str]] = None,
+               date_min: Optional[str] = None, date_max: Optional[str] = None) -> np.ndarray:
+        """Boolean mask of the records matching the selection"""
+        mask = np.ones(len(self), dtype=bool)
+        if units:
+            mask &= np.isin(self.column("unit"), units)
+        if filters:
+            mask &= np.isin(self.column("filter"), filters)
+        if date_min or date_max:
+            night = self.column("night")
+            if date_min:
+                mask &= night >= date_min
+            if date_max:
+                mask &= (night <= date_max) & (night != "")
+        return mask
+
+
+def evaluate(values: np.ndarray, criteria: str, reference: Any) -> np.ndarray:
+    """int8 flags of one column against one reference (1 = out of spec)"""
+    measured = ~np.isnan(values)
+    if criteria == "within":
+        low, high = reference
+        ok = (values >= low) & (values <= high)
+    elif criteria == "lte":
+        ok = values <= reference
+    elif criteria == "gte":
+        ok = values >= reference
+    elif criteria == "lt":
+        ok = values < reference
+    elif criteria == "gt":
+        ok = values > reference
+    elif criteria == "eq":
+        ok = values == float(reference)
+    elif criteria == "ne":
+        ok = values != float(reference)
+    else:
+        raise ValueError(f"Unknown criteria: {criteria}")
+    flags = np.where(ok, 0, 1).astype(np.int8)
+    flags[~measured] = NOT_MEASURED
+    return flags
+
+
+class QAChecker:
+    """Flags of QA datasets against their references, cached per (dataset, config) version"""
+
+    def __init__(self):
+        self._cache: Dict[Tuple[str, str, str], Tuple[Any, Dict[str, np.ndarray]]] = {}
+        self._lock = threading.Lock()
+
+    def flags(self, dataset: QADataset, reference: QAReference, qa_type: str) -> Dict[str, np.ndarray]:
+        """{PARAM: int8 flags} for every parameter the reference defines for qa_type"""
+        params = reference.config().get(qa_type.upper(), {})
+        dataset.refresh()
+        version = (dataset.version, reference.version)
+        key = (dataset.path, dataset.date_field, qa_type)
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == version:
+            count_cache("qa_check", True)
+            return cached[1]
+        count_cache("qa_check", False)
+        flags = {
+            param: evaluate(dataset.column(param.lower()), spec["criteria"], spec["value"])
+            for param, spec in params.items()
+        }
+        with self._lock:
+            self._cache[key] = (version, flags)
+        return flags
+
+    def check(self, dataset: QADataset, reference: QAReference, qa_type: str,
+              units: Optional[List[str]] = None, filters: Optional[List[str]] = None,
+              date_min: Optional[str] = None, date_max: Optional[str] = None,
+              failed_only: bool = False) -> Dict[str, Any]:
+        """
+        Flags of the selected records, or only the out-of-spec records
+
+        Returns:
+            {"references", "count", "failed", "summary", ...} with either
+            columnar "id"/"night"/"unit"/"filter"/"flags" lists, or
+            "records" (the out-of-spec records, each with a "failed" list)
+        """
+        flags = self.flags(dataset, reference, qa_type)
+        mask = dataset.select(units, filters, date_min, date_max)
+        index = np.flatnonzero(mask)
+        selected = {param: f[index] for param, f in flags.items()}
+        out = np.zeros(len(index), dtype=bool)
+        for f in selected.values():
+            out |= f == 1
+
+        result = {
+            "type": qa_type,
+            "references": reference.config().get(qa_type.upper(), {}),
+            "count": int(len(index)),
+            "failed": int(out.sum()),
+            "summary": self._summary(dataset, index, selected, out),
+        }
+        if failed_only:
+            records = dataset.records()
+            rows = []
+            for i in np.flatnonzero(out):
+                record = dict(records[index[i]])
+                record["failed"] = [p for p, f in selected.items() if f[i] == 1]
+                rows.append(record)
+            result["records"] = rows
+        else:
+            result["id"] = [None if np.isnan(v) else int(v) for v in dataset.column("id")[index].tolist()]
+            result["night"] = dataset.column("night")[index].tolist()
+            result["unit"] = dataset.column("unit")[index].tolist()
+            result["filter"] = dataset.column("filter")[index].tolist()
+            result["flags"] = {p: [None if v == NOT_MEASURED else v for v in f.tolist()]
+                               for p, f in selected.items()}
+        return result
+
+    @staticmethod
+    def _summary(dataset: QADataset, index: np.ndarray, flags: Dict[str, np.ndarray],
+                 out: np.ndarray) -> List[Dict[str, Any]]:
+        """Record and out-of-spec counts per (unit, filter)"""
+        if len(index) == 0:
+            return []
+        keys = np.char.add(np.char.add(dataset.column("unit")[index], "|"), dataset.column("filter")[index])
+        groups, inverse = np.unique(keys, return_inverse=True)
+        total = np.bincount(inverse, minlength=len(groups))
+        failed = np.bincount(inverse, weights=out, minlength=len(groups)).astype(int)
+        per_param = {p: np.bincount(inverse, weights=f == 1, minlength=len(groups)).astype(int)
+                     for p, f in flags.items()}
+        summary = []
+        for g, key in enumerate(groups.tolist()):
+            unit, filt = key.split("|", 1)
+            summary.append({
+                "unit": unit,
+                "filter": filt,
+                "count": int(total[g]),
+                "failed": int(failed[g]),
+                "by_param": {p: int(counts[g]) for p, counts in per_param.items()},
+            })
+        return summary
+
+
+_datasets: Dict[Tuple[str, str], QADataset] = {}
+_references: Dict[str, QAReference] = {}
+qa_checker = QAChecker()
+
+
+def get_dataset(path: str, date_field: str = "run_date") -> QADataset:
+    """Per-process QADataset of a QA file, one per date field (nights differ between them)"""
+    key = (path, date_field)
+    if key not in _datasets:
+        _datasets[key] = QADataset(path, date_field)
+    return _datasets[key]
+
+
+def get_reference(path: str) -> QAReference:
+    """Per-process QAReference of a qa-config file"""
+    if path not in _references:
+        _references[path] = QAReference(path)
+    return _references[path]
@@ -0,0 +1,306 @@
+"""
+Rerun job queue.
+
+POST /api/rerun adds a job to a local SQLite queue shared by all workers.
+A job is one pipeline row: (date, obj/filt) for science or (date, unit) for
+masterframes. While a job for a row is still pending, further requests for
+the same row are merged into it (the request count goes up and the job keeps
+the highest priority asked for), so several operators clicking rerun on a
+busy night queue the work once. A request that arrives while the row is
+already running gets one new pending job, since the running one may have
+started from older inputs.
+
+Jobs are run by
+
+    python -m app.reruns run --command "/home/7dt/pipeline/bin/rerun {date} {target}"
+
+which claims pending jobs by priority, then age, while keeping at most
+MAX_RUNNING jobs in total and the per-lane limit (UNIT_LIMITS, default
+DEFAULT_UNIT_LIMIT) running at once. The lane is the unit of a masterframe
+job and "science" for science jobs. A runner renews the lease of its jobs
+while they run; a job whose lease runs out (runner killed) is marked failed.
+The command is split like a shell line, and every argument is formatted
+with the job's fields, so request values never go through a shell.
+"""
+
+import os
+import re
+import time
+import shlex
+import socket
+import argparse
+import threading
+import subprocess
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache import SQLiteStore
+
+RERUN_PATH = os.getenv("PIPELINE_RERUN_PATH", "/tmp/pipeline/reruns.sqlite")
+RERUN_COMMAND = os.getenv("PIPELINE_RERUN_COMMAND")
+# Jobs running at once over all lanes
+MAX_RUNNING = int(os.getenv("PIPELINE_RERUN_MAX_RUNNING", "4"))
+# Jobs running at once per lane, e.g. "science=2,7DT01=1"; other lanes get the default
+DEFAULT_UNIT_LIMIT = int(os.getenv("PIPELINE_RERUN_UNIT_LIMIT", "1"))
+UNIT_LIMITS = {
+    lane.strip(): int(limit)
+    for lane, _, limit in (item.partition("=") for item in os.getenv("PIPELINE_RERUN_UNIT_LIMITS", "").split(","))
+    if lane.strip() and limit.strip()
+}
+# Seconds a claimed job stays with its runner without a heartbeat
+LEASE_SECONDS = 120.0
+POLL_SECONDS = 5.0
+MAX_PRIORITY = 10
+SCIENCE_LANE = "science"
+STATUSES = ("pending", "running", "completed", "failed", "cancelled")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    target TEXT NOT NULL,
+    lane TEXT NOT NULL,
+    obj TEXT,
+    filt TEXT,
+    unit TEXT,
+    masterframe INTEGER NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    requests INTEGER NOT NULL DEFAULT 1,
+    requested_by TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    runner TEXT,
+    lease REAL,
+    returncode INTEGER,
+    error TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_pending_idx ON jobs (date, target, masterframe) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS jobs_status_idx ON jobs (status, priority, id);
+CREATE INDEX IF NOT EXISTS jobs_date_idx ON jobs (date);
+"""
+
+_COLUMNS = ("id", "date", "target", "lane", "obj", "filt", "unit", "masterframe", "priority", "status",
+            "requests", "requested_by", "created", "updated", "started", "finished", "runner", "returncode",
+            "error")
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_NAME_RE = re.compile(r"^[A-Za-z0-9_.+-]+$")
+
+
+def _check(name: str, value: Optional[str], pattern: re.Pattern) -> str:
+    if not value or not pattern.match(value):
+        raise ValueError(f"Invalid or missing {name}: {value!r}")
+    return value
+
+
+def _row(row: Tuple) -> Dict[str, Any]:
+    job = dict(zip(_COLUMNS, row))
+    job["masterframe"] = bool(job["masterframe"])
+    return job
+
+
+class RerunQueue(SQLiteStore):
+    """Coalescing, prioritised rerun jobs with per-lane concurrency limits"""
+
+    schema = _SCHEMA
+
+    def __init__(self, path: str = RERUN_PATH):
+        super().__init__(path)
+
+    def submit(self, date: str, obj: Optional[str] = None, filt: Optional[str] = None,
+               unit: Optional[str] = None, masterframe: bool = False, priority: int = 0,
+               requested_by: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+        """
+        Queue a rerun, or merge it into the pending job of the same row
+
+        Returns:
+            (job, merged) where merged is True if an existing job absorbed the request
+        """
+        _check("date", date, _DATE_RE)
+        if masterframe:
+            target = lane = _check("unit", unit, _NAME_RE)
+            obj = filt = None
+        else:
+            target = f"{_check('obj', obj, _NAME_RE)}/{_check('filt', filt, _NAME_RE)}"
+            lane, unit = SCIENCE_LANE, None
+        priority = max(0, min(int(priority), MAX_PRIORITY))
+        now = time.time()
+
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id, requested_by FROM jobs WHERE date = ? AND target = ? AND masterframe = ? "
+                "AND status = 'pending'", (date, target, int(masterframe)),
+            ).fetchone()
+            if row:
+                job_id, previous = row
+                names = [n for n in (previous or "").split(",") if n]
+                if requested_by and requested_by not in names:
+                    names.append(requested_by)
+                conn.execute(
+                    "UPDATE jobs SET requests = requests + 1, priority = MAX(priority, ?), requested_by = ?, "
+                    "updated = ? WHERE id = ?", (priority, ",".join(names) or None, now, job_id),
+                )
+            else:
+                job_id = conn.execute(
+                    "INSERT INTO jobs (date, target, lane, obj, filt, unit, masterframe, priority, status, "
+                    "requested_by, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'pending', ?, ?, ?)",
+                    (date, target, lane, obj, filt, unit, int(masterframe), priority, requested_by, now, now),
+                ).lastrowid
+        return self.get(job_id), bool(row)
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row(row) if row else None
+
+    def jobs(self, date: Optional[str] = None, status: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Jobs newest first, optionally of one date and/or status"""
+        where, args = [], []
+        if date:
+            where.append("date = ?")
+            args.append(date)
+        if status:
+            where.append("status = ?")
+            args.append(status)
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM jobs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        rows = self._conn().execute(sql + " ORDER BY id DESC LIMIT ?", (*args, limit)).fetchall()
+        return [_row(r) for r in rows]
+
+    def summary(self) -> Dict[str, Any]:
+        """Job counts by status, and running jobs by lane"""
+        conn = self._conn()
+        by_status = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        running = dict(conn.execute(
+            "SELECT lane, COUNT(*) FROM jobs WHERE status = 'running' GROUP BY lane").fetchall())
+        return {"by_status": {s: by_status.get(s, 0) for s in STATUSES}, "running_by_lane": running,
+                "max_running": MAX_RUNNING}
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancel a pending job; running jobs are left to finish"""
+        conn = self._conn()
+        with conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'cancelled', updated = ?, finished = ? WHERE id = ? AND status = 'pending'",
+                (time.time(), time.time(), job_id),
+            )
+        return cur.rowcount == 1
+
+    def claim(self, runner: str, max_running: int = MAX_RUNNING) -> Optional[Dict[str, Any]]:
+        """Take the next pending job whose lane has room, or None"""
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'runner stopped renewing its lease', finished = ?, "
+                "updated = ? WHERE status = 'running' AND lease < ?", (now, now, now),
+            )
+            running = dict(conn.execute(
+                "SELECT lane, COUNT(*) FROM jobs WHERE status = 'running' GROUP BY lane").fetchall())
+            if sum(running.values()) >= max_running:
+                return None
+            full = [lane for lane, n in running.items() if n >= UNIT_LIMITS.get(lane, DEFAULT_UNIT_LIMIT)]
+            row = conn.execute(
+                f"SELECT id FROM jobs WHERE status = 'pending' AND lane NOT IN ({', '.join('?' * len(full))}) "
+                "ORDER BY priority DESC, id LIMIT 1", full,
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', runner = ?, started = ?, updated = ?, lease = ? WHERE id = ?",
+                (runner, now, now, now + LEASE_SECONDS, row[0]),
+            )
+        return self.get(row[0])
+
+    def heartbeat(self, job_ids: List[int], runner: str):
+        if not job_ids:
+            return
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                f"UPDATE jobs SET lease = ? WHERE runner = ? AND status = 'running' "
+                f"AND id IN ({', '.join('?' * len(job_ids))})", (time.time() + LEASE_SECONDS, runner, *job_ids),
+            )
+
+    def finish(self, job_id: int, runner: str, returncode: Optional[int], error: Optional[str] = None):
+        status = "completed" if returncode == 0 and not error else "failed"
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, returncode = ?, error = ?, finished = ?, updated = ?, lease = NULL "
+                "WHERE id = ? AND runner = ? AND status = 'running'",
+                (status, returncode, error, now, now, job_id, runner),
+            )
+
+
+rerun_queue = RerunQueue()
+
+
+def command_for(template: str, job: Dict[str, Any]) -> List[str]:
+    """argv of the rerun command of a job; fields are formatted per argument"""
+    fields = {k: ("" if v is None else v) for k, v in job.items()}
+    fields["masterframe"] = "masterframe" if job["masterframe"] else "science"
+    return [arg.format(**fields) for arg in shlex.split(template)]
+
+
+def run_jobs(template: str, max_running: int = MAX_RUNNING, queue: RerunQueue = rerun_queue):
+    """Claim and run jobs until interrupted"""
+    from .cache import invalidate_pipeline
+
+    runner = f"{socket.gethostname()}:{os.getpid()}"
+    active: Dict[int, subprocess.Popen] = {}
+    dates: Dict[int, str] = {}
+    print(f"Rerun runner {runner}: up to {max_running} jobs, lanes {UNIT_LIMITS or {}} "
+          f"(default {DEFAULT_UNIT_LIMIT})")
+    try:
+        while True:
+            for job_id, proc in list(active.items()):
+                if proc.poll() is not None:
+                    queue.finish(job_id, runner, proc.returncode)
+                    invalidate_pipeline(dates.pop(job_id))
+                    del active[job_id]
+                    print(f"Job {job_id} finished with {proc.returncode}")
+            while len(active) < max_running:
+                job = queue.claim(runner, max_running)
+                if job is None:
+                    break
+                argv = command_for(template, job)
+                try:
+                    active[job["id"]] = subprocess.Popen(argv)
+                    dates[job["id"]] = job["date"]
+                    print(f"Job {job['id']} started: {' '.join(argv)}")
+                except OSError as e:
+                    queue.finish(job["id"], runner, None, error=str(e))
+            queue.heartbeat(list(active), runner)
+            time.sleep(POLL_SECONDS if not active else 1.0)
+    except KeyboardInterrupt:
+        for job_id, proc in active.items():
+            proc.terminate()
+            queue.finish(job_id, runner, None, error="runner stopped")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rerun job queue.")
+    sub = parser.add_subparsers(dest="action", required=True)
+    run_parser = sub.add_parser("run", help="Run queued jobs.")
+    run_parser.add_argument("--command", default=RERUN_COMMAND,
+                            help="Command template, e.g. 'rerun {date} {target}' (PIPELINE_RERUN_COMMAND).")
+    run_parser.add_argument("--max-running", type=int, default=MAX_RUNNING)
+    list_parser = sub.add_parser("list", help="List jobs.")
+    list_parser.add_argument("--date")
+    list_parser.add_argument("--status", choices=STATUSES)
+    args = parser.parse_args()
+
+    if args.action == "run":
+        if not args.command:
+            parser.error("--command or PIPELINE_RERUN_COMMAND is required")
+        run_jobs(args.command, args.max_running)
+    else:
+        for job in rerun_queue.jobs(args.date, args.status):
+            print(f"{job['id']:>6} {job['date']} {job['target']:<24} {job['status']:<10} "
+                  f"p{job['priority']} x{job['requests']} {job['requested_by'] or ''}")
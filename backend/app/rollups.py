@@ -0,0 +1,305 @@
+"""
+Per-night science QA rollups.
+
+science.json has one record per frame. The rollup table keeps one row per
+(night, unit, filter) with the frame count and the seeing distribution
+(median, mean, p10/q1/q3/p90, min/max) plus the extremes of the frames'
+own min/max, so long-baseline plots read thousands of rollup rows instead of
+every frame.
+
+Nights are taken from ``date_obs``, as in the science QA check view, so a
+night means the same frames in both. The tables live in a local SQLite file
+shared by all workers, next to the few fields of every frame the rollups
+need. The pipeline appends records to science.json, so when the file
+changes and everything up to the previously processed offset is unchanged
+(same digest), only the bytes after it are parsed: the new frames are
+stored and just their nights are aggregated again. Any other change parses
+the whole file. Rebuild from scratch with
+
+    python -m app.rollups /path/to/science.json --rebuild
+"""
+
+import os
+import json
+import time
+import hashlib
+import argparse
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .cache import SQLiteStore
+from .metrics import count_cache
+from .qacheck import _file_identity, _night
+
+ROLLUP_PATH = os.getenv("PIPELINE_ROLLUP_PATH", "/tmp/pipeline/qa_rollups.sqlite")
+# Field of the science records the rollup night is taken from (as the QA check view)
+DATE_FIELD = "date_obs"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS science_rollup (
+    source TEXT NOT NULL,
+    night TEXT NOT NULL,
+    unit TEXT NOT NULL,
+    filter TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    seeing REAL,
+    seeing_mean REAL,
+    p10 REAL,
+    q1 REAL,
+    q3 REAL,
+    p90 REAL,
+    seeing_min REAL,
+    seeing_max REAL,
+    min REAL,
+    max REAL,
+    PRIMARY KEY (source, night, unit, filter)
+);
+CREATE TABLE IF NOT EXISTS science_frame (
+    source TEXT NOT NULL,
+    night TEXT NOT NULL,
+    unit TEXT NOT NULL,
+    filter TEXT NOT NULL,
+    seeing REAL,
+    min REAL,
+    max REAL
+);
+CREATE INDEX IF NOT EXISTS science_frame_night ON science_frame (source, night);
+DROP TABLE IF EXISTS rollup_state;
+CREATE TABLE IF NOT EXISTS rollup_source (
+    source TEXT PRIMARY KEY,
+    identity TEXT NOT NULL,
+    date_field TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+STAT_COLUMNS = ("count", "seeing", "seeing_mean", "p10", "q1", "q3", "p90", "seeing_min", "seeing_max",
+                "min", "max")
+COLUMNS = ("night", "unit", "filter") + STAT_COLUMNS
+FRAME_COLUMNS = ("night", "unit", "filter", "seeing", "min", "max")
+
+
+def frames(records: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """The rollup fields of science records as columns (NaN for null values)"""
+    records = [r for r in records if isinstance(r, dict)]
+    columns = {
+        "night": np.array([_night(r.get(DATE_FIELD)) for r in records], dtype="U10"),
+        "unit": np.array([str(r.get("unit") or "") for r in records], dtype=str),
+        "filter": np.array([str(r.get("filter") or "") for r in records], dtype=str),
+    }
+    for name in ("seeing", "min", "max"):
+        columns[name] = np.array([r.get(name) for r in records], dtype=np.float64)
+    return columns
+
+
+def aggregate(columns: Dict[str, np.ndarray]) -> List[tuple]:
+    """Rollup rows of the given frames, one per (night, unit, filter)"""
+    night = columns["night"]
+    index = np.flatnonzero(night != "")
+    if len(index) == 0:
+        return []
+    keys = np.char.add(np.char.add(np.char.add(np.char.add(
+        night[index], "|"), columns["unit"][index]), "|"), columns["filter"][index])
+    seeing = columns["seeing"][index]
+    frame_min = columns["min"][index]
+    frame_max = columns["max"][index]
+
+    # Sort by group, then by seeing (NaN last), so each group is one contiguous slice
+    order = np.lexsort((seeing, keys))
+    keys, seeing, frame_min, frame_max = keys[order], seeing[order], frame_min[order], frame_max[order]
+    groups, starts, sizes = np.unique(keys, return_index=True, return_counts=True)
+
+    # Percentiles of every group at once: linear interpolation between ranks, as np.percentile
+    valid = np.add.reduceat(~np.isnan(seeing), starts)
+    has = valid > 0
+    last = np.maximum(valid - 1, 0)
+    stats = {}
+    for name, q in (("p10", 0.10), ("q1", 0.25), ("seeing", 0.50), ("q3", 0.75), ("p90", 0.90)):
+        position = last * q
+        low = np.floor(position).astype(int)
+        high = np.ceil(position).astype(int)
+        lo, hi = seeing[starts + low], seeing[starts + high]
+        stats[name] = np.where(has, lo + (hi - lo) * (position - low), np.nan)
+    total = np.add.reduceat(np.nan_to_num(seeing), starts)
+    stats["seeing_mean"] = np.where(has, total / np.maximum(valid, 1), np.nan)
+    stats["seeing_min"] = np.where(has, seeing[starts], np.nan)
+    stats["seeing_max"] = np.where(has, seeing[starts + last], np.nan)
+    stats["min"] = np.fmin.reduceat(frame_min, starts)
+    stats["max"] = np.fmax.reduceat(frame_max, starts)
+
+    columns = [stats[name].tolist() for name in STAT_COLUMNS[1:]]
+    rows = []
+    for g, key in enumerate(groups.tolist()):
+        values = [None if v != v else v for v in (column[g] for column in columns)]
+        rows.append((*key.split("|", 2), int(sizes[g]), *values))
+    return rows
+
+
+class ScienceRollups(SQLiteStore):
+    """Per-(night, unit, filter) science QA aggregates, updated incrementally"""
+
+    schema = _SCHEMA
+
+    def __init__(self, path: str = ROLLUP_PATH):
+        super().__init__(path)
+
+    def update(self, source: str, rebuild: bool = False) -> Dict[str, Any]:
+        """
+        Bring the rollups of a science QA file up to date
+
+        Returns:
+            {"changed": bool, "nights": number of nights aggregated}
+        """
+        identity = repr(_file_identity(source))
+        conn = self._conn()
+        if not rebuild and self._current(conn, source, identity):
+            count_cache("qa_rollup", True)
+            return {"changed": False, "nights": 0}
+        count_cache("qa_rollup", False)
+
+        try:
+            with open(source, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b"[]"
+        offset = _records_end(data)
+        digest = hashlib.blake2b(data[:offset]).hexdigest()
+
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Another worker may have done it while we waited for the lock
+            if not rebuild and self._current(conn, source, identity):
+                return {"changed": False, "nights": 0}
+
+            state = conn.execute(
+                "SELECT date_field, offset, digest FROM rollup_source WHERE source = ?", (source,)
+            ).fetchone()
+            appended = None
+            if state and state[0] == DATE_FIELD and not rebuild:
+                appended = _appended(data, state[1], state[2])
+            if appended is None:
+                conn.execute("DELETE FROM science_frame WHERE source = ?", (source,))
+                conn.execute("DELETE FROM science_rollup WHERE source = ?", (source,))
+                new = frames(_load(data))
+                nights = np.unique(new["night"][new["night"] != ""])
+                columns = new
+            else:
+                new = frames(appended)
+                nights = np.unique(new["night"][new["night"] != ""])
+                # Older frames of the touched nights come from the frame table
+                placeholders = ", ".join("?" * len(nights))
+                stored = conn.execute(
+                    f"SELECT {', '.join(FRAME_COLUMNS)} FROM science_frame "
+                    f"WHERE source = ? AND night IN ({placeholders})", [source, *nights.tolist()]
+                ).fetchall()
+                columns = _concat(_frame_columns(stored), new)
+                conn.executemany("DELETE FROM science_rollup WHERE source = ? AND night = ?",
+                                 [(source, n) for n in nights.tolist()])
+
+            conn.executemany(
+                f"INSERT INTO science_frame (source, {', '.join(FRAME_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * (len(FRAME_COLUMNS) + 1))})",
+                ((source, *row) for row in _frame_rows(new)),
+            )
+            rows = [(source, *row) for row in aggregate(columns)]
+            conn.executemany(
+                f"INSERT INTO science_rollup (source, {', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join('?' * (len(COLUMNS) + 1))})", rows
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO rollup_source (source, identity, date_field, offset, digest, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (source, identity, DATE_FIELD, offset, digest, time.time()),
+            )
+        return {"changed": True, "nights": int(len(nights))}
+
+    @staticmethod
+    def _current(conn, source: str, identity: str) -> bool:
+        state = conn.execute(
+            "SELECT identity, date_field FROM rollup_source WHERE source = ?", (source,)
+        ).fetchone()
+        return state is not None and state == (identity, DATE_FIELD)
+
+    def query(self, source: str, date_min: Optional[str] = None, date_max: Optional[str] = None,
+              units: Optional[List[str]] = None, filters: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Rollup rows of a source ordered by night, unit, filter"""
+        where, args = ["source = ?"], [source]
+        if date_min:
+            where.append("night >= ?")
+            args.append(date_min)
+        if date_max:
+            where.append("night <= ?")
+            args.append(date_max)
+        for column, values in (("unit", units), ("filter", filters)):
+            if values:
+                where.append(f"{column} IN ({', '.join('?' * len(values))})")
+                args.extend(values)
+        sql = f"SELECT {', '.join(COLUMNS)} FROM science_rollup WHERE " + " AND ".join(where)
+        rows = self._conn().execute(sql + " ORDER BY night, unit, filter", args).fetchall()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+
+def _records_end(data: bytes) -> int:
+    """Offset just past the last record of a JSON array (before the closing bracket)"""
+    end = data.rfind(b"]")
+    return len(data[:end].rstrip()) if end >= 0 else 0
+
+
+def _appended(data: bytes, offset: int, digest: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Records added after offset, or None if the file changed otherwise
+
+    The first offset bytes must be unchanged, which is checked by digest:
+    hashing the bytes is cheap next to parsing them.
+    """
+    if len(data) < offset or hashlib.blake2b(data[:offset]).hexdigest() != digest:
+        return None
+    tail = data[offset:].strip()
+    if tail == b"]":
+        return []
+    # "[r1, ..., rn" was processed; an append continues it with ", rn+1, ...]"
+    if not tail.startswith(b","):
+        return None
+    try:
+        records = json.loads(b"[" + tail[1:])
+    except ValueError:
+        return None
+    return records if isinstance(records, list) else None
+
+
+def _load(data: bytes) -> List[Dict[str, Any]]:
+    records = json.loads(data) if data.strip() else []
+    return records if isinstance(records, list) else []
+
+
+def _frame_rows(columns: Dict[str, np.ndarray]) -> List[tuple]:
+    values = [columns[name].tolist() for name in FRAME_COLUMNS]
+    return [tuple(None if v != v else v for v in row) for row in zip(*values)]
+
+
+def _frame_columns(rows: List[tuple]) -> Dict[str, np.ndarray]:
+    values = list(zip(*rows)) or [()] * len(FRAME_COLUMNS)
+    return {
+        name: np.array(column, dtype=np.float64 if name in ("seeing", "min", "max") else str)
+        for name, column in zip(FRAME_COLUMNS, values)
+    }
+
+
+def _concat(*parts: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    return {name: np.concatenate([part[name] for part in parts]) for name in FRAME_COLUMNS}
+
+
+science_rollups = ScienceRollups()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update the per-night science QA rollups.")
+    parser.add_argument("source", help="science QA JSON file")
+    parser.add_argument("--rebuild", action="store_true", help="Aggregate every night again.")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    result = science_rollups.update(os.path.abspath(args.source), rebuild=args.rebuild)
+    print(f"Aggregated {result['nights']} nights into {ROLLUP_PATH} ({time.perf_counter() - start:.2f} s)")
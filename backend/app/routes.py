@@ -3,6 +3,7 @@ import os
 import base64
 from dotenv import load_dotenv
 import json
+import time
 import subprocess
 
 load_dotenv()
@@ -17,6 +18,34 @@ def serve():
 # def static_proxy(path):
 #     return send_from_directory(current_app.static_folder, '/static/' + path)
 
+@api_bp.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@api_bp.after_request
+def record_request_metrics(response):
+    """Per-route latency, size and status counts (see metrics.py)"""
+    from .metrics import record_request
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        record_request(route, request.method, response.status_code, time.perf_counter() - start,
+                       response.content_length)
+    return response
+
+@api_bp.teardown_request
+def record_failed_request(exc):
+    # Teardown runs last, when the request context is popped. For an unhandled
+    # exception Flask normally still runs after_request on the 500 response,
+    # which pops request_start first, so nothing is counted twice here. Only
+    # when PROPAGATE_EXCEPTIONS is set (debug/testing) is after_request skipped
+    # and the failed request recorded here instead.
+    start = g.pop('request_start', None)
+    if exc is not None and start is not None:
+        from .metrics import record_request
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        record_request(route, request.method, 500, time.perf_counter() - start)
+
 def generate_nonce():
     g.nonce = base64.b64encode(os.urandom(16)).decode('utf-8')
 
@@ -32,7 +61,9 @@ def add_header(response):
         samesite='Lax',     # Protect against CSRF
         max_age=3600        # Expire in 1 hour
     )
-    response.headers['Cache-Control'] = 'no-store'
+    if not response.cache_control.max_age:
+        # Responses that opt into caching (e.g. thumbnails) keep their max-age
+        response.headers['Cache-Control'] = 'no-store'
     response.headers['X-Content-Type-Options'] = 'nosniff'
     response.headers['Content-Security-Policy'] = (
         f"default-src 'self'; "
@@ -109,7 +140,7 @@ def get_text():
 @api_bp.route('/api/images')
 def get_images():
     from .const import DATA_DIR
-    from .monitor import link_to_images, param_set
+    from ._monitor import link_to_images, param_set
     date, unit, obj, filt, masterframe = param_set(request)
 
     images_list = link_to_images(date, unit=unit, obj=obj, filt=filt, masterframe=masterframe)
@@ -130,17 +161,47 @@ def get_images():
                 "names": names
         })
 
+@api_bp.route('/api/images/bundle')
+def get_images_bundle():
+    """
+    All figures of a pipeline row in one streamed, uncompressed zip
+
+    Takes the same date/obj/filt/unit/masterframe parameters as /api/images.
+    """
+    from flask import Response, stream_with_context
+    from ._monitor import link_to_images, param_set
+    from .files import resolve_data_path, stream_zip
+    date, unit, obj, filt, masterframe = param_set(request)
+
+    images_list = link_to_images(date, unit=unit, obj=obj, filt=filt, masterframe=masterframe)
+    paths = [path for path in map(resolve_data_path, sorted(images_list)) if path]
+    if len(paths) == 0:
+        return jsonify({
+                "success": False,
+                "error": "No images found"
+        }), 404
+
+    name = "_".join(str(part) for part in (date, unit or obj, filt) if part)
+    return Response(
+        stream_with_context(chunk for chunk in stream_zip(paths) if chunk),
+        mimetype="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{name}_figures.zip"'},
+    )
+
 @api_bp.route('/api/image')
 def get_image():
     from .const import DATA_DIR
     
     try:
+        from .files import resolve_data_path, send_data_file
         filename = request.args.get("filename")
-        image_path = os.path.join(DATA_DIR, filename)
+        if not filename:
+            raise ValueError("Missing filename")
+        image_path = resolve_data_path(filename)
         try:
-            if os.path.exists(image_path) and os.path.isfile(image_path):
-                # Send the file directly to the client
-                return send_file(image_path)
+            if image_path:
+                # Send the file (or hand it to Nginx) after validating the path
+                return send_data_file(image_path)
             else:
                 return jsonify({
                     "success": False,
@@ -185,18 +246,63 @@ def get_image():
                 "error": str(e)
             }), 500
 
+@api_bp.route('/api/thumbnail')
+def get_thumbnail():
+    """
+    Downscaled preview of a pipeline figure
+
+    Query parameters:
+    - filename: figure path as returned by /api/images
+    - size: longest edge in pixels (128, 256 or 512; default 256)
+    """
+    from .files import resolve_data_path
+    from .thumbnails import clamp_size, get_thumbnail as make_thumbnail, FORMATS
+
+    source = resolve_data_path(request.args.get("filename"))
+    if source is None:
+        return jsonify({
+            "success": False,
+            "error": "Image not found"
+        }), 404
+
+    fmt = "webp" if "image/webp" in request.headers.get("Accept", "") else "jpeg"
+    try:
+        path = make_thumbnail(source, clamp_size(request.args.get("size")), fmt)
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+    response = send_file(path, mimetype=FORMATS[fmt][1], max_age=3600, conditional=True)
+    response.vary.add("Accept")
+    return response
+
 @api_bp.route('/api/comments', methods=["GET", "POST"])
 def get_comments():
     """Handle GET and POST requests for comments.
     
     GET: Retrieve comments for a specific pipeline entry.
-    POST: Add a new comment to the comments file.
+    POST: Add a new comment to the comments store.
+
+    The entry is given either by the legacy file_path of its comments file
+    or by date and obj/filt (science) or unit (masterframe=true).
     """
-    # Get file path directly from request
+    from .comments import comment_store, key_from_file, science_target
+    from .monitor import param_set
+
     comments_file = request.args.get('file_path')
-    
-    if not comments_file:
-        return jsonify({'error': 'Missing file_path parameter'}), 400
+    if comments_file:
+        key = key_from_file(comments_file)
+    else:
+        date, unit, obj, filt, masterframe = param_set(request)
+        if masterframe:
+            key = (date, unit) if date and unit else None
+        else:
+            key = (date, science_target(obj, filt)) if date and obj and filt else None
+
+    if not key:
+        return jsonify({'error': 'Missing file_path or date/obj/filt/unit parameters'}), 400
+    date, target = key
     
     if request.method == "POST":
         # Handle adding a new comment
@@ -204,71 +310,104 @@ def get_comments():
         if not data:
             return jsonify({"error": "No data provided"}), 400
 
-        comment = {
-            "author": data["author"],
-            "datetime": data["datetime"],  # Keep consistent with frontend
-            "text": data["comment"]
-        }
-
-        # Ensure the directory exists
-        os.makedirs(os.path.dirname(comments_file), exist_ok=True)
-
-        # Append the comment to the file
         try:
-            with open(comments_file, "a") as f:
-                f.write(f"{comment['author']}|{comment['datetime']}|{comment['text']}\n")
+            comment_store.add(date, target, data["author"], data["datetime"], data["comment"])
+            from .cache import invalidate_pipeline
+            invalidate_pipeline(date)
             return jsonify({"success": True})
         except Exception as e:
             return jsonify({"error": f"Failed to write comment: {str(e)}"}), 500
 
     else:  # GET request
-        # Retrieve existing comments
-        comments = []
-        try:
-            with open(comments_file, "r") as f:
-                for line in f:
-                    # Split the line, ensuring it has exactly 3 parts
-                    parts = line.strip().split("|", 2)
-                    if len(parts) != 3:
-                        continue  # Skip malformed lines
-                    author, datetime, text = parts
-                    comments.append({"author": author, "datetime": datetime, "text": text})
-        except FileNotFoundError:
-            pass  # Return empty list if file doesn't exist
-        
-        return jsonify({'comments': comments})
+        return jsonify({'comments': comment_store.get(date, target)})
 
 @api_bp.route('/api/rerun', methods=["POST"])
 def rerun_pipeline():
-    from .monitor import param_set
-    try:
-        date, unit, obj, filt, masterframe = param_set(request)
-
-        obs_params = {
-            'date': date,
-            'obj': obj,
-            'unit': unit,
-            'filter': filt,
-            'masterframe': bool(masterframe)
-        }
-
-        #np.save(f"/tmp/pipeline/request_{np.random.randint(0, 1000000)}.npy", obs_params)
+    """
+    Queue a rerun of a pipeline row (see reruns.py)
 
-        return jsonify({
-            "success": True, 
-            "message": "Pipeline rerun completed successfully"
-        })
+    Query parameters:
+        date, obj, filt: science row; or date, unit with masterframe=true
+        priority: 0-10, higher runs first (default 0)
+        author: who asked for it (default: client address)
 
+    A request for a row that already has a pending job is merged into it.
+    """
+    from ._monitor import param_set
+    from .reruns import rerun_queue
+    date, unit, obj, filt, masterframe = param_set(request)
+    try:
+        priority = int(request.args.get('priority', 0))
+        job, merged = rerun_queue.submit(
+            date, obj=obj, filt=filt, unit=unit, masterframe=bool(masterframe), priority=priority,
+            requested_by=request.args.get('author') or request.headers.get('X-Real-IP') or request.remote_addr,
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({
             "success": False, 
             "error": str(e)
         }), 500
-        
-#for testing
+
+    if merged:
+        message = f"Rerun already queued (job {job['id']}, {job['requests']} requests)"
+    else:
+        message = f"Rerun queued (job {job['id']})"
+    return jsonify({
+        "success": True, 
+        "merged": merged,
+        "job": job,
+        "message": message
+    })
+
+@api_bp.route('/api/rerun/jobs', methods=['GET'])
+def rerun_jobs():
+    """
+    Rerun jobs, newest first, with counts by status
+
+    Query parameters:
+        date: only jobs of this date
+        status: pending, running, completed, failed or cancelled
+        limit: at most this many jobs (default 100)
+    """
+    from .reruns import rerun_queue, STATUSES
+    status = request.args.get('status')
+    if status and status not in STATUSES:
+        return jsonify({'error': f'status must be one of {", ".join(STATUSES)}'}), 400
+    limit = min(request.args.get('limit', 100, type=int), 1000)
+    return jsonify({
+        'jobs': rerun_queue.jobs(request.args.get('date'), status, limit),
+        'summary': rerun_queue.summary(),
+    })
+
+@api_bp.route('/api/rerun/jobs/<int:job_id>', methods=['GET', 'DELETE'])
+def rerun_job(job_id):
+    """One rerun job; DELETE cancels it while it is still pending"""
+    from .reruns import rerun_queue
+    job = rerun_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if request.method == 'DELETE':
+        if not rerun_queue.cancel(job_id):
+            return jsonify({'error': 'Only pending jobs can be cancelled'}), 409
+        job = rerun_queue.get(job_id)
+    return jsonify(job)
+
 @api_bp.route('/api/status', methods=['GET'])
 def get_status():
-    """Get system status - returns cached values"""
+    """
+    Get system status - returns cached values
+
+    With SYSTEM_METRICS enabled this is the collector's latest sample (see
+    sysmetrics.py); otherwise the test snapshot.
+    """
+    if current_app.config.get("SYSTEM_METRICS"):
+        from .sysmetrics import collector
+        collector.start()
+        return jsonify(collector.latest())
+
+    #for testing
     SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     try:
         with open(SCRIPT_DIR + '/test/status.json', 'r') as f:
@@ -277,43 +416,110 @@ def get_status():
         status ={}
     return jsonify(status)
 
-@api_bp.route('/api/pipeline-status')
-def get_pipeline_status():
-    SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+@api_bp.route('/api/status/history', methods=['GET'])
+def get_status_history():
+    """
+    Downsampled system metric history from the collector's ring buffer
 
+    Query parameters:
+        metrics: Comma-separated metric names or prefixes ending in '.' (default: all)
+        window: Seconds of history (default 3600)
+        points: Maximum points per metric (default 360)
+    Example: /api/status/history?metrics=cpu.percent,memory.percent,gpu.&window=86400&points=288
+    """
+    if not current_app.config.get("SYSTEM_METRICS"):
+        return jsonify({'error': 'System metrics collector is disabled'}), 404
+    from .sysmetrics import collector
+    collector.start()
+    metrics = [m for m in request.args.get('metrics', '').split(',') if m]
     try:
-        date = request.args.get('date')
-        with open(SCRIPT_DIR + '/test/pipeline-status.json', 'r') as f:
-            status=json.load(f)
-    except FileNotFoundError:
-        status ={}
-    return jsonify(status)
+        return jsonify(collector.history(
+            metrics=metrics,
+            window=request.args.get('window', 3600, type=float),
+            points=request.args.get('points', 360, type=int),
+        ))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-@api_bp.route('/api/masterframe-status')
-def get_masterframe_status():
-    import os
-    import json
+def status_response(scope, rows):
+    """
+    Respond with status rows, or only their changes if the request has `since`
+
+    The scope's version is sent in the X-Status-Version header; passing it
+    back as `since` returns {'version', 'full', 'changed', 'removed'}.
+    """
+    from .changes import change_log
+    version = change_log.record(scope, rows)
+    since = request.args.get('since')
+    if since is None:
+        response = jsonify(rows)
+    else:
+        response = jsonify(change_log.since(scope, since))
+    response.headers['X-Status-Version'] = str(version)
+    return response
+
+def read_status_rows(name):
+    """Rows of a status table (pipeline-status or masterframe-status), [] if missing"""
     SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     try:
-        with open(SCRIPT_DIR + '/test/masterframe-status.json', 'r') as f:
-            status = json.load(f)
+        with open(SCRIPT_DIR + f'/test/{name}.json', 'r') as f:
+            return json.load(f)
     except FileNotFoundError:
-        status = []
-    return jsonify(status)
+        return []
 
+@api_bp.route('/api/pipeline-status')
+def get_pipeline_status():
+    date = request.args.get('date')
+    return status_response(f"science:{date}", read_status_rows('pipeline-status'))
+
+@api_bp.route('/api/masterframe-status')
+def get_masterframe_status():
+    date = request.args.get('date')
+    return status_response(f"masterframe:{date}", read_status_rows('masterframe-status'))
 
 
+
+def scheduler_snapshot():
+    from .scheduler import get_scheduler
+    SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return get_scheduler(SCRIPT_DIR + '/test/scheduler.json')
+
 @api_bp.route('/api/scheduler')
 def get_scheduler_data():
-    import os
-    import json
-    SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    """Scheduler queue, served from the snapshot loaded once per file change"""
+    return current_app.response_class(scheduler_snapshot().raw(), mimetype='application/json')
+
+@api_bp.route('/api/scheduler/stats')
+def get_scheduler_stats():
+    """
+    Queue statistics of the scheduler snapshot
+
+    Returns total, running, counts by_status / by_input_type /
+    by_status_input_type, and duration {count, mean, p95} per input_type and
+    per priority.
+    Example: /api/scheduler/stats
+    """
     try:
-        with open(SCRIPT_DIR + '/test/scheduler.json', 'r') as f:
-            status = json.load(f)
-    except FileNotFoundError:
-        status = []
-    return jsonify(status)
+        return jsonify(scheduler_snapshot().stats())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/api/scheduler/eta')
+def get_scheduler_eta():
+    """
+    Expected finish time of each queued job and of the whole queue
+
+    Query parameters:
+        workers: Worker count to simulate (default PIPELINE_SCHEDULER_WORKERS)
+    Example: /api/scheduler/eta?workers=8
+    """
+    from .eta import queue_estimator, WORKERS
+    try:
+        workers = request.args.get('workers', WORKERS, type=int)
+        return jsonify(queue_estimator.estimate(scheduler_snapshot(), workers=workers))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 
 # # @api_bp.route('/api/service-status')
@@ -416,23 +622,65 @@ def get_plot():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@api_bp.route('/api/qa-records', methods=['GET'])
+def get_qa_records():
+    """
+    One page of QA records from the pipeline database
+
+    Query parameters:
+    - type: bias, dark, flat or science
+    - dateMin / dateMax: inclusive created_at range (YYYY-MM-DD, optional)
+    - columns: comma separated columns to return (optional, default all)
+    - limit: records per page (optional, at most 5000)
+    - cursor: next_cursor of the previous page (optional)
+
+    Responds 503 if the QA table cannot be read from the database.
+
+    Example:
+    GET /api/qa-records?type=flat&dateMin=2025-10-01&dateMax=2025-10-31&columns=unit,filter,sigmean
+    """
+    from .database import db_connection, DatabaseUnavailable, QA_PAGE_SIZE, QA_TYPES
+
+    qa_type = request.args.get('type')
+    if qa_type not in QA_TYPES:
+        return jsonify({'error': f'"type" must be one of {", ".join(sorted(QA_TYPES))}'}), 400
+    columns = request.args.get('columns')
+    try:
+        page = db_connection.get_qa_plot_page(
+            qa_type,
+            start_date=request.args.get('dateMin'),
+            end_date=request.args.get('dateMax'),
+            columns=[c for c in columns.split(',') if c] if columns else None,
+            limit=int(request.args.get('limit', QA_PAGE_SIZE)),
+            cursor=request.args.get('cursor'),
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except DatabaseUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+    return jsonify(page)
+
 @api_bp.route('/api/inst-log', methods=['GET', 'POST'])
 def inst_log():
+    """
+    Instrument log events
+
+    GET returns {"success": true, "events": [...]}. POST accepts either the full document
+    {"events": [...]} or incremental changes {"add": [...], "delete": [...]};
+    only the changed events are appended to the journal (see instlog.py).
+    """
     import os
-    import json
+    from .instlog import get_inst_log
     
     SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    inst_log_file = SCRIPT_DIR + '/test/inst-log.json'
+    store = get_inst_log(SCRIPT_DIR + '/test/inst-log.json')
     
     if request.method == 'GET':
         try:
-            if not os.path.exists(inst_log_file):
+            if not store.exists():
                 return jsonify({'error': 'File not found'}), 404
             
-            with open(inst_log_file, 'r') as f:
-                data = json.load(f)
-            
-            return jsonify(data)
+            return jsonify({'success': True, 'events': store.events()})
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
@@ -442,18 +690,138 @@ def inst_log():
             if not data:
                 return jsonify({'error': 'No data provided'}), 400
             
-            # Ensure the directory exists
-            os.makedirs(os.path.dirname(inst_log_file), exist_ok=True)
-            
-            # Write the JSON data to the file
-            with open(inst_log_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            if 'events' in data:
+                written = store.replace(data['events'])
+            else:
+                written = store.append(add=data.get('add', []), delete=data.get('delete', []))
             
-            return jsonify({'success': True, 'message': 'inst-log.json updated successfully'})
+            return jsonify({'success': True, 'message': f'inst-log updated ({written} changes)'})
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
 
+@api_bp.route('/api/pipeline-status/bulk', methods=['GET'])
+def get_pipeline_status_bulk():
+    """
+    Science and masterframe status rows for a range of dates in one request
+
+    Rows come from the same source as /api/pipeline-status and
+    /api/masterframe-status, and each scope is recorded in the change log,
+    so `version` can be passed back to those endpoints as `since`.
+
+    Query parameters:
+    - dateMin / dateMax: inclusive date range (YYYY-MM-DD, at most 31 days)
+
+    Returns {date: {'science': {version, rows}, 'masterframe': {version, rows}}}
+
+    Example:
+    GET /api/pipeline-status/bulk?dateMin=2025-10-15&dateMax=2025-10-21
+    """
+    from datetime import datetime, timedelta
+    from .changes import change_log, row_key
+
+    date_min = request.args.get('dateMin')
+    date_max = request.args.get('dateMax') or date_min
+    if not date_min:
+        return jsonify({'error': 'Missing "dateMin" query parameter'}), 400
+    try:
+        first = datetime.strptime(date_min, '%Y-%m-%d')
+        span = (datetime.strptime(date_max, '%Y-%m-%d') - first).days
+    except ValueError:
+        return jsonify({'error': 'Dates must be in YYYY-MM-DD format'}), 400
+    if span < 0 or span > 30:
+        return jsonify({'error': 'Date range must span 1 to 31 days'}), 400
+
+    sources = {'science': read_status_rows('pipeline-status'),
+               'masterframe': read_status_rows('masterframe-status')}
+    result = {}
+    for offset in range(span + 1):
+        day = (first + timedelta(days=offset)).strftime('%Y-%m-%d')
+        result[day] = {
+            kind: {'version': change_log.record(f"{kind}:{day}", rows),
+                   'rows': [dict(row, row_id=row_key(row)) for row in rows]}
+            for kind, rows in sources.items()
+        }
+    return jsonify(result)
+
+
+@api_bp.route('/api/raw-data-counts', methods=['GET'])
+def get_raw_data_counts():
+    """
+    Raw frame counts per date, type and unit for a calendar view
+
+    Query parameters:
+    - dates: comma separated YYYY-MM-DD dates, or
+    - dateMin / dateMax: inclusive date range (at most 92 days)
+
+    Responds 503 if the counts cannot be read from the database.
+
+    Example:
+    GET /api/raw-data-counts?dateMin=2025-10-01&dateMax=2025-10-31
+    """
+    from .database import db_connection, DatabaseUnavailable
+    dates = request.args.get('dates')
+    date_min = request.args.get('dateMin')
+    date_max = request.args.get('dateMax')
+    if not (dates or date_min or date_max):
+        return jsonify({'error': 'Missing "dates" or "dateMin"/"dateMax" query parameter'}), 400
+
+    try:
+        if dates:
+            counts = db_connection.get_raw_data_counts(dates=[d for d in dates.split(',') if d])
+        else:
+            counts = db_connection.get_raw_data_counts(start_date=date_min, end_date=date_max)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except DatabaseUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+    return jsonify(counts)
+
+
+@api_bp.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Request and cache metrics of all workers in Prometheus text format"""
+    from .metrics import render
+    return current_app.response_class(render(), mimetype='text/plain; version=0.0.4')
+
+@api_bp.route('/api/profiles', methods=['GET'])
+def get_profiles():
+    """
+    Captured request profiles (requires the profile token in the X-Profile header)
+
+    Query parameters:
+        sort: 'recent' (default) or 'slowest'
+        limit: Number of profiles (default 20)
+        name: Return the pstats summary of one profile instead
+        order: pstats sort for the summary: 'cumulative' (default), 'tottime' or 'calls'
+    Example: /api/profiles?sort=slowest&limit=10 with header X-Profile: <token>
+    """
+    from .profiling import authorized, list_profiles, profile_summary
+    token = current_app.config.get('PROFILE_TOKEN')
+    if not authorized(token, request.headers.get('X-Profile')):
+        return jsonify({'error': 'Not authorized'}), 403
+
+    name = request.args.get('name')
+    if name:
+        order = request.args.get('order', 'cumulative')
+        if order not in ('cumulative', 'tottime', 'calls'):
+            return jsonify({'error': f'Invalid order: {order}'}), 400
+        summary = profile_summary(name, sort=order)
+        if summary is None:
+            return jsonify({'error': 'Profile not found'}), 404
+        return current_app.response_class(summary, mimetype='text/plain')
+
+    sort = request.args.get('sort', 'recent')
+    limit = request.args.get('limit', 20, type=int)
+    return jsonify(list_profiles(sort=sort, limit=limit))
+
+@api_bp.route('/api/db-status', methods=['GET'])
+def get_db_status():
+    """Connection pool size, usage and wait-time metrics of this worker"""
+    from .database import db_connection
+    return jsonify(db_connection.pool_stats())
+
+
 @api_bp.route('/api/qa-config', methods=['GET'])
 def get_qa_config():
     """
@@ -502,3 +870,80 @@ def get_qa_config():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+
+@api_bp.route('/api/qa-check', methods=['GET'])
+def get_qa_check():
+    """
+    QA records checked against the qa-config references (see qacheck.py)
+
+    Query parameters:
+    - type: 'bias', 'dark', 'flat' or 'science'
+    - unit, filter: comma separated selections (optional)
+    - dateMin / dateMax: inclusive YYYY-MM-DD range (optional)
+    - failed: 'true' to return only out-of-spec records instead of flag columns
+
+    Example:
+    GET /api/qa-check?type=flat&unit=7DT01,7DT02&dateMin=2025-01-01&failed=true
+    """
+    from .qacheck import get_dataset, get_reference, qa_checker
+    SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    qa_type = request.args.get('type')
+    if qa_type not in ('bias', 'dark', 'flat', 'science'):
+        return jsonify({'error': 'Invalid or missing "type" (bias, dark, flat or science)'}), 400
+    config_type = 'science' if qa_type == 'science' else 'masterframe'
+    data_file = SCRIPT_DIR + f'/test/{qa_type}.json'
+    config_file = SCRIPT_DIR + f'/test/{config_type}_config.json'
+    if not os.path.exists(data_file) or not os.path.exists(config_file):
+        return jsonify({'error': 'File not found'}), 404
+
+    def split(name):
+        value = request.args.get(name)
+        return [v for v in value.split(',') if v] if value else None
+
+    try:
+        dataset = get_dataset(data_file, 'date_obs' if qa_type == 'science' else 'run_date')
+        result = qa_checker.check(
+            dataset, get_reference(config_file), qa_type,
+            units=split('unit'), filters=split('filter'),
+            date_min=request.args.get('dateMin'), date_max=request.args.get('dateMax'),
+            failed_only=request.args.get('failed', 'false').lower() == 'true',
+        )
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/api/qa-rollup', methods=['GET'])
+def get_qa_rollup():
+    """
+    Per-night, per-unit, per-filter science QA aggregates (see rollups.py)
+
+    Query parameters:
+    - dateMin / dateMax: inclusive YYYY-MM-DD night range (optional)
+    - unit, filter: comma separated selections (optional)
+
+    Each row has night, unit, filter, count, seeing (median), seeing_mean,
+    p10, q1, q3, p90, seeing_min, seeing_max, min and max.
+
+    Example:
+    GET /api/qa-rollup?dateMin=2025-01-01&dateMax=2025-12-31&filter=r,i
+    """
+    from .rollups import science_rollups
+    SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    source = SCRIPT_DIR + '/test/science.json'
+    if not os.path.exists(source):
+        return jsonify({'error': 'File not found'}), 404
+
+    def split(name):
+        value = request.args.get(name)
+        return [v for v in value.split(',') if v] if value else None
+
+    try:
+        science_rollups.update(source)
+        rows = science_rollups.query(source, request.args.get('dateMin'), request.args.get('dateMax'),
+                                     units=split('unit'), filters=split('filter'))
+        return jsonify({'rollups': rows, 'count': len(rows)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
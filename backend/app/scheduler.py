@@ -0,0 +1,185 @@
+"""
+Scheduler queue snapshot.
+
+The scheduler file ({"count", "data": [...]}) is parsed once per change of
+its mtime/size and kept per process together with the raw bytes, so a poll
+of /api/scheduler is a stat() and a write of cached bytes.
+
+Queue statistics are kept up to date incrementally: on reload the entries
+are diffed by their ``index`` and only added, changed or removed entries
+update the counters and the sorted duration lists, so /api/scheduler/stats
+never walks the full queue.
+"""
+
+import os
+import json
+import math
+import bisect
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from .metrics import count_cache
+
+# Scheduler statuses: Pending, Ready, Processing, Completed, Failed
+RUNNING_STATUSES = ("Processing",)
+DURATION_GROUPS = ("input_type", "priority")
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return None
+    rank = max(1, math.ceil(q / 100 * len(values)))
+    return values[rank - 1]
+
+
+class QueueStats:
+    """Counters and duration distributions updated one entry at a time"""
+
+    def __init__(self):
+        self.by_status = Counter()
+        self.by_input_type = Counter()
+        self.by_status_input_type = Counter()
+        # (group, value) -> sorted durations and their sum
+        self.durations: Dict[Tuple[str, Any], List[float]] = {}
+        self.duration_sums: Dict[Tuple[str, Any], float] = Counter()
+
+    def _update(self, entry: Dict[str, Any], sign: int):
+        status = entry.get("status")
+        input_type = entry.get("input_type")
+        self.by_status[status] += sign
+        self.by_input_type[input_type] += sign
+        self.by_status_input_type[(status, input_type)] += sign
+
+        duration = entry.get("duration")
+        if duration is None:
+            return
+        for group in DURATION_GROUPS:
+            key = (group, entry.get(group))
+            values = self.durations.setdefault(key, [])
+            if sign > 0:
+                bisect.insort(values, duration)
+            else:
+                i = bisect.bisect_left(values, duration)
+                if i < len(values) and values[i] == duration:
+                    del values[i]
+            self.duration_sums[key] += sign * duration
+            if not values:
+                del self.durations[key]
+                del self.duration_sums[key]
+
+    def add(self, entry: Dict[str, Any]):
+        self._update(entry, 1)
+
+    def remove(self, entry: Dict[str, Any]):
+        self._update(entry, -1)
+
+    def summary(self) -> Dict[str, Any]:
+        by_status_input_type: Dict[str, Dict[str, int]] = {}
+        for (status, input_type), n in self.by_status_input_type.items():
+            if n:
+                by_status_input_type.setdefault(str(status), {})[str(input_type)] = n
+
+        durations: Dict[str, Dict[str, Dict[str, Any]]] = {group: {} for group in DURATION_GROUPS}
+        for (group, value), values in self.durations.items():
+            durations[group][str(value)] = {
+                "count": len(values),
+                "mean": self.duration_sums[(group, value)] / len(values),
+                "p95": _percentile(values, 95),
+            }
+
+        return {
+            "total": sum(self.by_status.values()),
+            "running": sum(self.by_status[status] for status in RUNNING_STATUSES),
+            "by_status": {str(k): n for k, n in self.by_status.items() if n},
+            "by_input_type": {str(k): n for k, n in self.by_input_type.items() if n},
+            "by_status_input_type": by_status_input_type,
+            "duration": durations,
+        }
+
+
+class SchedulerSnapshot:
+    """Per-process cache of the scheduler file with incremental queue stats"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._identity = None
+        self._raw = b"[]"
+        self._data: Dict[str, Any] = {}
+        self._entries: Dict[Any, Dict[str, Any]] = {}
+        self._stats = QueueStats()
+        self.version = 0
+
+    def _file_identity(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def refresh(self) -> bool:
+        """
+        Reload the file if it changed since the last call
+
+        Returns:
+            True if the snapshot changed
+        """
+        identity = self._file_identity()
+        if identity == self._identity:
+            count_cache("scheduler", True)
+            return False
+        count_cache("scheduler", False)
+        with self._lock:
+            if identity == self._identity:
+                return False
+            if identity is None:
+                raw, data = b"[]", {}
+            else:
+                with open(self.path, "rb") as f:
+                    raw = f.read()
+                try:
+                    data = json.loads(raw)
+                except ValueError:
+                    # Caught mid-write; keep the previous snapshot and retry next time
+                    return False
+            entries = data.get("data", []) if isinstance(data, dict) else data
+            self._apply({entry.get("index", i): entry for i, entry in enumerate(entries)})
+            self._raw, self._data, self._identity = raw, data, identity
+            self.version += 1
+            return True
+
+    def _apply(self, entries: Dict[Any, Dict[str, Any]]):
+        for index, old in self._entries.items():
+            new = entries.get(index)
+            if new != old:
+                self._stats.remove(old)
+        for index, new in entries.items():
+            if self._entries.get(index) != new:
+                self._stats.add(new)
+        self._entries = entries
+
+    def raw(self) -> bytes:
+        """The file as stored (already JSON)"""
+        self.refresh()
+        return self._raw
+
+    def entries(self) -> List[Dict[str, Any]]:
+        self.refresh()
+        return list(self._entries.values())
+
+    def stats(self) -> Dict[str, Any]:
+        self.refresh()
+        with self._lock:
+            return dict(self._stats.summary(), version=self.version)
+
+
+_snapshots: Dict[str, SchedulerSnapshot] = {}
+
+
+def get_scheduler(path: str) -> SchedulerSnapshot:
+    """Per-process SchedulerSnapshot of a scheduler file"""
+    if path not in _snapshots:
+        _snapshots[path] = SchedulerSnapshot(path)
+    return _snapshots[path]
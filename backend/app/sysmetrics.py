@@ -0,0 +1,416 @@
+"""
+System metrics collector.
+
+One process samples /proc (CPU per core, memory, disk and network
+throughput), statvfs of the data partitions and, less often, nvidia-smi on
+a fixed cadence. Every uwsgi worker runs a collector thread, but only the
+one holding an exclusive flock samples; the others retry the lock and take
+over if that worker is recycled.
+
+Each sample is written to
+
+* ``latest.json``: the snapshot served by /api/status (status.json shape);
+* ``history.npy``: a fixed-size ring buffer, memory-mapped by every worker,
+  one row per sample with a column per metric (names in ``columns.json``).
+  Row 0 holds the number of samples written so far.
+
+So a Dashboard poll never reads a sensor, and history windows are array
+slices downsampled with numpy.
+"""
+
+import os
+import json
+import time
+import fcntl
+import shutil
+import subprocess
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .metrics import count_cache
+
+METRICS_DIR = os.getenv("PIPELINE_METRICS_DIR", "/tmp/pipeline/metrics")
+SAMPLE_INTERVAL = float(os.getenv("PIPELINE_METRICS_INTERVAL", "5"))
+GPU_INTERVAL = float(os.getenv("PIPELINE_GPU_INTERVAL", "30"))
+# 24 h at the default interval
+HISTORY_SIZE = int(os.getenv("PIPELINE_METRICS_HISTORY", "17280"))
+# name=mount point pairs, comma separated
+DISK_PARTITIONS = os.getenv("PIPELINE_DISK_PARTITIONS", "Lyman data1=/lyman/data1,Lyman data2=/lyman/data2")
+MAX_POINTS = 2000
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _partitions() -> List[Tuple[str, str]]:
+    pairs = []
+    for item in DISK_PARTITIONS.split(","):
+        if "=" in item:
+            name, mount = item.split("=", 1)
+            pairs.append((name.strip(), mount.strip()))
+    return pairs
+
+
+def _read_cpu_times() -> List[Tuple[int, int]]:
+    """(busy, total) jiffies of all CPUs, then of each core"""
+    times = []
+    with open("/proc/stat") as f:
+        for line in f:
+            if not line.startswith("cpu"):
+                break
+            values = [int(v) for v in line.split()[1:]]
+            total = sum(values[:8])  # guest time is already part of user
+            idle = values[3] + (values[4] if len(values) > 4 else 0)
+            times.append((total - idle, total))
+    return times
+
+
+def _read_memory() -> Dict[str, int]:
+    info = {}
+    with open("/proc/meminfo") as f:
+        for line in f:
+            key, value = line.split(":", 1)
+            if key in ("MemTotal", "MemAvailable"):
+                info[key] = int(value.split()[0]) * 1024
+    return info
+
+
+def _block_devices() -> List[str]:
+    try:
+        return [d for d in os.listdir("/sys/block") if not d.startswith(("loop", "ram", "zram"))]
+    except FileNotFoundError:
+        return []
+
+
+def _read_disk_bytes(devices) -> Tuple[int, int]:
+    """Bytes read and written by whole block devices (partitions excluded)"""
+    read = written = 0
+    with open("/proc/diskstats") as f:
+        for line in f:
+            fields = line.split()
+            if fields[2] in devices:
+                read += int(fields[5]) * 512
+                written += int(fields[9]) * 512
+    return read, written
+
+
+def _read_network_bytes() -> Tuple[int, int]:
+    received = sent = 0
+    with open("/proc/net/dev") as f:
+        for line in f.readlines()[2:]:
+            name, data = line.split(":", 1)
+            if name.strip() == "lo":
+                continue
+            fields = data.split()
+            received += int(fields[0])
+            sent += int(fields[8])
+    return received, sent
+
+
+def _read_gpus() -> List[Dict[str, int]]:
+    if shutil.which("nvidia-smi") is None:
+        return []
+    try:
+        out = subprocess.run(
+            ["nvidia-smi", "--query-gpu=index,temperature.gpu,memory.total,memory.used,utilization.gpu",
+             "--format=csv,noheader,nounits"],
+            capture_output=True, text=True, timeout=10, check=True,
+        ).stdout
+    except (subprocess.SubprocessError, OSError) as e:
+        print(f"nvidia-smi failed: {e}")
+        return []
+    gpus = []
+    for line in out.strip().splitlines():
+        try:
+            index, temperature, total, used, utilization = (int(float(v)) for v in line.split(","))
+        except ValueError:
+            continue
+        gpus.append({"index": index, "temperature": temperature, "total": total,
+                     "used": used, "utilization": utilization})
+    return gpus
+
+
+class Sampler:
+    """Turns successive /proc readings into status snapshots and metric rows"""
+
+    def __init__(self):
+        self.partitions = _partitions()
+        self.devices = set(_block_devices())
+        self.gpus = _read_gpus()
+        self._gpu_time = time.time()
+        self._last = None
+
+    def columns(self) -> List[str]:
+        n_cores = len(_read_cpu_times()) - 1
+        columns = ["time", "cpu.percent"] + [f"cpu.core.{i}" for i in range(n_cores)]
+        columns += ["memory.percent", "memory.used", "io.read_speed", "io.write_speed",
+                    "network.download_speed", "network.upload_speed"]
+        columns += [f"disk.{i}.percent" for i in range(len(self.partitions))]
+        for gpu in self.gpus:
+            columns += [f"gpu.{gpu['index']}.{key}" for key in ("utilization", "used", "temperature")]
+        return columns
+
+    def sample(self) -> Dict[str, Any]:
+        now = time.time()
+        cpu = _read_cpu_times()
+        disk = _read_disk_bytes(self.devices)
+        network = _read_network_bytes()
+        if self._last is None:
+            # First sample: CPU is averaged since boot, rates start at zero
+            last_time, last_cpu, last_disk, last_network = now, [(0, 0)] * len(cpu), disk, network
+        else:
+            last_time, last_cpu, last_disk, last_network = self._last
+        self._last = (now, cpu, disk, network)
+        dt = max(now - last_time, 1e-6)
+
+        percents = []
+        for (busy, total), (last_busy, last_total) in zip(cpu, last_cpu):
+            d_total = total - last_total
+            percents.append(round(100.0 * (busy - last_busy) / d_total, 1) if d_total > 0 else 0.0)
+
+        memory = _read_memory()
+        mem_total = memory.get("MemTotal", 0)
+        mem_used = mem_total - memory.get("MemAvailable", 0)
+
+        partitions = []
+        for name, mount in self.partitions:
+            try:
+                st = os.statvfs(mount)
+            except OSError:
+                partitions.append({"name": name, "percent": 0.0, "total": 0, "used": 0})
+                continue
+            total = st.f_blocks * st.f_frsize
+            used = (st.f_blocks - st.f_bfree) * st.f_frsize
+            usable = used + st.f_bavail * st.f_frsize
+            partitions.append({"name": name, "percent": round(100.0 * used / usable, 1) if usable else 0.0,
+                               "total": total, "used": used})
+
+        if now - self._gpu_time >= GPU_INTERVAL:
+            self.gpus = _read_gpus() or self.gpus
+            self._gpu_time = now
+
+        timestamp = datetime.fromtimestamp(now).strftime(TIME_FORMAT)
+        return {
+            "time": now,
+            "cpu": {"cores": percents[1:], "percent": percents[0] if percents else 0.0, "timestamp": timestamp},
+            "disk": {"partitions": partitions, "timestamp": timestamp},
+            "gpu": {"info": self.gpus, "timestamp": timestamp},
+            "io": {
+                # MB/s
+                "read_speed": round((disk[0] - last_disk[0]) / dt / 1e6, 2),
+                "write_speed": round((disk[1] - last_disk[1]) / dt / 1e6, 2),
+                "timestamp": timestamp,
+            },
+            "memory": {
+                "percent": round(100.0 * mem_used / mem_total, 1) if mem_total else 0.0,
+                "total": mem_total,
+                "used": mem_used,
+                "timestamp": timestamp,
+            },
+            "network": {
+                # Mbit/s
+                "download_speed": round((network[0] - last_network[0]) * 8 / dt / 1e6, 2),
+                "upload_speed": round((network[1] - last_network[1]) * 8 / dt / 1e6, 2),
+                "timestamp": timestamp,
+            },
+        }
+
+    @staticmethod
+    def row(snapshot: Dict[str, Any], columns: List[str]) -> np.ndarray:
+        values = {"time": snapshot["time"], "cpu.percent": snapshot["cpu"]["percent"]}
+        values.update({f"cpu.core.{i}": v for i, v in enumerate(snapshot["cpu"]["cores"])})
+        for key in ("percent", "used"):
+            values[f"memory.{key}"] = snapshot["memory"][key]
+        for key in ("read_speed", "write_speed"):
+            values[f"io.{key}"] = snapshot["io"][key]
+        for key in ("download_speed", "upload_speed"):
+            values[f"network.{key}"] = snapshot["network"][key]
+        values.update({f"disk.{i}.percent": p["percent"] for i, p in enumerate(snapshot["disk"]["partitions"])})
+        for gpu in snapshot["gpu"]["info"]:
+            for key in ("utilization", "used", "temperature"):
+                values[f"gpu.{gpu['index']}.{key}"] = gpu[key]
+        return np.array([values.get(column, np.nan) for column in columns], dtype=np.float64)
+
+
+def _identity(path: str):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def _write_json(path: str, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+class MetricsCollector:
+    """Leader-elected sampler plus per-process readers of its files"""
+
+    def __init__(self, directory: str = METRICS_DIR, interval: float = SAMPLE_INTERVAL,
+                 capacity: int = HISTORY_SIZE):
+        self.directory = directory
+        self.interval = interval
+        self.capacity = capacity
+        self.latest_path = os.path.join(directory, "latest.json")
+        self.columns_path = os.path.join(directory, "columns.json")
+        self.history_path = os.path.join(directory, "history.npy")
+        self.lock_path = os.path.join(directory, "collector.lock")
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._read_lock = threading.Lock()
+        self._latest = (None, None)
+        self._history = (None, None, None)
+
+    # Sampling (leader only)
+
+    def start(self):
+        """Start this process's collector thread once"""
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="metrics-collector", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        with open(self.lock_path, "a") as lock:
+            while not self._stop.is_set():
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    self._stop.wait(self.interval)  # Another worker samples
+                    continue
+                try:
+                    self._lead()
+                except Exception as e:
+                    print(f"Metrics collector failed: {e}")
+                    self._stop.wait(self.interval)
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _open_history(self, columns: List[str]) -> np.memmap:
+        """Reuse the ring buffer of a previous leader if its layout matches"""
+        try:
+            with open(self.columns_path) as f:
+                meta = json.load(f)
+            if meta.get("columns") == columns and meta.get("capacity") == self.capacity:
+                return np.lib.format.open_memmap(self.history_path, mode="r+")
+        except (FileNotFoundError, ValueError):
+            pass
+        tmp_path = f"{self.history_path}.{os.getpid()}.tmp.npy"
+        history = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=np.float64, shape=(self.capacity + 1, len(columns))
+        )
+        history.flush()
+        os.replace(tmp_path, self.history_path)
+        _write_json(self.columns_path, {"columns": columns, "capacity": self.capacity})
+        return np.lib.format.open_memmap(self.history_path, mode="r+")
+
+    def _lead(self):
+        sampler = Sampler()
+        columns = sampler.columns()
+        history = self._open_history(columns)
+        next_time = time.monotonic()
+        while not self._stop.is_set():
+            snapshot = sampler.sample()
+            count = int(history[0, 0])
+            history[1 + count % self.capacity] = Sampler.row(snapshot, columns)
+            history[0, 0] = count + 1
+            snapshot.pop("time")
+            _write_json(self.latest_path, snapshot)
+
+            next_time += self.interval
+            self._stop.wait(max(next_time - time.monotonic(), 0))
+
+    # Reading (any worker)
+
+    def latest(self, wait: float = 1.0) -> Dict[str, Any]:
+        """Most recent snapshot (waits briefly for the very first sample)"""
+        deadline = time.monotonic() + wait
+        identity = _identity(self.latest_path)
+        while identity is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+            identity = _identity(self.latest_path)
+        if identity is None:
+            return {}
+        with self._read_lock:
+            count_cache("system_status", self._latest[0] == identity)
+            if self._latest[0] != identity:
+                with open(self.latest_path) as f:
+                    self._latest = (identity, json.load(f))
+            return self._latest[1]
+
+    def _open(self):
+        identity = _identity(self.columns_path)
+        if identity is None:
+            return None, None
+        with self._read_lock:
+            if self._history[0] != identity:
+                with open(self.columns_path) as f:
+                    columns = json.load(f)["columns"]
+                history = np.lib.format.open_memmap(self.history_path, mode="r")
+                self._history = (identity, columns, history)
+            return self._history[1], self._history[2]
+
+    def history(self, metrics: Optional[List[str]] = None, window: float = 3600,
+                points: int = 360) -> Dict[str, Any]:
+        """
+        Downsampled history of metrics over the last `window` seconds
+
+        Args:
+            metrics: Column names or prefixes (e.g. 'cpu.percent', 'gpu.'); all by default
+            window: Seconds of history
+            points: Maximum number of points per metric (bucket means)
+
+        Returns:
+            {'columns': [...], 'time': [...], 'values': {metric: [...]}}
+        """
+        columns, history = self._open()
+        if columns is None:
+            return {"columns": [], "time": [], "values": {}}
+        if metrics:
+            selected = [c for c in columns[1:] if any(c == m or (m.endswith(".") and c.startswith(m))
+                                                      for m in metrics)]
+        else:
+            selected = columns[1:]
+        indices = [0] + [columns.index(c) for c in selected]
+
+        count = int(history[0, 0])
+        capacity = history.shape[0] - 1
+        n = min(count, capacity)
+        if n == 0:
+            return {"columns": columns, "time": [], "values": {c: [] for c in selected}}
+        start = count % capacity if count > capacity else 0
+        # Chronological row order; copy only the window and the selected columns
+        order = (np.arange(n) + start) % capacity + 1
+        times = history[order, 0]
+        first = np.searchsorted(times, times[-1] - window)
+        rows = np.asarray(history[np.ix_(order[first:], indices)])
+
+        points = max(1, min(int(points), MAX_POINTS))
+        if len(rows) > points:
+            edges = np.unique(np.linspace(0, len(rows), points + 1).astype(int)[:-1])
+            sizes = np.diff(np.append(edges, len(rows)))
+            with np.errstate(invalid="ignore"):
+                rows = np.add.reduceat(rows, edges, axis=0) / sizes[:, None]
+
+        values = {c: [None if np.isnan(v) else round(float(v), 2) for v in rows[:, i + 1]]
+                  for i, c in enumerate(selected)}
+        return {
+            "columns": columns,
+            "time": [datetime.fromtimestamp(t).strftime(TIME_FORMAT) for t in rows[:, 0]],
+            "values": values,
+        }
+
+
+collector = MetricsCollector()
@@ -0,0 +1,170 @@
+"""
+Thumbnails of pipeline figures.
+
+Thumbnails are generated on first request and stored in a content-addressed
+cache directory: the file name is a hash of the source path, its mtime and
+the thumbnail size/format, so a regenerated figure never serves a stale
+preview. The cache is capped by total bytes; the least recently used files
+(mtime is refreshed on every hit) are evicted first. The directory is only
+scanned when this process's running total (last scan plus its own writes)
+passes the cap, or every EVICT_INTERVAL seconds to catch other workers'
+writes, not on every generation.
+
+Pre-generate after a pipeline stage with
+
+    python -m app.thumbnails /lyman/data2/processed/2025-10-21 --sizes 256
+"""
+
+import os
+import glob
+import time
+import threading
+import hashlib
+import argparse
+from typing import Iterable
+
+from .metrics import count_cache
+
+THUMBNAIL_DIR = os.getenv("PIPELINE_THUMBNAIL_DIR", "/tmp/pipeline/thumbnails")
+THUMBNAIL_CACHE_BYTES = int(os.getenv("PIPELINE_THUMBNAIL_CACHE_BYTES", str(2 * 1024 ** 3)))
+THUMBNAIL_SIZES = (128, 256, 512)
+DEFAULT_SIZE = 256
+FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+}
+QUALITY = 80
+FIGURE_PATTERNS = ("*.png", "*.jpg", "*.jpeg")
+# Longest time between two scans of the cache directory while thumbnails are written
+EVICT_INTERVAL = float(os.getenv("PIPELINE_THUMBNAIL_EVICT_INTERVAL", "60"))
+# An eviction frees down to this fraction of the cap, so the next writes do not scan again
+EVICT_LOW_WATER = 0.9
+
+_usage_lock = threading.Lock()
+_evict_lock = threading.Lock()
+# Cache size found by the last scan plus what this process wrote since (None: not scanned yet)
+_cache_bytes = None
+_last_scan = 0.0
+
+
+def clamp_size(size) -> int:
+    """Closest supported thumbnail size"""
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        return DEFAULT_SIZE
+    return min(THUMBNAIL_SIZES, key=lambda s: abs(s - size))
+
+
+def thumbnail_path(source: str, size: int, fmt: str) -> str:
+    stat = os.stat(source)
+    key = hashlib.sha1(f"{source}|{stat.st_mtime_ns}|{size}|{fmt}".encode()).hexdigest()
+    return os.path.join(THUMBNAIL_DIR, key[:2], f"{key}.{fmt}")
+
+
+def get_thumbnail(source: str, size: int = DEFAULT_SIZE, fmt: str = "webp") -> str:
+    """
+    Path of the thumbnail of a figure, generating it on first use
+
+    Args:
+        source: Resolved figure path (see files.resolve_data_path)
+        size: Longest edge in pixels
+        fmt: 'webp' or 'jpeg'
+
+    Returns:
+        Path of the cached thumbnail
+    """
+    path = thumbnail_path(source, size, fmt)
+    if os.path.exists(path):
+        # Refresh mtime so eviction is least-recently-used
+        os.utime(path)
+        count_cache("thumbnail", True)
+        return path
+    count_cache("thumbnail", False)
+
+    from PIL import Image
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pil_format, _ = FORMATS[fmt]
+    with Image.open(source) as img:
+        img.draft("RGB", (size, size))
+        img = img.convert("RGB")
+        img.thumbnail((size, size))
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        img.save(tmp_path, pil_format, quality=QUALITY)
+    os.replace(tmp_path, path)
+
+    _written(os.path.getsize(path))
+    return path
+
+
+def _written(size: int):
+    """Count a new thumbnail and evict if the cache may have passed its cap"""
+    global _cache_bytes
+    with _usage_lock:
+        if _cache_bytes is not None:
+            _cache_bytes += size
+        due = (_cache_bytes is None or _cache_bytes > THUMBNAIL_CACHE_BYTES
+               or time.monotonic() - _last_scan > EVICT_INTERVAL)
+    # One scan at a time per process; the next scan corrects writes it missed
+    if due and _evict_lock.acquire(blocking=False):
+        try:
+            evict(THUMBNAIL_CACHE_BYTES)
+        finally:
+            _evict_lock.release()
+
+
+def evict(max_bytes: int = THUMBNAIL_CACHE_BYTES):
+    """Delete least recently used thumbnails once the cache passes max_bytes (down to EVICT_LOW_WATER)"""
+    global _cache_bytes, _last_scan
+    entries = []
+    total = 0
+    started = time.monotonic()
+    for sub in os.scandir(THUMBNAIL_DIR):
+        if not sub.is_dir():
+            continue
+        for entry in os.scandir(sub.path):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+    if total > max_bytes:
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            if total <= max_bytes * EVICT_LOW_WATER:
+                break
+    with _usage_lock:
+        _cache_bytes, _last_scan = total, started
+
+
+def pregenerate(folders: Iterable[str], sizes: Iterable[int] = (DEFAULT_SIZE,),
+                formats: Iterable[str] = ("webp",)) -> int:
+    """Generate thumbnails for every figure under the given folders"""
+    count = 0
+    for folder in folders:
+        for pattern in FIGURE_PATTERNS:
+            for source in glob.glob(os.path.join(folder, "**", "figures", pattern), recursive=True):
+                for size in sizes:
+                    for fmt in formats:
+                        try:
+                            get_thumbnail(os.path.realpath(source), clamp_size(size), fmt)
+                            count += 1
+                        except Exception as e:
+                            print(f"Failed to make thumbnail of {source}: {e}")
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-generate figure thumbnails.")
+    parser.add_argument("folders", nargs="+", help="Folders to search for figures/ directories.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[DEFAULT_SIZE], help="Thumbnail sizes.")
+    parser.add_argument("--formats", nargs="+", default=["webp"], choices=list(FORMATS), help="Thumbnail formats.")
+    args = parser.parse_args()
+    n = pregenerate(args.folders, sizes=args.sizes, formats=args.formats)
+    print(f"Generated {n} thumbnails in {THUMBNAIL_DIR}")
@@ -0,0 +1 @@
+"""Benchmarks and synthetic data for the backend (run from backend/ with python -m bench.<name>)."""
@@ -0,0 +1,258 @@
+"""
+Load replay of the frontend's polling mix against create_app().
+
+Each simulated viewer repeats what an open browser tab does:
+
+    dashboard   /api/status                          every 5 s
+    overview    /api/scheduler                       every 10 s
+    pipeline    /api/pipeline-status?date&since      every 10 s
+    masterframe /api/masterframe-status?date&since   every 10 s
+    qa          /api/plot?type=science&param=seeing  every 60 s
+    gallery     /api/images + 8 x /api/thumbnail     every 30 s (needs --synthetic)
+
+starting at a random offset. Requests are dispatched on schedule to
+--workers processes, each running its own create_app() and serving one
+request at a time like a uwsgi process, so an overloaded setup shows up as
+queueing delay. Reported per request type and overall: p50/p95/p99 of
+response time (scheduled to finished, including queueing) and of service
+time, throughput, errors, and each worker's RSS.
+
+    python -m bench.load_replay --viewers 10,50,100 --duration 60 --workers 5
+    python -m bench.load_replay --viewers 20 --synthetic /tmp/synthetic --output bench/results/load.json
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import random
+import argparse
+import multiprocessing as mp
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+TRAFFIC = (
+    ("dashboard", 5.0),
+    ("overview", 10.0),
+    ("pipeline", 10.0),
+    ("masterframe", 10.0),
+    ("qa", 60.0),
+    ("gallery", 30.0),
+)
+THUMBNAILS_PER_GALLERY = 8
+
+
+def _rss_kb() -> Dict[str, int]:
+    usage = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(("VmRSS", "VmHWM")):
+                key, value = line.split(":", 1)
+                usage[key] = int(value.split()[0])
+    return {"rss_kb": usage.get("VmRSS", 0), "peak_rss_kb": usage.get("VmHWM", 0)}
+
+
+def _use_synthetic(manifest: Dict[str, Any]):
+    """Point the data roots of the app at a bench.synthetic tree"""
+    from app import const, files, monitor, _monitor
+    for module in (const, monitor, _monitor):
+        module.DATA_DIR = manifest["data_dir"]
+        module.MASTERFRAME_DIR = manifest["masterframe_dir"]
+    files.DATA_ROOTS = ((manifest["data_dir"], "/_protected/data/"),
+                        (manifest["masterframe_dir"], "/_protected/master_frame/"))
+
+
+def worker(tasks: mp.Queue, results: mp.Queue, manifest: Optional[Dict[str, Any]]):
+    """One 'uwsgi process': serves requests from the queue one at a time"""
+    from app import create_app
+    if manifest:
+        _use_synthetic(manifest)
+    client = create_app().test_client()
+    results.put(("ready", os.getpid()))
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        task_id, path = task
+        start = time.perf_counter()
+        try:
+            response = client.get(path)
+            body = response.get_data()
+            status = response.status_code
+            extra = {"version": response.headers.get("X-Status-Version")}
+            if path.startswith("/api/images?") and status == 200:
+                extra["images"] = (json.loads(body).get("images") or [])[:THUMBNAILS_PER_GALLERY]
+        except Exception as e:
+            body, status, extra = b"", 599, {"error": str(e)}
+        results.put(("done", task_id, status, time.perf_counter() - start, len(body), time.time(), extra))
+    results.put(("rss", os.getpid(), _rss_kb()))
+
+
+class Viewer:
+    """Per-viewer state: status cursors and the row shown in the gallery"""
+
+    def __init__(self, rng: random.Random, date: str, manifest: Optional[Dict[str, Any]]):
+        self.date = date
+        self.versions = {"pipeline": -1, "masterframe": -1}
+        self.row = rng.choice(manifest["science"]) if manifest and manifest["science"] else None
+
+    def path(self, kind: str) -> Optional[str]:
+        if kind == "dashboard":
+            return "/api/status"
+        if kind == "overview":
+            return "/api/scheduler"
+        if kind == "pipeline":
+            return f"/api/pipeline-status?date={self.date}&since={self.versions['pipeline']}"
+        if kind == "masterframe":
+            return f"/api/masterframe-status?date={self.date}&since={self.versions['masterframe']}"
+        if kind == "qa":
+            return "/api/plot?type=science&param=seeing"
+        if kind == "gallery" and self.row:
+            r = self.row
+            return f"/api/images?date={r['date']}&obj={r['obj']}&filt={r['filt']}"
+        return None
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(p50 * 1000, 2), "p95": round(p95 * 1000, 2), "p99": round(p99 * 1000, 2)}
+
+
+def run(viewers: int, duration: float, workers: int, manifest: Optional[Dict[str, Any]] = None,
+        date: str = "2025-10-21", seed: int = 0) -> Dict[str, Any]:
+    """Replay `duration` seconds of traffic from `viewers` tabs; latencies in ms"""
+    rng = random.Random(seed)
+    if manifest:
+        date = manifest["dates"][0]
+    tabs = [Viewer(random.Random(rng.random()), date, manifest) for _ in range(viewers)]
+
+    # (time, viewer, kind) for every poll in the window
+    schedule = []
+    for v in range(viewers):
+        for kind, interval in TRAFFIC:
+            if kind == "gallery" and not manifest:
+                continue
+            t = rng.uniform(0, interval)
+            while t < duration:
+                schedule.append((t, v, kind))
+                t += interval
+    schedule.sort()
+
+    ctx = mp.get_context("spawn")
+    tasks, results = ctx.Queue(), ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(tasks, results, manifest), daemon=True) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    for _ in procs:
+        results.get()  # Wait until every worker has created its app
+
+    pending: Dict[int, Dict[str, Any]] = {}
+    records: List[Dict[str, Any]] = []
+    rss: Dict[int, Dict[str, int]] = {}
+    next_id = 0
+
+    def submit(kind: str, viewer: int, path: str, scheduled: float):
+        nonlocal next_id
+        pending[next_id] = {"kind": kind, "viewer": viewer, "scheduled": scheduled}
+        tasks.put((next_id, path))
+        next_id += 1
+
+    def collect(timeout: float):
+        try:
+            message = results.get(timeout=max(timeout, 0))
+        except queue.Empty:
+            return
+        if message[0] == "rss":
+            rss[message[1]] = message[2]
+            return
+        _, task_id, status, service, size, finished, extra = message
+        task = pending.pop(task_id)
+        kind, viewer = task["kind"], task["viewer"]
+        records.append({"kind": kind, "status": status,
+                        "service": service, "response": finished - task["scheduled"], "bytes": size})
+        if kind in ("pipeline", "masterframe") and extra.get("version") is not None:
+            tabs[viewer].versions[kind] = int(extra["version"])
+        for image in extra.get("images", []):
+            submit("thumbnail", viewer, f"/api/thumbnail?filename={image}&size=256", time.time())
+
+    start = time.time()
+    for t, v, kind in schedule:
+        due = start + t
+        while time.time() < due:
+            collect(due - time.time())
+        path = tabs[v].path(kind)
+        if path:
+            submit(kind, v, path, due)
+    while pending:
+        collect(1.0)
+    elapsed = time.time() - start
+
+    for _ in procs:
+        tasks.put(None)
+    while len(rss) < len(procs):
+        collect(5.0)
+    for p in procs:
+        p.join(timeout=5)
+
+    by_kind: Dict[str, Dict[str, Any]] = {}
+    for kind in sorted({r["kind"] for r in records}):
+        rows = [r for r in records if r["kind"] == kind]
+        by_kind[kind] = {
+            "requests": len(rows),
+            "errors": sum(1 for r in rows if r["status"] >= 500),
+            "mean_bytes": round(sum(r["bytes"] for r in rows) / len(rows)),
+            "response_ms": _percentiles([r["response"] for r in rows]),
+            "service_ms": _percentiles([r["service"] for r in rows]),
+        }
+    return {
+        "viewers": viewers,
+        "workers": workers,
+        "duration": duration,
+        "elapsed": round(elapsed, 2),
+        "requests": len(records),
+        "throughput_rps": round(len(records) / elapsed, 2) if elapsed else None,
+        "errors": sum(1 for r in records if r["status"] >= 500),
+        "response_ms": _percentiles([r["response"] for r in records]),
+        "service_ms": _percentiles([r["service"] for r in records]),
+        "by_kind": by_kind,
+        "worker_rss_kb": list(rss.values()),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay dashboard polling traffic against create_app().")
+    parser.add_argument("--viewers", default="10", help="Viewer counts to run, comma separated (e.g. 10,50,100).")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds of traffic per run.")
+    parser.add_argument("--workers", type=int, default=5, help="Worker processes (uwsgi 'processes').")
+    parser.add_argument("--synthetic", help="bench.synthetic tree to serve images and status from.")
+    parser.add_argument("--slo-ms", type=float, default=1000.0, help="p95 response time a run must stay under.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results to this JSON file.")
+    args = parser.parse_args()
+
+    manifest = None
+    if args.synthetic:
+        with open(os.path.join(args.synthetic, "manifest.json")) as f:
+            manifest = json.load(f)
+
+    runs = []
+    print(f"{'viewers':>7} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>6} {'max rss MB':>10}")
+    for viewers in [int(v) for v in args.viewers.split(",")]:
+        result = run(viewers, args.duration, args.workers, manifest=manifest, seed=args.seed)
+        runs.append(result)
+        r = result["response_ms"]
+        max_rss = max((w["peak_rss_kb"] for w in result["worker_rss_kb"]), default=0) / 1024
+        flag = "" if r["p95"] is not None and r["p95"] <= args.slo_ms else "  over SLO"
+        print(f"{viewers:>7} {result['throughput_rps']:>8} {r['p50']:>8} {r['p95']:>8} {r['p99']:>8} "
+              f"{result['errors']:>6} {max_rss:>10.1f}{flag}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump({"created": datetime.now().isoformat(timespec="seconds"),
+                       "python": sys.version.split()[0], "slo_ms": args.slo_ms, "runs": runs}, f, indent=2)
@@ -0,0 +1,160 @@
+"""
+Benchmark of the folder scanners in app/_monitor.py on a synthetic tree.
+
+Generates a tree with bench.synthetic (or reuses one with --root), points
+_monitor's DATA_DIR / MASTERFRAME_DIR and the comments store at it, and
+times scan_processed_folder, scan_masterframe_folder, link_to_files,
+count_warnings_errors and update_masterframe_data (needs astropy). Results
+are written as JSON; --compare prints the ratio against an earlier run and
+fails if any benchmark got slower than --tolerance.
+
+    python -m bench.scanners --nights 2 --objects 20 --output bench/results/scanners.json
+    python -m bench.scanners --compare bench/results/scanners.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+from datetime import datetime
+from typing import Any, Callable, Dict
+
+from .synthetic import generate
+
+
+def _time(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {"min": min(times), "median": statistics.median(times), "mean": statistics.fmean(times),
+            "repeat": repeat}
+
+
+def run(manifest: Dict[str, Any], repeat: int = 3) -> Dict[str, Dict[str, Any]]:
+    # The comments store path is read at import, so set it before importing app modules
+    os.environ["PIPELINE_COMMENTS_PATH"] = os.path.join(manifest["root"], "comments.sqlite")
+    from app import _monitor
+    from app.comments import comment_store
+
+    _monitor.DATA_DIR = manifest["data_dir"]
+    _monitor.MASTERFRAME_DIR = manifest["masterframe_dir"]
+    comment_store.import_folders([manifest["comments_dir"]])
+
+    dates = manifest["dates"]
+    science = manifest["science"]
+    logs = manifest["logs"]
+    results: Dict[str, Dict[str, Any]] = {}
+
+    rows = sum(len(_monitor.scan_processed_folder(d)) for d in dates)
+    if rows != len(science):
+        raise RuntimeError(f"scan_processed_folder found {rows} rows, expected {len(science)}")
+    results["scan_processed_folder"] = dict(
+        _time(lambda: [_monitor.scan_processed_folder(d) for d in dates], repeat), items=rows)
+
+    units = sum(len(_monitor.scan_masterframe_folder(d)) for d in dates)
+    results["scan_masterframe_folder"] = dict(
+        _time(lambda: [_monitor.scan_masterframe_folder(d) for d in dates], repeat), items=units)
+
+    results["link_to_files"] = dict(_time(lambda: [
+        _monitor.link_to_files(r["date"], obj=r["obj"], filt=r["filt"]) for r in science
+    ], repeat), items=len(science))
+
+    for path, expected in logs.items():
+        counts = _monitor.count_warnings_errors(path)
+        if counts != (expected["WARNING"], expected["ERROR"]):
+            raise RuntimeError(f"count_warnings_errors({path}) = {counts}, expected {expected}")
+    log_bytes = sum(os.path.getsize(p) for p in logs)
+    results["count_warnings_errors"] = dict(
+        _time(lambda: [_monitor.count_warnings_errors(p) for p in logs], repeat),
+        items=len(logs), mb=round(log_bytes / 1e6, 1))
+
+    try:
+        import astropy  # noqa: F401
+    except ImportError:
+        results["update_masterframe_data"] = {"skipped": "astropy is not installed"}
+    else:
+        output_dir = os.path.join(manifest["root"], "ecsv")
+        os.makedirs(output_dir, exist_ok=True)
+        results["update_masterframe_data"] = dict(_time(lambda: _monitor.update_masterframe_data(
+            base=manifest["masterframe_dir"], flat_base=manifest["flat_masterframe_dir"], output_dir=output_dir,
+        ), repeat), items=len(manifest["masterframe"]))
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> bool:
+    """Print median ratios against a baseline; False if any exceeds 1 + tolerance"""
+    ok = True
+    print(f"{'benchmark':<26} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, result in results.items():
+        base = baseline.get(name, {})
+        if "median" not in result or "median" not in base:
+            print(f"{name:<26} {'-':>10} {'-':>10} {'-':>7}")
+            continue
+        ratio = result["median"] / base["median"] if base["median"] else float("inf")
+        flag = ""
+        if ratio > 1 + tolerance:
+            ok = False
+            flag = "  SLOWER"
+        print(f"{name:<26} {base['median']:>10.4f} {result['median']:>10.4f} {ratio:>7.2f}{flag}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the folder scanners on synthetic data.")
+    parser.add_argument("--root", help="Existing synthetic tree (with manifest.json); generated if omitted.")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated tree.")
+    parser.add_argument("--nights", type=int, default=2)
+    parser.add_argument("--units", type=int, default=5)
+    parser.add_argument("--objects", type=int, default=10)
+    parser.add_argument("--filters", type=int, default=4)
+    parser.add_argument("--log-mb", type=float, default=1.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write results to this JSON file.")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown vs --compare.")
+    args = parser.parse_args()
+
+    params = {k: getattr(args, k) for k in ("nights", "units", "objects", "filters", "log_mb", "repeat")}
+    if args.root:
+        with open(os.path.join(args.root, "manifest.json")) as f:
+            manifest = json.load(f)
+        root = None
+    else:
+        root = tempfile.mkdtemp(prefix="pipeline-bench-")
+        start = time.perf_counter()
+        manifest = generate(root, nights=args.nights, units=args.units, objects=args.objects,
+                            filters=args.filters, log_mb=args.log_mb)
+        print(f"Generated synthetic tree in {root} ({time.perf_counter() - start:.1f} s)")
+
+    try:
+        results = run(manifest, repeat=args.repeat)
+    finally:
+        if root and not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    for name, result in results.items():
+        print(f"{name:<26} {json.dumps(result)}")
+
+    record = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.node(),
+        "params": params,
+        "results": results,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(record, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline.get("results", {}), args.tolerance):
+            sys.exit(1)
@@ -0,0 +1,157 @@
+"""
+Worker startup benchmark: time-to-first-request of a fresh interpreter.
+
+uwsgi runs with lazy-apps, so every worker (and every respawn after
+max-requests / reload-on-rss) imports the app itself. This starts --runs
+fresh interpreters, each doing what a worker does: import app, create_app(),
+serve the first request of --paths, then each path once more warm. Reported
+per phase (median over runs): interpreter start, import, create_app, first
+and warm request of each path, time-to-first-request and RSS.
+
+The import-time budget: after create_app() none of DEFERRED may be imported
+(they belong to the first request that needs them) and import + create_app
+must stay under --budget-ms; otherwise the exit status is 1. --importtime
+lists the slowest imports of a worker up to its warm requests
+(python -X importtime).
+
+    python -m bench.startup --runs 5
+    python -m bench.startup --paths "/api/scheduler,/api/pipeline-status?date=2025-10-21" --importtime 15
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from typing import Any, Dict, List
+
+# Heavy or side-effecting modules that must only load on first use
+DEFERRED = ("gppy", "pandas", "astropy", "yaml", "numpy", "PIL")
+DEFAULT_PATHS = "/api/scheduler,/api/pipeline-status?date=2025-10-21,/api/plot?type=bias&param=clipmed"
+
+
+def child(paths: List[str], launched: float) -> Dict[str, Any]:
+    """Runs inside the fresh interpreter"""
+    start = time.time()
+    t0 = time.perf_counter()
+    import app
+    t1 = time.perf_counter()
+    flask_app = app.create_app()
+    t2 = time.perf_counter()
+    loaded = sorted(m for m in DEFERRED if m in sys.modules)
+
+    client = flask_app.test_client()
+    first, warm, status = {}, {}, {}
+    for path in paths:
+        t = time.perf_counter()
+        response = client.get(path)
+        response.get_data()
+        first[path] = (time.perf_counter() - t) * 1000
+        status[path] = response.status_code
+        if path == paths[0]:
+            ttfr = (time.time() - launched) * 1000
+    for path in paths:
+        t = time.perf_counter()
+        client.get(path).get_data()
+        warm[path] = (time.perf_counter() - t) * 1000
+
+    with open("/proc/self/status") as f:
+        rss = next((int(line.split()[1]) for line in f if line.startswith("VmRSS")), 0)
+    return {
+        "interpreter_ms": (start - launched) * 1000,
+        "import_ms": (t1 - t0) * 1000,
+        "create_app_ms": (t2 - t1) * 1000,
+        "first_request_ms": first,
+        "warm_request_ms": warm,
+        "status": status,
+        "ttfr_ms": ttfr,
+        "rss_kb": rss,
+        "deferred_loaded": loaded,
+    }
+
+
+def spawn(paths: List[str], importtime: bool = False) -> subprocess.CompletedProcess:
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + [
+        "-m", "bench.startup", "--child", "--paths", ",".join(paths), "--launched", repr(time.time())]
+    return subprocess.run(command, cwd=backend, capture_output=True, text=True, check=True)
+
+
+def slowest_imports(stderr: str, top: int) -> List[tuple]:
+    """(cumulative ms, module) of the top-level imports reported by -X importtime"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit() and not name.startswith("   "):
+            rows.append((int(cumulative) / 1000, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def run(paths: List[str], runs: int) -> Dict[str, Any]:
+    samples = []
+    for _ in range(runs):
+        out = spawn(paths).stdout.strip().splitlines()[-1]
+        samples.append(json.loads(out))
+
+    def median(key, path=None):
+        return round(statistics.median(s[key][path] if path else s[key] for s in samples), 1)
+
+    return {
+        "runs": runs,
+        "interpreter_ms": median("interpreter_ms"),
+        "import_ms": median("import_ms"),
+        "create_app_ms": median("create_app_ms"),
+        "ttfr_ms": median("ttfr_ms"),
+        "rss_kb": median("rss_kb"),
+        "paths": {p: {"first_ms": median("first_request_ms", p), "warm_ms": median("warm_request_ms", p),
+                      "status": samples[-1]["status"][p]} for p in paths},
+        "deferred_loaded": sorted({m for s in samples for m in s["deferred_loaded"]}),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure worker startup and time-to-first-request.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to start.")
+    parser.add_argument("--paths", default=DEFAULT_PATHS, help="Requests to serve, comma separated; the first is timed as TTFR.")
+    parser.add_argument("--budget-ms", type=float, default=500.0, help="Allowed import + create_app time.")
+    parser.add_argument("--importtime", type=int, default=0, metavar="N", help="List the N slowest imports.")
+    parser.add_argument("--output", help="Write results to this JSON file.")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--launched", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    paths = args.paths.split(",")
+
+    if args.child:
+        print(json.dumps(child(paths, args.launched)))
+        sys.exit(0)
+
+    result = run(paths, args.runs)
+    print(f"interpreter {result['interpreter_ms']:>8} ms")
+    print(f"import app  {result['import_ms']:>8} ms")
+    print(f"create_app  {result['create_app_ms']:>8} ms")
+    for path, r in result["paths"].items():
+        print(f"  {path:<50} first {r['first_ms']:>8} ms  warm {r['warm_ms']:>7} ms  [{r['status']}]")
+    print(f"time to first request {result['ttfr_ms']} ms, rss {result['rss_kb'] / 1024:.1f} MB")
+
+    if args.importtime:
+        print("slowest imports (cumulative ms):")
+        for ms, name in slowest_imports(spawn(paths, importtime=True).stderr, args.importtime):
+            print(f"  {ms:>8.1f}  {name}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(dict(result, budget_ms=args.budget_ms), f, indent=2)
+
+    ok = True
+    if result["deferred_loaded"]:
+        ok = False
+        print(f"OVER BUDGET: imported by create_app: {', '.join(result['deferred_loaded'])}")
+    if result["import_ms"] + result["create_app_ms"] > args.budget_ms:
+        ok = False
+        print(f"OVER BUDGET: import + create_app > {args.budget_ms} ms")
+    sys.exit(0 if ok else 1)
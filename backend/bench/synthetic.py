@@ -0,0 +1,240 @@
+"""
+Synthetic observatory data tree.
+
+Builds a fake DATA_DIR / MASTERFRAME_DIR in the layout the scanners in
+app/_monitor.py expect:
+
+    <root>/processed/<date>/<obj>/<filt>/<obj>_<filt>_<date>.yml   (flag block)
+                                        /<obj>_<filt>_<date>.log   (multi-MB)
+                                        /figures/*.png
+    <root>/processed/<date>/<date>_<unit>.log                      (masterframe logs)
+    <root>/master_frame/<date>/<unit>/{bias,dark,flat,bpmask}_*.fits
+    <root>/_master_frame/<date>/<unit>/...                         (flats, bpmasks)
+    <root>/comments/*_comments.txt
+
+FITS files are written directly (no astropy needed) with the header keys
+update_masterframe_data reads.
+
+    python -m bench.synthetic /tmp/synthetic --nights 3 --units 10 --objects 20 --filters 5
+"""
+
+import os
+import json
+import zlib
+import struct
+import random
+import argparse
+from datetime import date, timedelta
+from typing import Any, Dict
+
+import numpy as np
+
+PROCEDURE = ['astrometry', 'single_photometry', 'combine', 'combined_photometry', 'subtraction']
+FILTERS = ["m400", "m425", "m450", "m475", "m500", "m525", "m550", "m575", "m600", "m625",
+           "m650", "m675", "m700", "m725", "m750", "m775", "m800", "m825", "m850", "m875", "g", "r", "i"]
+FIGURES = ("astrometry.png", "photometry.png", "seeing.png", "zp.png")
+LOG_LEVELS = ("INFO",) * 40 + ("DEBUG",) * 8 + ("WARNING",) * 2 + ("ERROR",)
+FITS_BLOCK = 2880
+
+
+def _fits_card(key: str, value: Any) -> bytes:
+    if isinstance(value, bool):
+        text = f"{key:<8}= {'T' if value else 'F':>20}"
+    elif isinstance(value, (int, np.integer)):
+        text = f"{key:<8}= {int(value):>20}"
+    elif isinstance(value, (float, np.floating)):
+        text = f"{key:<8}= {float(value):>20.8G}"
+    else:
+        text = f"{key:<8}= '{str(value):<8}'"
+    return text.ljust(80).encode("ascii")
+
+
+def _fits_header(cards: Dict[str, Any]) -> bytes:
+    header = b"".join(_fits_card(k, v) for k, v in cards.items()) + b"END".ljust(80)
+    return header + b" " * (-len(header) % FITS_BLOCK)
+
+
+def _fits_data(data: np.ndarray) -> bytes:
+    raw = data.astype(data.dtype.newbyteorder(">")).tobytes()
+    return raw + b"\0" * (-len(raw) % FITS_BLOCK)
+
+
+def write_fits(path: str, data: np.ndarray, header: Dict[str, Any], extension: bool = False):
+    """Minimal FITS writer: image in the primary HDU, or in extension 1"""
+    bitpix = {np.dtype(np.uint8): 8, np.dtype(np.int16): 16, np.dtype(np.float32): -32}[data.dtype]
+    shape = {"NAXIS": 2, "NAXIS1": data.shape[1], "NAXIS2": data.shape[0]}
+    with open(path, "wb") as f:
+        if extension:
+            f.write(_fits_header({"SIMPLE": True, "BITPIX": 8, "NAXIS": 0, "EXTEND": True}))
+            f.write(_fits_header({"XTENSION": "IMAGE", "BITPIX": bitpix, **shape,
+                                  "PCOUNT": 0, "GCOUNT": 1, **header}))
+        else:
+            f.write(_fits_header({"SIMPLE": True, "BITPIX": bitpix, **shape, **header}))
+        f.write(_fits_data(data))
+
+
+def write_png(path: str, width: int = 64, height: int = 48, seed: int = 0):
+    """Small RGB PNG written with zlib only"""
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    raw = b"".join(b"\0" + row.tobytes() for row in pixels)
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(raw)))
+        f.write(chunk(b"IEND", b""))
+
+
+def write_log(path: str, size_bytes: int, rng: random.Random) -> Dict[str, int]:
+    """Pipeline-style log of about size_bytes; returns its warning/error counts"""
+    counts = {"WARNING": 0, "ERROR": 0}
+    written = 0
+    lines = []
+    n = 0
+    open(path, "w").close()
+    while written < size_bytes:
+        level = rng.choice(LOG_LEVELS)
+        if level in counts:
+            counts[level] += 1
+        line = (f"2025-10-21 03:{n // 3600 % 60:02d}:{n % 60:02d},{n % 1000:03d} [{level}] "
+                f"gppy.{rng.choice(PROCEDURE)}: processing frame {n} of the stack, "
+                f"value={rng.random():.6f} status=ok\n")
+        lines.append(line)
+        written += len(line)
+        n += 1
+        if len(lines) >= 5000:
+            with open(path, "a") as f:
+                f.writelines(lines)
+            lines = []
+    with open(path, "a") as f:
+        f.writelines(lines)
+    return counts
+
+
+def _config_yaml(obj: str, filt: str, night: str, flags: Dict[str, bool]) -> str:
+    lines = [
+        f"name: {obj}_{filt}_{night}",
+        "obs:",
+        f"  object: {obj}",
+        f"  filter: {filt}",
+        f"  date: '{night}'",
+        "flag:",
+    ]
+    lines += [f"  {step}: {'true' if done else 'false'}" for step, done in flags.items()]
+    lines += ["settings:", "  threads: 8", "  gain: 0", "  n_binning: 1", ""]
+    return "\n".join(lines)
+
+
+def generate(root: str, nights: int = 2, units: int = 5, objects: int = 10, filters: int = 4,
+             log_mb: float = 1.0, figures: int = 4, comments: int = 3, fits_size: int = 64,
+             start: str = "2025-10-01", seed: int = 0) -> Dict[str, Any]:
+    """
+    Build the synthetic tree under root
+
+    Returns:
+        Manifest with the directories, dates, rows and expected log counts
+    """
+    rng = random.Random(seed)
+    data_dir = os.path.join(root, "processed")
+    master_dir = os.path.join(root, "master_frame")
+    flat_master_dir = os.path.join(root, "_master_frame")
+    comments_dir = os.path.join(root, "comments")
+    for d in (data_dir, master_dir, flat_master_dir, comments_dir):
+        os.makedirs(d, exist_ok=True)
+
+    first = date.fromisoformat(start)
+    dates = [(first + timedelta(days=i)).isoformat() for i in range(nights)]
+    unit_names = [f"7DT{i + 1:02d}" for i in range(units)]
+    filter_names = FILTERS[:filters]
+    log_bytes = int(log_mb * 1024 * 1024)
+    pixels = np.random.default_rng(seed)
+
+    manifest: Dict[str, Any] = {
+        "root": root, "data_dir": data_dir, "masterframe_dir": master_dir,
+        "flat_masterframe_dir": flat_master_dir, "comments_dir": comments_dir,
+        "dates": dates, "units": unit_names, "science": [], "masterframe": [], "logs": {},
+    }
+
+    for night in dates:
+        compact = night.replace("-", "")
+        for o in range(objects):
+            obj = f"T{10000 + o:05d}"
+            for filt in filter_names:
+                folder = os.path.join(data_dir, night, obj, filt)
+                os.makedirs(os.path.join(folder, "figures"), exist_ok=True)
+                basename = f"{obj}_{filt}_{night}"
+                done = rng.randint(0, len(PROCEDURE))
+                flags = {step: i < done for i, step in enumerate(PROCEDURE)}
+                with open(os.path.join(folder, f"{basename}.yml"), "w") as f:
+                    f.write(_config_yaml(obj, filt, night, flags))
+                log = os.path.join(folder, f"{basename}.log")
+                manifest["logs"][log] = write_log(log, log_bytes, rng)
+                open(os.path.join(folder, f"{basename}_debug.log"), "w").close()
+                for name in FIGURES[:figures]:
+                    write_png(os.path.join(folder, "figures", f"{basename}_{name}"), seed=rng.randrange(1 << 30))
+                if comments:
+                    with open(os.path.join(comments_dir, f"{basename}_comments.txt"), "w") as f:
+                        for c in range(rng.randint(0, comments)):
+                            f.write(f"observer{c}|{night}T12:00:00|Synthetic comment {c} on {obj} {filt}\n")
+                manifest["science"].append({"date": night, "obj": obj, "filt": filt, "config": basename})
+
+        for unit in unit_names:
+            log = os.path.join(data_dir, night, f"{night}_{unit}.log")
+            manifest["logs"][log] = write_log(log, log_bytes, rng)
+            if comments:
+                with open(os.path.join(comments_dir, f"{night}_{unit}_comments.txt"), "w") as f:
+                    for c in range(rng.randint(0, comments)):
+                        f.write(f"observer{c}|{night}T12:00:00|Synthetic comment {c} on {unit}\n")
+
+            image = pixels.normal(512, 3, size=(fits_size, fits_size)).astype(np.float32)
+            stats = {"CLIPMEAN": float(image.mean()), "CLIPMED": float(np.median(image)),
+                     "CLIPSTD": float(image.std()), "CLIPMIN": float(image.min()), "CLIPMAX": float(image.max())}
+            date_loc = f"{night}T21:00:00"
+            folder = os.path.join(master_dir, night, unit)
+            os.makedirs(folder, exist_ok=True)
+            write_fits(os.path.join(folder, f"bias_{compact}_{unit}.fits"), image,
+                       {"IMAGETYP": "BIAS", "FILTER": "None", **stats})
+            write_fits(os.path.join(folder, f"dark_100s_{compact}_{unit}.fits"), image,
+                       {"IMAGETYP": "DARK", "FILTER": "None", **stats, "DATE-LOC": date_loc, "NDELTA": 0.5,
+                        "NHOTPIX": rng.randint(100, 1000), "CCD-TEMP": -10.0, "AMBTEMP": 12.5,
+                        "SKYTEMP": -20.0, "UNIFORM": rng.random()})
+
+            flat_folder = os.path.join(flat_master_dir, night, unit)
+            os.makedirs(flat_folder, exist_ok=True)
+            for filt in filter_names:
+                name = f"flat_{filt}_{compact}_{unit}.fits"
+                header = {"IMAGETYP": "FLAT", "FILTER": filt, **stats, "SIGMEAN": 1.0, "SIGMED": 1.0,
+                          "SIGSTD": 0.01, "REFRMS": 0.02, "CUTTED": False, "EDGEVAR": rng.random()}
+                write_fits(os.path.join(folder, name), image, header)
+                write_fits(os.path.join(flat_folder, name), image, header)
+            mask = (pixels.random((fits_size, fits_size)) < 0.01).astype(np.uint8)
+            write_fits(os.path.join(flat_folder, f"bpmask_100s_{compact}_{unit}.fits"), mask,
+                       {"NHOTPIX": int(mask.sum())}, extension=True)
+            manifest["masterframe"].append({"date": night, "unit": unit})
+
+    with open(os.path.join(root, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic DATA_DIR/MASTERFRAME_DIR tree.")
+    parser.add_argument("root", help="Directory to create the tree in.")
+    parser.add_argument("--nights", type=int, default=2)
+    parser.add_argument("--units", type=int, default=5)
+    parser.add_argument("--objects", type=int, default=10)
+    parser.add_argument("--filters", type=int, default=4)
+    parser.add_argument("--log-mb", type=float, default=1.0, help="Size of each log file in MB.")
+    parser.add_argument("--figures", type=int, default=4, help="Figures per science run.")
+    parser.add_argument("--comments", type=int, default=3, help="Maximum comments per row.")
+    parser.add_argument("--fits-size", type=int, default=64, help="Edge of the FITS images in pixels.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    m = generate(args.root, nights=args.nights, units=args.units, objects=args.objects, filters=args.filters,
+                 log_mb=args.log_mb, figures=args.figures, comments=args.comments,
+                 fits_size=args.fits_size, seed=args.seed)
+    print(f"Generated {len(m['science'])} science runs and {len(m['masterframe'])} masterframe units in {args.root}")
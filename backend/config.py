@@ -12,6 +12,12 @@ class Config:
     MAIL_USERNAME = os.getenv("SDT_MAIL")
     MAIL_PASSWORD = os.getenv("SDT_PASSWORD")
     MAIL_DEFAULT_SENDER = ('7DT Observation Alert', os.getenv("SDT_SENDER")) 
+    # Let Nginx send data files via X-Accel-Redirect (see app/files.py)
+    X_ACCEL_REDIRECT = os.getenv("PIPELINE_X_ACCEL", "false").lower() == "true"
+    # Serve /api/status from the built-in collector (see app/sysmetrics.py)
+    SYSTEM_METRICS = os.getenv("PIPELINE_SYSTEM_METRICS", "false").lower() == "true"
+    # Requests carrying this token are profiled (see app/profiling.py); unset disables profiling
+    PROFILE_TOKEN = os.getenv("PIPELINE_PROFILE_TOKEN")
 
 class ProductionConfig(Config):
     DEBUG = False
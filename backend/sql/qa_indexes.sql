@@ -0,0 +1,14 @@
+-- Index behind the keyset pages of /api/qa-records (DatabaseConnection.get_qa_plot_page):
+-- WHERE qa_type = %s AND created_at in a window ORDER BY created_at, id.
+--
+-- gppy owns the QA schema, so this is not applied by the backend. Run it once
+-- against the pipeline database, replacing pipeline_qa if PIPELINE_QA_TABLE
+-- names a different table:
+--
+--   psql -d <pipeline database> -f backend/sql/qa_indexes.sql
+--
+-- CONCURRENTLY builds the index without blocking the pipeline's writes; it
+-- cannot run inside a transaction block.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS pipeline_qa_type_created_id
+    ON pipeline_qa (qa_type, created_at, id);
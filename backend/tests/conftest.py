@@ -0,0 +1,22 @@
+"""
+Shared test setup.
+
+The stores in app/ default to SQLite files under /tmp/pipeline; point them
+at a scratch directory before any app module is imported, so tests never
+touch a running dashboard's cache.
+"""
+
+import os
+import tempfile
+
+_STORE_DIR = tempfile.mkdtemp(prefix="pipeline-tests-")
+
+for _name, _file in (
+    ("PIPELINE_CACHE_PATH", "query_cache.sqlite"),
+    ("PIPELINE_CHANGES_PATH", "status_changes.sqlite"),
+    ("PIPELINE_COMMENTS_PATH", "comments.sqlite"),
+    ("PIPELINE_RERUN_PATH", "reruns.sqlite"),
+    ("PIPELINE_ROLLUP_PATH", "qa_rollups.sqlite"),
+    ("PIPELINE_METRICS_SPOOL", "metrics-spool"),
+):
+    os.environ[_name] = os.path.join(_STORE_DIR, _file)
@@ -0,0 +1,133 @@
+"""
+Shared query cache (app/cache.py).
+
+Run from backend/:  python -m pytest tests
+"""
+
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import app.cache as cache_module
+from app.cache import QueryCache, Uncacheable, cached
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    # A fresh file per test, also behind the @cached decorator
+    store = QueryCache(str(tmp_path / "query_cache.sqlite"))
+    monkeypatch.setattr(cache_module, "query_cache", store)
+    return store
+
+
+class _Counter:
+    def __init__(self, value="value"):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def test_hit_does_not_compute_again(cache):
+    compute = _Counter({"rows": [1, 2]})
+    assert cache.get_or_compute("k", compute) == {"rows": [1, 2]}
+    assert cache.get_or_compute("k", compute) == {"rows": [1, 2]}
+    assert compute.calls == 1
+
+
+def test_entries_expire_after_ttl(cache):
+    compute = _Counter()
+    cache.get_or_compute("k", compute, ttl=0.05)
+    time.sleep(0.1)
+    assert cache.get("k") is None
+    cache.get_or_compute("k", compute, ttl=0.05)
+    assert compute.calls == 2
+
+
+def test_invalidate_drops_only_tagged_entries(cache):
+    cache.set("a", 1, tags=["pipeline:2025-10-21", "qa"])
+    cache.set("b", 2, tags=["pipeline:2025-10-22"])
+    cache.invalidate("pipeline:2025-10-21")
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+
+def test_uncacheable_value_is_returned_but_not_stored(cache):
+    def offline():
+        raise Uncacheable([])
+
+    assert cache.get_or_compute("k", offline) == []
+    assert cache.get("k", "missing") == "missing"
+    assert cache.get_or_compute("k", _Counter("back")) == "back"
+
+
+def test_concurrent_misses_compute_once(cache):
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("k", slow)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["value"] * 4
+    assert len(calls) == 1
+
+
+def test_abandoned_lease_is_taken_over(cache, monkeypatch):
+    # A worker that died holding the lease must not block the key forever
+    monkeypatch.setattr(cache_module, "LEASE_TIMEOUT", 0.2)
+    assert cache._acquire_lease("k", "dead:1")
+    start = time.monotonic()
+    assert cache.get_or_compute("k", _Counter()) == "value"
+    assert time.monotonic() - start >= 0.2
+
+
+def test_unusable_cache_file_still_computes(tmp_path):
+    # A directory cannot be opened as a database: every call raises sqlite3.Error
+    broken = QueryCache(str(tmp_path))
+    compute = _Counter()
+    assert broken.get_or_compute("k", compute) == "value"
+    assert broken.get_or_compute("k", compute) == "value"
+    assert compute.calls == 2
+
+
+def test_failed_write_still_returns_value(cache, monkeypatch):
+    def locked(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(cache, "set", locked)
+    assert cache.get_or_compute("k", _Counter()) == "value"
+    # The lease was released, so the next miss does not wait for it
+    assert cache._acquire_lease("k", "other:1")
+
+
+def test_cached_method_and_uncached_bypass(cache):
+    class Source:
+        calls = 0
+
+        @cached("rows", ttl=60, tags=lambda date: [f"pipeline:{date}"])
+        def rows(self, date):
+            Source.calls += 1
+            return [date]
+
+    source = Source()
+    assert source.rows("2025-10-21") == ["2025-10-21"]
+    assert source.rows("2025-10-21") == ["2025-10-21"]
+    assert Source.calls == 1
+    cache.invalidate("pipeline:2025-10-21")
+    source.rows("2025-10-21")
+    assert Source.calls == 2
+    source.rows.uncached(source, "2025-10-21")
+    assert Source.calls == 3
@@ -0,0 +1,68 @@
+"""
+Status change cursors (app/changes.py).
+
+Run from backend/:  python -m pytest tests
+"""
+
+from app.changes import ChangeLog
+
+SCOPE = "science:2025-10-21"
+
+
+def _row(obj, filt="r", status="Processing"):
+    return {"date": "2025-10-21", "obj": obj, "filt": filt, "status": status}
+
+
+def _ids(rows):
+    return sorted(row["row_id"] for row in rows)
+
+
+def test_unchanged_rows_keep_the_version(tmp_path):
+    log = ChangeLog(str(tmp_path / "changes.sqlite"))
+    rows = [_row("T0001"), _row("T0002")]
+    assert log.record(SCOPE, rows) == 1
+    assert log.record(SCOPE, rows) == 1
+    assert log.since(SCOPE, "1") == {"version": 1, "full": False, "changed": [], "removed": []}
+
+
+def test_since_returns_changed_and_removed_rows(tmp_path):
+    log = ChangeLog(str(tmp_path / "changes.sqlite"))
+    log.record(SCOPE, [_row("T0001"), _row("T0002"), _row("T0003")])
+    log.record(SCOPE, [_row("T0001", status="Completed"), _row("T0002"), _row("T0004")])
+
+    delta = log.since(SCOPE, "1")
+    assert delta["version"] == 2 and not delta["full"]
+    assert _ids(delta["changed"]) == ["science/2025-10-21/T0001/r", "science/2025-10-21/T0004/r"]
+    assert delta["removed"] == ["science/2025-10-21/T0003/r"]
+    assert [row["status"] for row in delta["changed"] if row["obj"] == "T0001"] == ["Completed"]
+
+
+def test_changes_accumulate_over_versions(tmp_path):
+    log = ChangeLog(str(tmp_path / "changes.sqlite"))
+    log.record(SCOPE, [_row("T0001")])
+    log.record(SCOPE, [_row("T0001"), _row("T0002")])
+    log.record(SCOPE, [_row("T0002", status="Completed")])
+
+    delta = log.since(SCOPE, "1")
+    assert _ids(delta["changed"]) == ["science/2025-10-21/T0002/r"]
+    assert delta["removed"] == ["science/2025-10-21/T0001/r"]
+
+
+def test_unknown_or_expired_cursor_gets_every_row(tmp_path):
+    log = ChangeLog(str(tmp_path / "changes.sqlite"), max_changes=2)
+    for status in ("Ready", "Processing", "Completed"):
+        log.record(SCOPE, [_row("T0001", status=status), _row("T0002")])
+
+    for cursor in ("-1", None, "junk", "99", "0"):
+        delta = log.since(SCOPE, cursor)
+        assert delta["full"], cursor
+        assert _ids(delta["changed"]) == ["science/2025-10-21/T0001/r", "science/2025-10-21/T0002/r"]
+    assert not log.since(SCOPE, "1")["full"]
+
+
+def test_scopes_are_independent(tmp_path):
+    log = ChangeLog(str(tmp_path / "changes.sqlite"))
+    log.record(SCOPE, [_row("T0001")])
+    assert log.record("science:2025-10-22", [_row("T0009")]) == 1
+    assert log.since("science:2025-10-22", "1")["changed"] == []
+    assert _ids(log.since(SCOPE, "-1")["changed"]) == ["science/2025-10-21/T0001/r"]
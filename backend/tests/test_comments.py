@@ -0,0 +1,68 @@
+"""
+Comments store (app/comments.py).
+
+Run from backend/:  python -m pytest tests
+"""
+
+import os
+
+from app.comments import CommentStore, key_from_file
+
+
+def _write(path, lines, mtime=None):
+    path.write_text("".join(line + "\n" for line in lines), encoding="utf-8")
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def test_key_from_file_names():
+    assert key_from_file("/data/2025-10-15_7DT06_comments.txt") == ("2025-10-15", "7DT06")
+    assert key_from_file("/data/T11334_m750_2025-10-21_comments.txt") == ("2025-10-21", "T11334/m750")
+    assert key_from_file("/data/notes.txt") is None
+
+
+def test_add_keeps_counts(tmp_path):
+    store = CommentStore(str(tmp_path / "comments.sqlite"))
+    store.add("2025-10-21", "T11334/m750", "ann", "2025-10-21 01:00", "clouds")
+    store.add("2025-10-21", "T11334/m750", "bo", "2025-10-21 02:00", "clear again")
+    store.add("2025-10-21", "7DT06", "ann", "2025-10-21 03:00", "bias ok")
+
+    assert store.count("2025-10-21", "T11334/m750") == 2
+    assert store.count("2025-10-22", "T11334/m750") == 0
+    assert store.counts_for_date("2025-10-21") == {"T11334/m750": 2, "7DT06": 1}
+    assert [c["text"] for c in store.get("2025-10-21", "T11334/m750")] == ["clouds", "clear again"]
+
+
+def test_import_skips_malformed_lines_and_unchanged_files(tmp_path):
+    store = CommentStore(str(tmp_path / "comments.sqlite"))
+    legacy = tmp_path / "2025-10-15_7DT06_comments.txt"
+    _write(legacy, ["ann|2025-10-15 01:00|dark high", "broken line", "bo|2025-10-15 02:00|a|b"], mtime=1000)
+
+    assert store.import_file(str(legacy)) == 2
+    assert store.import_file(str(legacy)) == 0
+    assert store.count("2025-10-15", "7DT06") == 2
+    assert store.get("2025-10-15", "7DT06")[1]["text"] == "a|b"
+
+
+def test_reimport_replaces_the_file_but_keeps_added_comments(tmp_path):
+    store = CommentStore(str(tmp_path / "comments.sqlite"))
+    legacy = tmp_path / "2025-10-15_7DT06_comments.txt"
+    _write(legacy, ["ann|2025-10-15 01:00|one", "ann|2025-10-15 02:00|two"], mtime=1000)
+    store.import_file(str(legacy))
+    store.add("2025-10-15", "7DT06", "bo", "2025-10-15 03:00", "from the dashboard")
+
+    _write(legacy, ["ann|2025-10-15 01:00|one"], mtime=2000)
+    assert store.import_file(str(legacy)) == 1
+    assert store.count("2025-10-15", "7DT06") == 2
+    assert [c["text"] for c in store.get("2025-10-15", "7DT06")] == ["from the dashboard", "one"]
+
+
+def test_import_folders_walks_subdirectories(tmp_path):
+    store = CommentStore(str(tmp_path / "comments.sqlite"))
+    night = tmp_path / "processed" / "2025-10-21"
+    night.mkdir(parents=True)
+    _write(night / "T11334_m750_2025-10-21_comments.txt", ["ann|2025-10-21 01:00|clouds"])
+    _write(night / "2025-10-21_7DT01_comments.txt", ["bo|2025-10-21 02:00|flat ok"])
+
+    assert store.import_folders([str(tmp_path / "processed")]) == 2
+    assert store.counts_for_date("2025-10-21") == {"T11334/m750": 1, "7DT01": 1}
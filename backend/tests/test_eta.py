@@ -0,0 +1,61 @@
+"""
+Queue completion estimates (app/eta.py).
+
+Run from backend/:  python -m pytest tests
+"""
+
+from datetime import datetime, timedelta
+
+from app.eta import DurationModels, QueuePlan
+
+NOW = datetime(2025, 10, 21, 12, 0, 0)
+
+
+def _entry(index, status, duration=None, started=None, dependents=None, priority=5):
+    return {"index": index, "status": status, "input_type": "Daily", "type": "science",
+            "priority": priority, "duration": duration, "dependent_idx": dependents,
+            "config": f"job{index}.yml",
+            "process_start": started.isoformat() if started else None}
+
+
+def _plan(entries):
+    models = DurationModels()
+    models.add_runs(entries)
+    return QueuePlan(entries, models)
+
+
+def test_processing_job_counts_elapsed_time():
+    # Completed runs take 600 s; job 2 started 400 s ago, so 200 s are left
+    entries = [
+        _entry(0, "Completed", duration=600.0),
+        _entry(1, "Completed", duration=600.0),
+        _entry(2, "Processing", started=NOW - timedelta(seconds=400)),
+        _entry(3, "Pending"),
+    ]
+    result = _plan(entries).estimate(now=NOW, workers=1)
+    jobs = {job["index"]: job for job in result["jobs"]}
+
+    assert jobs[2]["start_in"] == 0.0
+    assert jobs[2]["finish_in"] == 200.0
+    # The only worker is busy with job 2 until then
+    assert jobs[3]["start_in"] == 200.0
+    assert jobs[3]["finish_in"] == 800.0
+    assert result["queue_seconds"] == 800.0
+
+
+def test_processing_job_holds_a_worker_and_its_dependents():
+    entries = [
+        _entry(0, "Completed", duration=300.0),
+        _entry(1, "Processing", started=NOW - timedelta(seconds=100), dependents="[3]"),
+        _entry(2, "Ready", priority=1),
+        _entry(3, "Pending", priority=9),
+    ]
+    result = _plan(entries).estimate(now=NOW, workers=2)
+    jobs = {job["index"]: job for job in result["jobs"]}
+
+    assert jobs[1]["finish_in"] == 200.0
+    # Job 2 gets the second worker right away; job 3 waits for its parent
+    assert jobs[2]["start_in"] == 0.0
+    assert jobs[3]["start_in"] == 200.0
+    assert result["critical_path"]["indices"] == [1, 3]
+    assert result["critical_path"]["seconds"] == 500.0
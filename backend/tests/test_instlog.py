@@ -0,0 +1,90 @@
+"""
+Instrument log snapshot and journal (app/instlog.py).
+
+Run from backend/:  python -m pytest tests
+"""
+
+import json
+import os
+import time
+
+from app.instlog import InstLog, event_key
+
+
+def _event(unit, text, date="2025-10-21"):
+    return {"date": date, "unit": unit, "text": text}
+
+
+def _keys(events):
+    return sorted(event_key(event) for event in events)
+
+
+def _log(tmp_path, **kwargs):
+    return InstLog(str(tmp_path / "inst-log.json"), **kwargs)
+
+
+def test_append_and_delete(tmp_path):
+    log = _log(tmp_path)
+    assert log.append(add=[_event("7DT01", "filter wheel"), _event("7DT02", "focus")]) == 2
+    assert log.append(delete=[_event("7DT01", "filter wheel")]) == 1
+    assert log.events() == [_event("7DT02", "focus")]
+
+
+def test_replace_journals_only_the_difference(tmp_path):
+    log = _log(tmp_path)
+    log.append(add=[_event("7DT01", "a"), _event("7DT02", "b"), _event("7DT03", "c")])
+    size = os.path.getsize(log.journal_path)
+
+    wanted = [_event("7DT01", "a"), _event("7DT03", "c"), _event("7DT04", "d")]
+    assert log.replace(wanted) == 2
+    assert _keys(log.events()) == _keys(wanted)
+    # One delete and one add line, not the whole list again
+    with open(log.journal_path, "rb") as f:
+        f.seek(size)
+        assert [json.loads(line)["op"] for line in f] == ["delete", "add"]
+    assert log.replace(wanted) == 0
+
+
+def test_replace_keeps_duplicate_events(tmp_path):
+    log = _log(tmp_path)
+    log.replace([_event("7DT01", "a")] * 3)
+    log.replace([_event("7DT01", "a")] * 2)
+    assert log.events() == [_event("7DT01", "a")] * 2
+
+
+def test_compact_folds_the_journal_into_the_snapshot(tmp_path):
+    log = _log(tmp_path)
+    reader = _log(tmp_path)
+    log.append(add=[_event("7DT01", "a"), _event("7DT02", "b")])
+    log.append(delete=[_event("7DT01", "a")])
+    assert reader.events() == [_event("7DT02", "b")]
+
+    log.compact()
+    assert os.path.getsize(log.journal_path) == 0
+    with open(log.snapshot_path) as f:
+        assert json.load(f) == {"events": [_event("7DT02", "b")]}
+    # A reader with a cached offset notices the new snapshot
+    log.append(add=[_event("7DT03", "c")])
+    assert reader.events() == [_event("7DT02", "b"), _event("7DT03", "c")]
+
+
+def test_large_journal_is_compacted_in_background(tmp_path):
+    log = _log(tmp_path, compact_bytes=100)
+    log.append(add=[_event("7DT01", "x" * 200)])
+    deadline = time.time() + 5
+    while os.path.getsize(log.journal_path) and time.time() < deadline:
+        time.sleep(0.01)
+    assert os.path.getsize(log.journal_path) == 0
+    assert log.events() == [_event("7DT01", "x" * 200)]
+
+
+def test_incomplete_journal_line_is_read_later(tmp_path):
+    log = _log(tmp_path)
+    log.append(add=[_event("7DT01", "a")])
+    line = json.dumps({"op": "add", "event": _event("7DT02", "b")})
+    with open(log.journal_path, "a") as f:
+        f.write(line[:10])
+    assert log.events() == [_event("7DT01", "a")]
+    with open(log.journal_path, "a") as f:
+        f.write(line[10:] + "\n")
+    assert log.events() == [_event("7DT01", "a"), _event("7DT02", "b")]
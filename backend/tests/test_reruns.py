@@ -0,0 +1,105 @@
+"""
+Rerun job queue (app/reruns.py).
+
+Run from backend/:  python -m pytest tests
+"""
+
+import pytest
+
+import app.reruns as reruns
+from app.reruns import RerunQueue, command_for
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return RerunQueue(str(tmp_path / "reruns.sqlite"))
+
+
+def test_submit_validates_the_row(queue):
+    with pytest.raises(ValueError):
+        queue.submit("2025-10-21", obj="T0001; rm -rf /", filt="r")
+    with pytest.raises(ValueError):
+        queue.submit("21/10/2025", unit="7DT01", masterframe=True)
+    with pytest.raises(ValueError):
+        queue.submit("2025-10-21", obj="T0001")
+
+
+def test_pending_requests_for_a_row_coalesce(queue):
+    job, merged = queue.submit("2025-10-21", obj="T0001", filt="r", priority=2, requested_by="ann")
+    assert not merged and job["target"] == "T0001/r" and job["lane"] == "science"
+    again, merged = queue.submit("2025-10-21", obj="T0001", filt="r", priority=7, requested_by="bo")
+    assert merged and again["id"] == job["id"]
+    assert again["requests"] == 2 and again["priority"] == 7 and again["requested_by"] == "ann,bo"
+
+    lower, _ = queue.submit("2025-10-21", obj="T0001", filt="r", priority=1, requested_by="ann")
+    assert lower["priority"] == 7 and lower["requested_by"] == "ann,bo"
+    other, merged = queue.submit("2025-10-21", obj="T0001", filt="g")
+    assert not merged and other["id"] != job["id"]
+
+
+def test_request_for_a_running_row_queues_one_new_job(queue):
+    job, _ = queue.submit("2025-10-21", unit="7DT01", masterframe=True)
+    assert queue.claim("runner:1")["id"] == job["id"]
+    second, merged = queue.submit("2025-10-21", unit="7DT01", masterframe=True)
+    third, merged_again = queue.submit("2025-10-21", unit="7DT01", masterframe=True)
+    assert not merged and merged_again
+    assert second["id"] != job["id"] and third["id"] == second["id"]
+
+
+def test_claim_by_priority_then_age(queue):
+    first, _ = queue.submit("2025-10-21", unit="7DT01", masterframe=True)
+    urgent, _ = queue.submit("2025-10-21", unit="7DT02", masterframe=True, priority=5)
+    second, _ = queue.submit("2025-10-21", unit="7DT03", masterframe=True)
+    order = [queue.claim("runner:1")["id"] for _ in range(3)]
+    assert order == [urgent["id"], first["id"], second["id"]]
+    assert queue.claim("runner:1") is None
+
+
+def test_claim_respects_lane_and_total_limits(queue, monkeypatch):
+    monkeypatch.setattr(reruns, "UNIT_LIMITS", {"science": 2})
+    for obj in ("T0001", "T0002", "T0003"):
+        queue.submit("2025-10-21", obj=obj, filt="r")
+    queue.submit("2025-10-21", unit="7DT01", masterframe=True)
+    queue.submit("2025-10-22", unit="7DT01", masterframe=True)
+
+    claimed = [queue.claim("runner:1", max_running=10) for _ in range(5)]
+    lanes = [job["lane"] for job in claimed if job]
+    assert sorted(lanes) == ["7DT01", "science", "science"]
+    assert queue.summary()["running_by_lane"] == {"7DT01": 1, "science": 2}
+
+    assert queue.claim("runner:1", max_running=3) is None
+
+
+def test_finished_job_frees_its_lane(queue):
+    job, _ = queue.submit("2025-10-21", unit="7DT01", masterframe=True)
+    queue.submit("2025-10-22", unit="7DT01", masterframe=True)
+    queue.claim("runner:1")
+    assert queue.claim("runner:1") is None
+
+    queue.finish(job["id"], "runner:1", 0)
+    assert queue.get(job["id"])["status"] == "completed"
+    assert queue.claim("runner:1")["date"] == "2025-10-22"
+
+
+def test_expired_lease_fails_the_job(queue, monkeypatch):
+    job, _ = queue.submit("2025-10-21", unit="7DT01", masterframe=True)
+    monkeypatch.setattr(reruns, "LEASE_SECONDS", -1.0)
+    queue.claim("runner:1")
+    queue.claim("runner:2")
+    failed = queue.get(job["id"])
+    assert failed["status"] == "failed" and "lease" in failed["error"]
+
+
+def test_cancel_only_pending_jobs(queue):
+    job, _ = queue.submit("2025-10-21", unit="7DT01", masterframe=True)
+    other, _ = queue.submit("2025-10-21", unit="7DT02", masterframe=True)
+    queue.claim("runner:1")
+    assert not queue.cancel(job["id"])
+    assert queue.cancel(other["id"])
+    assert queue.get(other["id"])["status"] == "cancelled"
+
+
+def test_command_formats_each_argument(queue):
+    job, _ = queue.submit("2025-10-21", obj="T0001", filt="m750")
+    assert command_for("rerun --date {date} '{target} x' {masterframe}", job) == \
+        ["rerun", "--date", "2025-10-21", "T0001/m750 x", "science"]
@@ -0,0 +1,72 @@
+"""
+Per-night science QA rollups (app/rollups.py).
+
+Run from backend/:  python -m pytest tests
+"""
+
+import json
+
+import numpy as np
+
+from app.rollups import ScienceRollups
+
+
+def _frame(date_obs, unit="7DT01", filt="r", seeing=2.0, run_date="2025-01-01"):
+    return {"date_obs": date_obs, "run_date": run_date, "unit": unit, "filter": filt,
+            "seeing": seeing, "min": seeing - 0.5, "max": seeing + 0.5}
+
+
+def _write(path, records):
+    # Indented like the pipeline's science.json
+    path.write_text(json.dumps(records, indent=4))
+
+
+def _by_night(rollups, source):
+    return {row["night"]: row for row in rollups.query(source)}
+
+
+def test_nights_come_from_date_obs(tmp_path):
+    source = tmp_path / "science.json"
+    _write(source, [_frame("Mon, 17 Nov 2025 15:00:00 GMT", run_date="2025-11-18"),
+                    _frame("2025-11-17T16:00:00", run_date="2025-11-18")])
+    rollups = ScienceRollups(str(tmp_path / "rollups.sqlite"))
+    rollups.update(str(source))
+
+    assert list(_by_night(rollups, str(source))) == ["2025-11-17"]
+    assert _by_night(rollups, str(source))["2025-11-17"]["count"] == 2
+
+
+def test_appended_record_updates_only_its_night(tmp_path):
+    source = tmp_path / "science.json"
+    records = [_frame("2025-03-01T01:00:00", seeing=s) for s in (1.0, 2.0, 3.0)]
+    records += [_frame("2025-03-02T01:00:00", seeing=s) for s in (4.0, 5.0)]
+    _write(source, records)
+    rollups = ScienceRollups(str(tmp_path / "rollups.sqlite"))
+    assert rollups.update(str(source)) == {"changed": True, "nights": 2}
+    before = _by_night(rollups, str(source))
+
+    _write(source, records + [_frame("2025-03-02T02:00:00", seeing=9.0)])
+    assert rollups.update(str(source)) == {"changed": True, "nights": 1}
+    after = _by_night(rollups, str(source))
+
+    assert after["2025-03-01"] == before["2025-03-01"]
+    assert after["2025-03-02"]["count"] == 3
+    assert after["2025-03-02"]["seeing"] == np.median([4.0, 5.0, 9.0])
+    assert after["2025-03-02"]["max"] == 9.5
+    assert rollups.update(str(source)) == {"changed": False, "nights": 0}
+
+
+def test_edited_record_rebuilds_everything(tmp_path):
+    source = tmp_path / "science.json"
+    records = [_frame("2025-03-01T01:00:00", seeing=1.0), _frame("2025-03-02T01:00:00", seeing=4.0)]
+    _write(source, records)
+    rollups = ScienceRollups(str(tmp_path / "rollups.sqlite"))
+    rollups.update(str(source))
+
+    records[0] = _frame("2025-03-01T01:00:00", seeing=1.5)
+    _write(source, records)
+    assert rollups.update(str(source)) == {"changed": True, "nights": 2}
+    rows = _by_night(rollups, str(source))
+    assert rows["2025-03-01"]["seeing"] == 1.5
+    assert rows["2025-03-01"]["count"] == 1
+    assert rows["2025-03-02"]["count"] == 1
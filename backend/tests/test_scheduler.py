@@ -0,0 +1,62 @@
+"""
+Scheduler queue statistics (app/scheduler.py).
+
+Run from backend/:  python -m pytest tests
+"""
+
+import json
+
+from app.scheduler import SchedulerSnapshot
+
+
+def _entry(index, status, input_type="Daily", duration=None):
+    return {"index": index, "status": status, "input_type": input_type, "priority": 5,
+            "type": "science", "duration": duration, "dependent_idx": None}
+
+
+# The statuses the scheduler actually writes
+MIX = [
+    _entry(0, "Completed", duration=120.0),
+    _entry(1, "Completed", "ToO", duration=60.0),
+    _entry(2, "Failed", duration=5.0),
+    _entry(3, "Processing"),
+    _entry(4, "Processing", "ToO"),
+    _entry(5, "Ready"),
+    _entry(6, "Pending"),
+    _entry(7, "Pending"),
+]
+
+
+def _write(path, entries):
+    path.write_text(json.dumps({"count": len(entries), "data": entries}))
+
+
+def test_running_counts_processing_jobs(tmp_path):
+    path = tmp_path / "scheduler.json"
+    _write(path, MIX)
+    stats = SchedulerSnapshot(str(path)).stats()
+
+    assert stats["total"] == 8
+    assert stats["running"] == 2
+    assert stats["by_status"] == {"Completed": 2, "Failed": 1, "Processing": 2, "Ready": 1, "Pending": 2}
+    assert stats["by_status_input_type"]["Processing"] == {"Daily": 1, "ToO": 1}
+
+
+def test_running_follows_status_changes(tmp_path):
+    path = tmp_path / "scheduler.json"
+    _write(path, MIX)
+    snapshot = SchedulerSnapshot(str(path))
+    assert snapshot.stats()["running"] == 2
+
+    # Job 3 finishes and job 5 starts; the reload only applies the changed entries
+    entries = [dict(entry) for entry in MIX]
+    entries[3].update(status="Completed", duration=90.0)
+    entries[5].update(status="Processing")
+    _write(path, entries + [_entry(8, "Pending")])
+    stats = snapshot.stats()
+
+    assert stats["total"] == 9
+    assert stats["running"] == 2
+    assert stats["by_status"]["Completed"] == 3
+    assert stats["by_status"]["Pending"] == 3
+    assert "Ready" not in stats["by_status"]
@@ -0,0 +1,95 @@
+"""
+Benchmark for the bad pixel evolution kernels in bp_kernel.py.
+
+Runs every available backend over the same synthetic full-frame masks and
+reports time per update and peak traced memory. The final trackers of all
+backends must be identical, otherwise the run fails.
+
+    python bench_bp_kernel.py --n-masks 20 --dtype uint16
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+
+import numpy as np
+
+from bp_kernel import BACKENDS, available_backends, fast_evolution_update, init_tracker
+
+# 7DT full frame (NAXIS2 x NAXIS1)
+FULL_FRAME = (6388, 9576)
+
+
+def make_masks(n_masks, shape, bad_fraction=0.004, seed=0):
+    """Synthetic masks: a fixed set of always-bad pixels plus random transient ones"""
+    rng = np.random.default_rng(seed)
+    hot = rng.random(shape) < bad_fraction / 2
+    masks = []
+    for _ in range(n_masks):
+        mask = rng.random(shape) < bad_fraction / 2
+        mask |= hot
+        masks.append(mask.astype(np.uint8))
+    return masks
+
+
+def run_backend(backend, masks, dtype):
+    tracker = init_tracker(masks[0], dtype=dtype)
+    scratch = np.empty(masks[0].shape, dtype=bool) if backend == "numpy" else None
+
+    # Warm up (numba compilation) on a copy so it does not count
+    fast_evolution_update(tracker.copy(), masks[0], backend=backend, scratch=scratch)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    for mask in masks[1:]:
+        fast_evolution_update(tracker, mask, out=tracker, backend=backend, scratch=scratch)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    n_updates = max(len(masks) - 1, 1)
+    return tracker, {
+        "backend": backend,
+        "updates": n_updates,
+        "total_s": elapsed,
+        "per_update_ms": elapsed / n_updates * 1e3,
+        "peak_mb": peak / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bad pixel evolution kernels.")
+    parser.add_argument("--n-masks", type=int, default=20, help="Number of masks per run (default: 20).")
+    parser.add_argument("--shape", type=int, nargs=2, default=FULL_FRAME, help="Mask shape (default: 7DT full frame).")
+    parser.add_argument("--dtype", default="uint16", help="Tracker dtype (default: uint16).")
+    parser.add_argument("--backends", nargs="+", default=None, choices=BACKENDS, help="Backends to run (default: all available).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0).")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this path.")
+    args = parser.parse_args()
+
+    dtype = np.dtype(args.dtype)
+    backends = args.backends or available_backends()
+    masks = make_masks(args.n_masks, tuple(args.shape), seed=args.seed)
+
+    print(f"=== Bad pixel evolution benchmark: {args.n_masks} masks of {tuple(args.shape)}, {dtype} ===")
+    results = []
+    reference = None
+    for backend in backends:
+        tracker, res = run_backend(backend, masks, dtype)
+        if reference is None:
+            reference = tracker
+        elif not np.array_equal(reference, tracker):
+            raise SystemExit(f"Backend {backend} does not match {backends[0]}")
+        results.append(res)
+        print(f"{backend:>15}: {res['per_update_ms']:8.2f} ms/update  peak {res['peak_mb']:8.2f} MB")
+
+    print("All backends produced identical trackers")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"shape": list(args.shape), "dtype": str(dtype), "n_masks": args.n_masks, "results": results}, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
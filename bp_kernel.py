@@ -0,0 +1,114 @@
+"""
+Bad pixel evolution kernels.
+
+The tracker counts, per pixel, how many consecutive masks flagged it as bad:
+X = X*Y + Y where Y=1 for bad pixels, Y=0 for good pixels.
+
+Every backend writes into a caller supplied ``out`` array so that a long run
+over hundreds of full-frame masks reuses one buffer instead of allocating a
+new tracker per mask. ``out`` may be the tracker itself (in-place update).
+"""
+
+import numpy as np
+
+# Tracker dtypes that are safe to use. uint8 overflows after 255 consecutive
+# bad masks, uint16 after 65535, which is more than the masks we keep per unit.
+TRACKER_DTYPES = (np.uint8, np.uint16, np.int32, np.int64)
+DEFAULT_DTYPE = np.uint16
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+
+    def _evolution_kernel(evolution_tracker, mask_data, out):
+        for y in prange(evolution_tracker.shape[0]):
+            for x in range(evolution_tracker.shape[1]):
+                if mask_data[y, x] > 0:
+                    out[y, x] = evolution_tracker[y, x] + 1
+                else:
+                    out[y, x] = 0
+
+    # prange behaves like range when parallel=False
+    _update_parallel = njit(parallel=True)(_evolution_kernel)
+    _update_serial = njit(parallel=False)(_evolution_kernel)
+
+except ImportError:
+    NUMBA_AVAILABLE = False
+    _update_parallel = None
+    _update_serial = None
+
+
+BACKENDS = ("numba_parallel", "numba_serial", "numpy")
+
+
+def available_backends():
+    """Return the backends usable in this environment"""
+    if NUMBA_AVAILABLE:
+        return list(BACKENDS)
+    return ["numpy"]
+
+
+def init_tracker(mask_data, dtype=DEFAULT_DTYPE, out=None):
+    """
+    Build the initial tracker from the first mask (1 for bad, 0 for good).
+
+    Args:
+        mask_data: 2D bad pixel mask
+        dtype: Tracker dtype, one of TRACKER_DTYPES
+        out: Optional preallocated tracker to fill
+
+    Returns:
+        Tracker array
+    """
+    if out is None:
+        out = np.empty(mask_data.shape, dtype=dtype)
+    np.greater(mask_data, 0, out=out, casting="unsafe")
+    return out
+
+
+def _numpy_update(evolution_tracker, mask_data, out, scratch=None):
+    # out = (tracker + 1) * (mask > 0), evaluated in two in-place passes
+    if scratch is None:
+        scratch = np.empty(mask_data.shape, dtype=bool)
+    np.greater(mask_data, 0, out=scratch)
+    np.add(evolution_tracker, 1, out=out, casting="unsafe")
+    np.multiply(out, scratch, out=out, casting="unsafe")
+    return out
+
+
+def fast_evolution_update(evolution_tracker, mask_data, out=None, backend="auto", scratch=None):
+    """
+    Update the evolution tracker with a new mask.
+
+    Args:
+        evolution_tracker: Current tracker (2D integer array)
+        mask_data: New bad pixel mask with the same shape
+        out: Output array; defaults to updating evolution_tracker in place
+        backend: 'auto', 'numba_parallel', 'numba_serial' or 'numpy'
+        scratch: Optional bool buffer reused by the numpy backend
+
+    Returns:
+        The updated tracker (``out``)
+    """
+    if mask_data.shape != evolution_tracker.shape:
+        raise ValueError(f"Mask shape {mask_data.shape} does not match tracker shape {evolution_tracker.shape}")
+    if out is None:
+        out = evolution_tracker
+
+    if backend == "auto":
+        backend = "numba_parallel" if NUMBA_AVAILABLE else "numpy"
+
+    if backend == "numpy":
+        return _numpy_update(evolution_tracker, mask_data, out, scratch=scratch)
+    if not NUMBA_AVAILABLE:
+        raise ValueError(f"Backend {backend} requires numba")
+    if not mask_data.dtype.isnative:
+        # FITS data is big-endian, which numba cannot read
+        mask_data = mask_data.astype(mask_data.dtype.newbyteorder("="))
+    if backend == "numba_parallel":
+        _update_parallel(evolution_tracker, mask_data, out)
+    elif backend == "numba_serial":
+        _update_serial(evolution_tracker, mask_data, out)
+    else:
+        raise ValueError(f"Unknown backend {backend}, expected one of {BACKENDS}")
+    return out
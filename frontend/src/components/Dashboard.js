@@ -3,6 +3,7 @@ import axios from "axios";
 import ExpandMoreIcon from '@mui/icons-material/ExpandMore';
 import ExpandLessIcon from '@mui/icons-material/ExpandLess';
 import { baseurl } from '../config';
+import { subscribeEvents } from '../utils/events';
 import '../styles/Dashboard.css';
 
 const Dashboard = () => {
@@ -23,8 +24,20 @@ const Dashboard = () => {
     };
 
     fetchData();
-    const interval = setInterval(fetchData, 5000);
-    return () => clearInterval(interval);
+    // Pushed updates; poll only if the push hub is unavailable
+    let interval = null;
+    const unsubscribe = subscribeEvents(['status'], {}, {
+      status: (status) => {
+        setData(status);
+        setError(null);
+      },
+    }, () => {
+      interval = setInterval(fetchData, 5000);
+    });
+    return () => {
+      unsubscribe();
+      if (interval) clearInterval(interval);
+    };
   }, []);
 
   const StatusBar = ({ label, value, max = 100, unit = '%', color = '#007BFF' }) => (
@@ -1,6 +1,7 @@
 import React, { useEffect, useState } from 'react';
 import '../styles/Overview.css';
 import { baseurl } from '../config';
+import { subscribeEvents } from '../utils/events';
 import axios from 'axios';
 import { Chart as ChartJS, LineElement, PointElement, CategoryScale, LinearScale, Tooltip, Legend } from 'chart.js';
 import { Line } from 'react-chartjs-2';
@@ -85,19 +86,29 @@ function Overview({ onPlotClick }) {
         console.error('Error fetching scheduler data:', err);
       });
     
-    // Set up interval for scheduler data
-    const interval = setInterval(() => {
-      axios.get(baseurl + '/scheduler')
-        .then(response => {
-          const data = Array.isArray(response.data) ? response.data : (response.data.data || []);
-          setSchedulerData(data);
-        })
-        .catch(err => {
-          console.error('Error fetching scheduler data:', err);
-        });
-    }, 10000);
+    // Pushed scheduler updates; poll only if the push hub is unavailable
+    let interval = null;
+    const unsubscribe = subscribeEvents(['scheduler'], {}, {
+      scheduler: (scheduler) => {
+        setSchedulerData(Array.isArray(scheduler) ? scheduler : (scheduler.data || []));
+      },
+    }, () => {
+      interval = setInterval(() => {
+        axios.get(baseurl + '/scheduler')
+          .then(response => {
+            const data = Array.isArray(response.data) ? response.data : (response.data.data || []);
+            setSchedulerData(data);
+          })
+          .catch(err => {
+            console.error('Error fetching scheduler data:', err);
+          });
+      }, 10000);
+    });
     
-    return () => clearInterval(interval);
+    return () => {
+      unsubscribe();
+      if (interval) clearInterval(interval);
+    };
   }, []);
 
   useEffect(() => {
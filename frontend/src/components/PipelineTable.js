@@ -3,6 +3,7 @@ import { useReactTable, getCoreRowModel, getSortedRowModel, flexRender } from "@
 import { format } from "date-fns";
 import axios from "axios";
 import { baseurl } from '../config';
+import { subscribeEvents } from '../utils/events';
 import "../styles/PipelineTable.css";
 import SettingsIcon from '@mui/icons-material/Settings';
 import DescriptionIcon from '@mui/icons-material/Description';
@@ -17,8 +18,48 @@ import KeyboardArrowUpIcon from '@mui/icons-material/KeyboardArrowUp';
 import SubdirectoryArrowRightIcon from '@mui/icons-material/SubdirectoryArrowRight';
 import CircularProgress from '@mui/material/CircularProgress';
 
+// Fetch status rows, asking only for rows changed since the last version seen for this date.
+// Returns null when nothing changed.
+const fetchStatusRows = async (endpoint, date, cacheRef) => {
+  const known = cacheRef.current && cacheRef.current.date === date ? cacheRef.current : null;
+  const response = await axios.get(baseurl + `/${endpoint}?date=${date}&since=${known ? known.version : -1}`);
+  const { version, full, changed, removed } = response.data;
+  if (known && !full && changed.length === 0 && removed.length === 0) {
+    cacheRef.current = { ...known, version };
+    return null;
+  }
+  const rows = known && !full ? new Map(known.rows) : new Map();
+  removed.forEach((rowId) => rows.delete(rowId));
+  changed.forEach((row) => rows.set(row.row_id, row));
+  cacheRef.current = { date, version, rows };
+  return Array.from(rows.values());
+};
+
+// Seed the status cache from a pushed {date, version, rows} message and return the rows.
+const applyPushedRows = (message, cacheRef) => {
+  cacheRef.current = {
+    date: message.date,
+    version: message.version,
+    rows: new Map(message.rows.map((row) => [row.row_id, row])),
+  };
+  return message.rows;
+};
+
+// Fetch science and masterframe rows of a date in one request and seed both status caches.
+// The versions are those of the per-date endpoints, so later polls with `since` get only changes.
+const fetchRangeRows = async (date, pipelineCacheRef, masterframeCacheRef) => {
+  const response = await axios.get(baseurl + `/pipeline-status/bulk?dateMin=${date}&dateMax=${date}`);
+  const { science, masterframe } = response.data[date];
+  return {
+    science: applyPushedRows({ date, ...science }, pipelineCacheRef),
+    masterframe: applyPushedRows({ date, ...masterframe }, masterframeCacheRef),
+  };
+};
+
 const PipelineTable = ({ initialDate }) => {
   const popupRef = useRef(null);
+  const pipelineCache = useRef(null);
+  const masterframeCache = useRef(null);
   const [pipelineData, setPipelineData] = useState([]); // Science images data
   const [masterframeData, setMasterframeData] = useState([]); // Masterframe images data
   const [error, setError] = useState(null);
@@ -42,12 +83,14 @@ const PipelineTable = ({ initialDate }) => {
   const fetchPipelineData = useCallback(async (date, showSpinner = false) => {
     if (showSpinner) setShowLoading(true);
     try {
-      const response = await axios.get(baseurl+`/pipeline-status?date=${date}`);
-      const dataWithIds = response.data.map((item, index) => ({
-        ...item,
-        id: item.id || `science-row-${index}`,
-      }));
-      setPipelineData(dataWithIds);
+      const rows = await fetchStatusRows('pipeline-status', date, pipelineCache);
+      if (rows) {
+        const dataWithIds = rows.map((item) => ({
+          ...item,
+          id: item.id || `science-${item.row_id}`,
+        }));
+        setPipelineData(dataWithIds);
+      }
       setError(null);
     } catch (err) {
       console.error("Error fetching pipeline data:", err);
@@ -61,12 +104,14 @@ const PipelineTable = ({ initialDate }) => {
   const fetchMasterframeData = useCallback(async (date, showSpinner = false) => {
     if (showSpinner) setShowLoading(true);
     try {
-      const response = await axios.get(baseurl+`/masterframe-status?date=${date}`);
-      const dataWithIds = response.data.map((item, index) => ({
-        ...item,
-        id: item.id || `masterframe-row-${index}`,
-      }));
-      setMasterframeData(dataWithIds);
+      const rows = await fetchStatusRows('masterframe-status', date, masterframeCache);
+      if (rows) {
+        const dataWithIds = rows.map((item) => ({
+          ...item,
+          id: item.id || `masterframe-${item.row_id}`,
+        }));
+        setMasterframeData(dataWithIds);
+      }
       setError(null);
     } catch (err) {
       console.error("Error fetching masterframe data:", err);
@@ -76,6 +121,19 @@ const PipelineTable = ({ initialDate }) => {
     }
   }, [baseurl]);
 
+  // Fetch science and masterframe data of a date together
+  const fetchRangeData = useCallback(async (date) => {
+    try {
+      const { science, masterframe } = await fetchRangeRows(date, pipelineCache, masterframeCache);
+      setPipelineData(science.map((item) => ({ ...item, id: item.id || `science-${item.row_id}` })));
+      setMasterframeData(masterframe.map((item) => ({ ...item, id: item.id || `masterframe-${item.row_id}` })));
+      setError(null);
+    } catch (err) {
+      console.error("Error fetching pipeline data:", err);
+      setError("Failed to load pipeline data");
+    }
+  }, [baseurl]);
+
   useEffect(() => {
     const handleClickOutside = (e) => {
       if (popupRef.current && !popupRef.current.contains(e.target)) {
@@ -103,17 +161,29 @@ const PipelineTable = ({ initialDate }) => {
   // On date change, show spinner and fetch with showSpinner=true
   useEffect(() => {
     setShowLoading(true);
-    Promise.all([
-      fetchPipelineData(selectedDate, true),
-      fetchMasterframeData(selectedDate, true)
-    ]).then(() => setShowLoading(false));
-    // Set up interval for background polling (no spinner)
-    const interval = setInterval(() => {
-      fetchPipelineData(selectedDate, false);
-      fetchMasterframeData(selectedDate, false);
-    }, 10000);
-    return () => clearInterval(interval);
-  }, [selectedDate, fetchPipelineData, fetchMasterframeData]);
+    fetchRangeData(selectedDate).then(() => setShowLoading(false));
+    // Pushed updates; background polling (no spinner) only if the push hub is unavailable
+    let interval = null;
+    const unsubscribe = subscribeEvents(['pipeline-status', 'masterframe-status'], { date: selectedDate }, {
+      'pipeline-status': (message) => {
+        const rows = applyPushedRows(message, pipelineCache);
+        setPipelineData(rows.map((item) => ({ ...item, id: item.id || `science-${item.row_id}` })));
+      },
+      'masterframe-status': (message) => {
+        const rows = applyPushedRows(message, masterframeCache);
+        setMasterframeData(rows.map((item) => ({ ...item, id: item.id || `masterframe-${item.row_id}` })));
+      },
+    }, () => {
+      interval = setInterval(() => {
+        fetchPipelineData(selectedDate, false);
+        fetchMasterframeData(selectedDate, false);
+      }, 10000);
+    });
+    return () => {
+      unsubscribe();
+      if (interval) clearInterval(interval);
+    };
+  }, [selectedDate, fetchRangeData, fetchPipelineData, fetchMasterframeData]);
 
   // Wrap buildQueryString in useCallback
   const buildQueryString = useCallback((row, extraParams = {}) => {
@@ -292,16 +362,15 @@ const PipelineTable = ({ initialDate }) => {
     const confirmed = window.confirm("Are you sure to re-run the image(s)?");
     if (confirmed) {
       try {
-        await axios.post(baseurl+`/rerun?${buildQueryString(row, { masterframe })}`);
-        alert("Rerun request sent successfully!");
-        fetchPipelineData(selectedDate);
-        fetchMasterframeData(selectedDate);
+        const response = await axios.post(baseurl+`/rerun?${buildQueryString(row, { masterframe })}`);
+        alert(response.data.message || "Rerun request sent successfully!");
+        fetchRangeData(selectedDate);
       } catch (err) {
         console.error("Error sending rerun request:", err);
         alert("Failed to send rerun request: " + err.message);
       }
     }
-  }, [selectedDate, fetchPipelineData, fetchMasterframeData, buildQueryString]);
+  }, [selectedDate, fetchRangeData, buildQueryString]);
 
   // Columns definition (shared for both tables)
   const masterframeColumns = useMemo(
@@ -824,7 +893,7 @@ const PipelineTable = ({ initialDate }) => {
                         <div key={index} className="image-item">
                           <h4>{popupContent.names[index]}</h4>
                           <img
-                            src={baseurl+`/image?filename=${imageName}`}
+                            src={baseurl+`/thumbnail?filename=${encodeURIComponent(imageName)}&size=256`}
                             alt={popupContent.names[index]}
                             width="200"
                             height="200"
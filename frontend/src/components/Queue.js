@@ -12,6 +12,7 @@ import BugReportIcon from '@mui/icons-material/BugReport';
 const Queue = () => {
   const popupRef = useRef(null);
   const [queueData, setQueueData] = useState([]);
+  const [rerunJobs, setRerunJobs] = useState([]);
   const [error, setError] = useState(null);
   const [sorting, setSorting] = useState([
     { id: "status", desc: true },
@@ -40,6 +41,10 @@ const Queue = () => {
       }));
       setQueueData(dataWithIds);
       setError(null);
+      // Rerun requests are optional; the queue view works without them
+      axios.get(baseurl + `/rerun/jobs?limit=50`)
+        .then(res => setRerunJobs(res.data.jobs || []))
+        .catch(err => console.error("Error fetching rerun jobs:", err));
     } catch (err) {
       console.error("Error fetching queue data:", err);
       setError("Failed to load queue data");
@@ -134,10 +139,21 @@ const Queue = () => {
       });
   }, []);
 
+  const handleCancelRerun = useCallback(async (job) => {
+    if (!window.confirm(`Cancel rerun of ${job.target} (${job.date})?`)) return;
+    try {
+      await axios.delete(baseurl + `/rerun/jobs/${job.id}`);
+      fetchQueueData(false);
+    } catch (err) {
+      alert("Failed to cancel rerun: " + (err.response?.data?.error || err.message));
+    }
+  }, [fetchQueueData]);
+
   // Utility for status color
   function getStatusColor(status) {
     switch (status?.toLowerCase()) {
       case 'processing':
+      case 'running':
         return '#FFA500'; // orange
       case 'pending':
         return '#6c757d'; // gray
@@ -614,6 +630,53 @@ const Queue = () => {
             </table>
             </div>
           )}
+
+          {/* Rerun requests from the pipeline table (see /api/rerun) */}
+          {rerunJobs.length > 0 && (
+            <div className="table-wrapper rerun-section">
+              <div className="filter-group-title">Rerun Requests</div>
+              <table className="pipeline-table">
+                <thead>
+                  <tr>
+                    <th>Job</th>
+                    <th>Date</th>
+                    <th>Target</th>
+                    <th>Priority</th>
+                    <th>Requests</th>
+                    <th>Requested by</th>
+                    <th>Status</th>
+                    <th>Queued</th>
+                    <th>Actions</th>
+                  </tr>
+                </thead>
+                <tbody>
+                  {rerunJobs.map(job => (
+                    <tr key={job.id} className="pipeline-row">
+                      <td>{job.id}</td>
+                      <td>{job.date}</td>
+                      <td>{job.masterframe ? `${job.target} (masterframe)` : job.target}</td>
+                      <td>{job.priority}</td>
+                      <td>{job.requests}</td>
+                      <td>{job.requested_by || ""}</td>
+                      <td title={job.error || ""}>
+                        <div className="status-badge" style={{ '--status-color': getStatusColor(job.status) }}>
+                          {job.status}
+                        </div>
+                      </td>
+                      <td>{new Date(job.created * 1000).toLocaleString()}</td>
+                      <td>
+                        {job.status === 'pending' && (
+                          <button className="icon-btn" title="Cancel" onClick={() => handleCancelRerun(job)}>
+                            ✕
+                          </button>
+                        )}
+                      </td>
+                    </tr>
+                  ))}
+                </tbody>
+              </table>
+            </div>
+          )}
         </>
       )}
       {popupContent && (
@@ -0,0 +1,28 @@
+import { baseurl } from '../config';
+
+// Subscribe to server-pushed topics (backend/app/push.py).
+// handlers maps topic name -> callback(payload). If the push hub is not
+// reachable, onUnavailable is called once so the caller can fall back to polling.
+// Returns an unsubscribe function.
+export const subscribeEvents = (topics, params, handlers, onUnavailable) => {
+  if (typeof EventSource === 'undefined') {
+    onUnavailable();
+    return () => {};
+  }
+  const query = new URLSearchParams({ topics: topics.join(','), ...params });
+  const source = new EventSource(`${baseurl}events?${query}`);
+  let fellBack = false;
+
+  Object.entries(handlers).forEach(([topic, handler]) => {
+    source.addEventListener(topic, (event) => handler(JSON.parse(event.data)));
+  });
+  // EventSource reconnects by itself after a dropped stream; CLOSED means the
+  // hub answered with an error (e.g. not deployed)
+  source.onerror = () => {
+    if (source.readyState === EventSource.CLOSED && !fellBack) {
+      fellBack = true;
+      onUnavailable();
+    }
+  };
+  return () => source.close();
+};
@@ -5,48 +5,12 @@ import numpy as np
 from astropy.io import fits
 import time
 
-# Try to import numba for JIT compilation
-try:
-    from numba import jit, prange
-    NUMBA_AVAILABLE = True
+from bp_kernel import NUMBA_AVAILABLE, fast_evolution_update, init_tracker
+
+if NUMBA_AVAILABLE:
     print("Numba is available - using JIT compilation for speed")
-    
-    @jit(nopython=True, parallel=True)
-    def fast_evolution_update(evolution_tracker, mask_data):
-        """
-        Numba-optimized function to update evolution tracker.
-        Formula: X = X*Y + Y where Y=1 for bad pixels, Y=0 for good pixels
-        """
-        new_tracker = np.zeros_like(evolution_tracker)
-        
-        # Vectorized operation for bad pixels
-        for y in prange(evolution_tracker.shape[0]):
-            for x in range(evolution_tracker.shape[1]):
-                if mask_data[y, x] > 0:  # Bad pixel in new mask
-                    # X = X*1 + 1 = X + 1 (increment bad pixel counter)
-                    new_tracker[y, x] = evolution_tracker[y, x] + 1
-                else:  # Good pixel in new mask
-                    # X = X*0 + 0 = 0 (reset to good pixel)
-                    new_tracker[y, x] = 0
-        
-        return new_tracker
-        
-except ImportError:
-    NUMBA_AVAILABLE = False
+else:
     print("Numba not available - using standard numpy operations")
-    
-    def fast_evolution_update(evolution_tracker, mask_data):
-        """
-        Fallback function using vectorized numpy operations.
-        Formula: X = X*Y + Y where Y=1 for bad pixels, Y=0 for good pixels
-        """
-        new_tracker = np.zeros_like(evolution_tracker)
-        bad_pixel_mask = mask_data > 0
-        if np.any(bad_pixel_mask):
-            # For bad pixels: X = X*1 + 1 = X + 1
-            new_tracker[bad_pixel_mask] = evolution_tracker[bad_pixel_mask] + 1
-        # For good pixels: X = X*0 + 0 = 0 (already set to 0)
-        return new_tracker
 
 # Read the data
 data = pd.read_csv('/tmp/pipeline/dark.ecsv', sep=' ', comment='#')
@@ -121,12 +85,13 @@ def analyze_unit_always_bad(unit: str, date_str_list):
                     continue
                 if first_mask_shape is None:
                     first_mask_shape = mask_data.shape
-                    evolution_tracker = np.where(mask_data > 0, 1, 0)
+                    evolution_tracker = init_tracker(mask_data)
                 else:
                     if mask_data.shape != first_mask_shape:
                         # Skip mismatched shapes
                         continue
-                    evolution_tracker = fast_evolution_update(evolution_tracker, mask_data)
+                    # Update in place, no new tracker per mask
+                    fast_evolution_update(evolution_tracker, mask_data, out=evolution_tracker)
                 processed += 1
         except Exception:
             continue